@@ -0,0 +1,81 @@
+"""
+Бенчмарк поиска хэштегов взаимодействий в постах
+Сравнивает HashtagMatcher с прежним путём: общий #(\\w+(?:_\\w+)*) и parse_hashtag на каждое совпадение
+Запуск: python benchmarks/bench_hashtags.py [количество_постов]
+"""
+
+import sys
+import os
+import re
+import random
+import time
+
+# Добавляем корень репозитория в путь для импорта пакета scripts.social
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.social.relation_tracker import RelationTracker
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+def legacy_extract(tracker, post_content):
+    """Прежняя версия extract_hashtags_from_post (для сравнения)"""
+    hashtags = []
+    for match in re.findall(r'#(\w+(?:_\w+)*)', post_content):
+        parsed = tracker.parse_hashtag(f"#{match}")
+        if parsed:
+            hashtags.append(parsed)
+    return hashtags
+
+def generate_posts(tracker, count, seed=42):
+    """Длинные посты: текст, теги взаимодействий и много посторонних хэштегов"""
+    rng = random.Random(seed)
+    actions = list(tracker.actions_config["actions"])
+    modifiers = list(tracker.modifiers_config["modifiers"])
+    names = ['Negan', 'Sarah', 'RedAlice', 'Void', 'Алёна', 'Rick']
+    words = "тьма шёпот генератор припасы ночь дорога лагерь рация патроны туман".split()
+    noise = ['#лето', '#ночь_в_лагере', '#ooc', '#Negan_привет', '#Sarah_и_Rick', '#важно']
+
+    posts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(40, 120)):
+            roll = rng.random()
+            if roll < 0.05:
+                tag = f"#{rng.choice(names)}_{rng.choice(actions).capitalize() if rng.random() < 0.2 else rng.choice(actions)}"
+                tag += ''.join(f"_{rng.choice(modifiers + ['громко'])}" for _ in range(rng.randint(0, 2)))
+                parts.append(tag)
+            elif roll < 0.12:
+                parts.append(rng.choice(noise))
+            else:
+                parts.append(rng.choice(words))
+        posts.append(' '.join(parts))
+    return posts
+
+def run_benchmark(count=20_000):
+    print("=" * 60)
+    print(f"⏱️  БЕНЧМАРК поиска хэштегов ({count:,} постов)")
+    print("=" * 60)
+
+    tracker = RelationTracker(data_dir=DATA_DIR)
+    posts = generate_posts(tracker, count)
+
+    start = time.perf_counter()
+    legacy = [legacy_extract(tracker, post) for post in posts]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [tracker.extract_hashtags_from_post(post) for post in posts]
+    current_time = time.perf_counter() - start
+
+    # Результаты должны совпадать один в один
+    assert current == legacy, "HashtagMatcher расходится с прежним разбором"
+
+    tags = sum(len(found) for found in current)
+    print(f"   Найдено тегов взаимодействий: {tags:,}")
+    print(f"   Прежний разбор:   {legacy_time:.2f} с ({count / legacy_time:,.0f} постов/с)")
+    print(f"   HashtagMatcher:   {current_time:.2f} с ({count / current_time:,.0f} постов/с)")
+    print(f"   Ускорение: x{legacy_time / current_time:.1f}")
+    print("✅ Результаты совпадают")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
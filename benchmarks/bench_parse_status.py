@@ -0,0 +1,98 @@
+"""
+Бенчмарк парсинга статуса игрока
+Сравнивает однопроходный parse_status с прежней реализацией (до 9 re.search на строку)
+Запуск: python benchmarks/bench_parse_status.py [количество_строк]
+"""
+
+import sys
+import os
+import re
+import random
+import time
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from userlist_parser import parse_status, parse_status_batch
+
+def legacy_parse_status(status_text):
+    """Прежняя версия parse_status (для сравнения)"""
+    result = {}
+
+    patterns = {
+        'credits': r'К:\s*([+-]?\d+)',
+        'infection': r'З:\s*([+-]?\d+)%?',
+        'whisper': r'Ш:\s*([+-]?\d+)%?',
+    }
+
+    alt_patterns = {
+        'credits': [r'credits?:\s*([+-]?\d+)', r'кредит[ы\w]*:\s*([+-]?\d+)'],
+        'infection': [r'заражен\w*:\s*([+-]?\d+)%?', r'inf(ection)?:\s*([+-]?\d+)%?'],
+        'whisper': [r'ш[её]пот\w*:\s*([+-]?\d+)%?', r'whisper:\s*([+-]?\d+)%?'],
+    }
+
+    for key, pattern in patterns.items():
+        match = re.search(pattern, status_text, re.IGNORECASE)
+        if match:
+            result[key] = int(match.group(1))
+        else:
+            for alt_pattern in alt_patterns.get(key, []):
+                match = re.search(alt_pattern, status_text, re.IGNORECASE)
+                if match:
+                    result[key] = int(match.group(1) if match.group(1) else match.group(2))
+                    break
+
+    return result
+
+def generate_statuses(count, seed=42):
+    """Синтетические статусы в разных форматах, которые встречаются на форуме"""
+    rng = random.Random(seed)
+
+    def num():
+        return f"{rng.choice(['', '+', '-'])}{rng.randint(0, 999)}"
+
+    formats = [
+        lambda: f"К:{num()} З:{num()}% Ш:{num()}%",
+        lambda: f"К: {num()} | З: {num()}% | Ш: {num()}%",
+        lambda: f"RP|FM|К:{num()}|З:{num()}|Ш:{num()}|M:5|S:-15",
+        lambda: f"кредиты: {num()} заражение: {num()}% шёпот: {num()}%",
+        lambda: f"credits:{num()} inf:{num()} whisper:{num()}",
+        lambda: f"Кредитов:{num()} Ш:{num()}",
+        lambda: "Новичок без статуса",
+        lambda: f"К:{num()}",
+    ]
+
+    return [rng.choice(formats)() for _ in range(count)]
+
+def run_benchmark(count=300_000):
+    print("=" * 60)
+    print(f"⏱️  БЕНЧМАРК parse_status ({count:,} строк)")
+    print("=" * 60)
+
+    statuses = generate_statuses(count)
+
+    start = time.perf_counter()
+    legacy = [legacy_parse_status(s) for s in statuses]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [parse_status(s) for s in statuses]
+    current_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = parse_status_batch(statuses)
+    batch_time = time.perf_counter() - start
+
+    # Результаты должны совпадать один в один
+    assert current == legacy, "parse_status расходится с прежней реализацией"
+    for key, column in columns.items():
+        assert column == [r.get(key) for r in legacy], f"parse_status_batch расходится по {key}"
+
+    print(f"   Прежний parse_status:  {legacy_time:.2f} с ({count / legacy_time:,.0f} строк/с)")
+    print(f"   Новый parse_status:    {current_time:.2f} с ({count / current_time:,.0f} строк/с)")
+    print(f"   parse_status_batch:    {batch_time:.2f} с ({count / batch_time:,.0f} строк/с)")
+    print(f"   Ускорение: x{legacy_time / current_time:.1f}")
+    print("✅ Результаты совпадают")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
@@ -9,6 +9,18 @@ import time
 import os
 from datetime import datetime
 
+from file_utils import REPO_ROOT, load_json
+from http_cache import HTTPCache
+from post_cursor import CursorStore
+from topic_index import TopicIndex
+from forum_client import DEFAULT_MAX_CONNECTIONS, DEFAULT_RATE_LIMIT, get_client
+from topic_fetcher import TopicFetcher, merge_topic_posts
+from post_aggregator import aggregate_posts
+from post_feed import PostFeed
+
+# Какие темы читать и с какой скоростью (см. data/forum_config.json)
+FORUM_CONFIG_FILE = os.path.join(REPO_ROOT, 'data', 'forum_config.json')
+
 # Импортируем функцию из нашего парсера
 try:
     from userlist_parser import fetch_all_players, save_players_data
@@ -43,112 +55,255 @@ class WotVCore:
         self.api_url = "https://warframe.f-rpg.me/api.php"
         self.players_file = "data/players/all_players.json"
         self.posts_file = "data/latest_posts.json"
+        # Условные запросы: если ответ API не изменился, тело берётся из кэша
+        self.http_cache = HTTPCache()
+        
+        # Чтение постов: темы, размер страницы API и курсоры последних обработанных постов
+        config = load_json(FORUM_CONFIG_FILE, {})
+        self.forum_ids = config.get('forum_ids', [])
+        self.topic_ids = config.get('topic_ids', [8])  # Тестовая тема ID=8
+        self.discover_topics = config.get('discover_topics', True)
+        self.posts_page_size = config.get('posts_page_size', 50)
+        self.topics_page_size = config.get('topics_page_size', 100)
+        self.posts_max_pages = int(os.environ.get('POSTS_MAX_PAGES', '200'))
+        self.post_cursors = CursorStore()
+        self.topic_index = TopicIndex()
+        self.post_feed = PostFeed()
+        
+        # Общий клиент форума: пул соединений, повторы и лимит запросов на все потоки
+        self.max_connections = min(config.get('max_connections', DEFAULT_MAX_CONNECTIONS), DEFAULT_MAX_CONNECTIONS)
+        self.client = get_client()
+        self.client.set_rate_limit(config.get('rate_limit', DEFAULT_RATE_LIMIT), config.get('burst'))
         
     def get_recent_posts(self, hours=24):
         """
-        Получает свежие посты за последние N часов через API
-        Сейчас работает с конкретной темой (ID=8 - тестовая)
+        Получает новые посты за последние N часов через API
+        
+        Темы с активностью в окне читаются параллельно (TopicFetcher), каждая - от новых
+        постов к старым, пока не дойдёт до уже обработанного поста (курсор темы).
+        Окно в N часов ограничивает только темы, которые ещё ни разу не читались:
+        если запуск был пропущен, посты с прошлого запуска всё равно дочитываются.
+        Курсоры сдвигаются в памяти, а сохраняются в ingest_posts, когда посты записаны в ленту.
+        Возвращает посты всех тем от новых к старым.
         """
         print(f"📝 Получаем посты за последние {hours} часов...")
         
         # Рассчитываем timestamp для фильтрации
         cutoff_time = int(time.time()) - (hours * 3600)
         
-        # Параметры API запроса - УКАЗЫВАЕМ КОНКРЕТНУЮ ТЕМУ
-        params = {
-            'method': 'post.get',
-            'topic_id': 8,  # Тестовая тема ID=8
-            'limit': 50,
-            'sort_by': 'id',
-            'sort_dir': 'desc'
-        }
+        # Список тем листается до последнего поста, известного индексу тем; если запуск
+        # был пропущен, граница уходит дальше окна, чтобы не потерять посты
+        last_run_mark = self.topic_index.last_post_date() or self.post_cursors.high_water_mark()
+        topics_since = min(cutoff_time, last_run_mark) if last_run_mark else cutoff_time
+        
+        topic_ids = self.list_active_topics(topics_since)
+        print(f"   Тем для чтения: {len(topic_ids)} (соединений: {self.max_connections}, "
+              f"лимит: {self.client.rate_limiter.rate if self.client.rate_limiter else 0:g} запр/с)")
+        
+        # Курсоры создаются заранее: потоки только читают и сдвигают свои
+        for topic_id in topic_ids:
+            self.post_cursors.cursor(f'topic:{topic_id}')
+        
+        start = time.time()
+        posts_by_topic, failed = TopicFetcher(self.max_connections).fetch(
+            topic_ids, lambda topic_id: self.read_topic_posts(topic_id, cutoff_time)
+        )
+        # Индекс кэша пишется на диск один раз за запуск
+        self.http_cache.flush()
+        
+        # Маркеры тем переносятся в индекс только для прочитанных без ошибок тем
+        self.topic_index.commit(posts_by_topic)
+        
+        for topic_id, error in failed.items():
+            if isinstance(error, requests.HTTPError):
+                print(f"❌ Ошибка API в теме {topic_id}: {error.response.status_code}")
+                print(f"   Текст ответа: {error.response.text[:100]}...")
+            else:
+                print(f"❌ Ошибка при получении постов темы {topic_id}: {error}")
+        
+        recent_posts = merge_topic_posts(posts_by_topic)
+        print(f"✅ Найдено {len(recent_posts)} новых постов в {sum(1 for p in posts_by_topic.values() if p)} темах "
+              f"за {time.time() - start:.1f} с")
+        
+        # Показываем пример для отладки
+        if recent_posts:
+            print(f"   Пример: {recent_posts[0]['username']} - '{recent_posts[0]['message'][:50]}...'")
+        
+        return recent_posts
+    
+    def ingest_posts(self, hours=24):
+        """
+        Скачивает новые посты и дописывает их в общую ленту (PostFeed).
+        Потребители читают ленту сами, поэтому каждый пост скачивается один раз,
+        какой бы из запусков (ежедневный или социальный) ни пришёл за ним первым.
+        Возвращает число новых постов в ленте.
+        """
+        added = self.post_feed.append(self.get_recent_posts(hours=hours))
+        
+        # Посты надёжно лежат в ленте - курсоры и индекс тем можно сохранять
+        self.post_cursors.save()
+        self.topic_index.save()
+        
+        print(f"📥 В ленту добавлено постов: {added}")
+        return added
+    
+    def list_active_topics(self, cutoff_time):
+        """
+        Темы, в которых появились новые посты.
+        topic.get отдаёт темы по дате последнего поста; листаем (обычно одну страницу),
+        пока не дойдём до тем без постов после cutoff_time. Из них берутся только темы,
+        маркер последнего поста которых сдвинулся по сравнению с индексом тем.
+        Если список тем получить не удалось - читаем темы из конфигурации.
+        """
+        configured = list(self.topic_ids)
+        if not self.discover_topics:
+            return configured
         
+        active = []
         try:
-            response = requests.get(self.api_url, params=params, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
+            skip = 0
+            while True:
+                topics = self.fetch_topics_page(skip)
+                recent = []
+                for topic in topics:
+                    last_post_date = int(topic.get('last_post_date') or 0)
+                    if last_post_date and last_post_date <= cutoff_time:
+                        break  # Дальше только темы без новых постов
+                    recent.append(topic)
                 
-                # Проверяем структуру ответа
-                if 'response' in data:
-                    posts = data['response']
-                    
-                    if isinstance(posts, list) and posts:
-                        # Фильтруем по времени
-                        recent_posts = []
-                        for post in posts:
-                            post_time = int(post.get('posted', 0))
-                            if post_time > cutoff_time:
-                                recent_posts.append(post)
-                        
-                        print(f"✅ Найдено {len(recent_posts)} новых постов (всего {len(posts)})")
-                        
-                        # Показываем пример для отладки
-                        if recent_posts:
-                            print(f"   Пример: {recent_posts[0]['username']} - '{recent_posts[0]['message'][:50]}...'")
-                        
-                        return recent_posts
-                    else:
-                        print(f"⚠️  Постов не найдено или ответ не список")
-                        return []
-                else:
-                    print(f"⚠️  В ответе API нет 'response'")
-                    # Сохраним ответ для отладки
-                    print(f"   Ответ API: {json.dumps(data, indent=2)[:200]}...")
-                    return []
-            else:
-                print(f"❌ Ошибка API: {response.status_code}")
-                print(f"   Текст ответа: {response.text[:100]}...")
-                return []
+                active.extend(self.topic_index.changed(recent))
                 
+                if len(recent) < len(topics) or len(topics) < self.topics_page_size:
+                    break
+                skip += self.topics_page_size
         except Exception as e:
-            print(f"❌ Ошибка при получении постов: {e}")
-            return []
+            print(f"⚠️  Не удалось получить список тем ({e}), читаем темы из конфигурации")
+            return configured
+        
+        # Явно указанные темы читаются всегда (курсор всё равно отсечёт старое)
+        return active + [topic_id for topic_id in configured if topic_id not in active]
     
-    def analyze_posts_for_stats(self, posts):
+    def fetch_topics_page(self, skip=0):
+        """Одна страница topic.get: темы по убыванию даты последнего поста"""
+        params = {
+            'method': 'topic.get',
+            'fields': 'id,forum_id,num_replies,last_post_id,last_post_date',
+            'sort_by': 'last_post',
+            'sort_dir': 'desc',
+            'limit': self.topics_page_size,
+            'skip': skip
+        }
+        if self.forum_ids:
+            params['forum_id'] = ','.join(str(forum_id) for forum_id in self.forum_ids)
+        
+        response = self.api_get(params)
+        topics = response.json().get('response')
+        if not isinstance(topics, list):
+            raise ValueError(f"неожиданный ответ topic.get: {response.text[:100]}")
+        return topics
+    
+    def read_topic_posts(self, topic_id, cutoff_time):
         """
-        Анализирует посты для обновления статистики игроков
+        Новые посты одной темы (от новых к старым).
+        Листает post.get (skip/limit), пока не дойдёт до курсора темы.
+        cutoff_time учитывается только для темы без сохранённого курсора (первое чтение).
+        Курсор сдвигается только если тема прочитана без ошибок.
         """
-        if not posts:
-            print("📊 Нет постов для анализа")
-            return {}
-        
-        print("📊 Анализируем активность в постах...")
+        cursor = self.post_cursors.cursor(f'topic:{topic_id}')
+        window_start = cutoff_time if not cursor.last_post_id else 0
         
-        # Считаем посты по игрокам
-        user_activity = {}
+        recent_posts = []
+        seen_ids = set()
+        pages = 0
         
-        for post in posts:
-            user_id = post.get('user_id')
-            if not user_id:
-                continue
-            
-            try:
-                user_id = int(user_id)
-            except ValueError:
-                continue
+        while True:
+            page_posts = self.fetch_posts_page(topic_id, skip=pages * self.posts_page_size)
+            pages += 1
             
-            if user_id not in user_activity:
-                user_activity[user_id] = {
-                    'post_count': 0,
-                    'last_post': post.get('posted'),
-                    'topics': set()
-                }
+            caught_up = False
+            for post in page_posts:
+                if not cursor.is_new(post) or int(post.get('posted', 0)) <= window_start:
+                    caught_up = True
+                    break
+                # Пока листаем, могут появиться новые посты и сдвинуть страницы - убираем повторы
+                if post.get('id') not in seen_ids:
+                    seen_ids.add(post.get('id'))
+                    recent_posts.append(post)
             
-            user_activity[user_id]['post_count'] += 1
-            topic_id = post.get('topic_id')
-            if topic_id:
-                user_activity[user_id]['topics'].add(topic_id)
+            if caught_up or len(page_posts) < self.posts_page_size:
+                break
+            if pages >= self.posts_max_pages:
+                print(f"⚠️  Тема {topic_id}: достигнут лимит в {self.posts_max_pages} страниц, более старые посты пропущены")
+                break
+        
+        cursor.advance(recent_posts)
+        return recent_posts
+    
+    def fetch_posts_page(self, topic_id, skip=0):
+        """Одна страница post.get темы (от новых постов к старым)"""
+        params = {
+            'method': 'post.get',
+            'topic_id': topic_id,
+            'limit': self.posts_page_size,
+            'skip': skip,
+            'sort_by': 'id',
+            'sort_dir': 'desc'
+        }
+        
+        response = self.api_get(params)
+        data = response.json()
         
-        # Преобразуем в удобный формат
-        for user_id, data in user_activity.items():
-            data['unique_topics'] = len(data['topics'])
-            # Удаляем set, он не сериализуется в JSON
-            data.pop('topics', None)
+        # Проверяем структуру ответа
+        if 'response' not in data:
+            raise ValueError(f"в ответе API нет 'response': {json.dumps(data)[:200]}")
+        
+        posts = data['response']
+        return posts if isinstance(posts, list) else []
+    
+    def api_get(self, params):
+        """GET к API форума через общий клиент и кэш условных запросов"""
+        return self.http_cache.fetch(self.api_url, params=params, timeout=15, session=self.client)
+    
+    def consume_post_feed(self):
+        """
+        Обрабатывает новые записи ленты: статистика активности и социальные теги
+        считаются параллельно по одним и тем же постам.
+        Социальная часть подключается, если доступен update_social_profiles;
+        иначе её дочитает собственный запуск update_social_profiles.
+        Возвращает (user_activity, число социальных взаимодействий).
+        """
+        handlers = {'stats': self.analyze_posts_for_stats}
+        try:
+            from update_social_profiles import process_posts
+            handlers['social'] = process_posts
+        except ImportError as e:
+            print(f"   ⚠️ Социальные теги пропущены ({e})")
+        
+        results, failed = self.post_feed.dispatch(handlers)
+        for name, error in failed.items():
+            print(f"❌ Потребитель ленты '{name}' не справился: {error} (дочитает в следующий запуск)")
+        
+        return results.get('stats', {}), results.get('social', 0)
+    
+    def analyze_posts_for_stats(self, posts, workers=None):
+        """
+        Анализирует посты для обновления статистики игроков.
+        posts - список или любой итератор постов; workers - процессов для агрегации
+        (по умолчанию POST_STATS_WORKERS)
+        """
+        print("📊 Анализируем активность в постах...")
+        
+        user_activity = aggregate_posts(posts, workers=workers).result()
+        if not user_activity:
+            print("📊 Нет постов для анализа")
+            return {}
         
         print(f"📈 Активность {len(user_activity)} игроков")
-        for user_id, activity in user_activity.items():
-            print(f"   👤 ID:{user_id}: {activity['post_count']} постов")
+        most_active = sorted(user_activity.items(), key=lambda item: item[1]['post_count'], reverse=True)
+        for user_id, activity in most_active[:5]:
+            print(f"   👤 ID:{user_id}: {activity['post_count']} постов, тем: {activity['unique_topics']}")
+        if len(most_active) > 5:
+            print(f"   ... и ещё {len(most_active) - 5}")
         
         return user_activity
     
@@ -170,6 +325,13 @@ class WotVCore:
             use_calculator = False
             print("   ⚠️ GameCalculator не найден, используется базовая логика")
         
+        if use_calculator:
+            try:
+                # Все игроки считаются одним пакетом (NumPy, если установлен)
+                return self._calculate_changes_batch(calculator, players_data, user_activity)
+            except Exception as e:
+                print(f"   ⚠️ Пакетный расчёт не удался ({e}), считаем по одному игроку")
+        
         for user_id_str, player_data in players_data.items():
             try:
                 user_id_int = int(user_id_str)
@@ -215,6 +377,36 @@ class WotVCore:
         
         return changes
     
+    def _calculate_changes_batch(self, calculator, players_data, user_activity):
+        """Рассчитывает изменения для всех игроков одним вызовом calculate_progression_batch"""
+        user_ids = list(players_data)
+        activities = [user_activity.get(int(user_id), {}) for user_id in user_ids]
+        player_values = [players_data[user_id]['data'] for user_id in user_ids]
+        
+        progression = calculator.calculate_progression_batch(
+            credits=[data.get('credits', 0) for data in player_values],
+            infection=[data.get('infection', 0) for data in player_values],
+            whisper=[data.get('whisper', 0) for data in player_values],
+            post_count=[activity.get('post_count', 0) for activity in activities],
+            unique_topics=[activity.get('unique_topics', 0) for activity in activities],
+            days_since_reg=30  # Можно рассчитать из registered даты
+        )
+        
+        changes = {}
+        for i, user_id_str in enumerate(user_ids):
+            changes[user_id_str] = {
+                'credits': progression['credits_change'][i],
+                'infection': progression['infection_change'][i],
+                'whisper': progression['whisper_change'][i]
+            }
+            
+            print(f"   👤 {players_data[user_id_str].get('username', f'ID:{user_id_str}')}: "
+                  f"{changes[user_id_str]['credits']:+d}💰, "
+                  f"{changes[user_id_str]['infection']:+.1f}%🦠, "
+                  f"{changes[user_id_str]['whisper']:+.1f}%👁️")
+        
+        return changes
+    
     def update_players_data(self, players_data, changes):
         """
         Обновляет данные игроков на основе изменений
@@ -278,12 +470,12 @@ class WotVCore:
         
         print(f"   Найдено {len(players_data)} игроков")
         
-        # 2. Получаем свежие посты
+        # 2. Получаем свежие посты (в общую ленту)
         print("\n2. 📝 Анализируем активность...")
-        recent_posts = self.get_recent_posts(hours=24)
+        self.ingest_posts(hours=24)
         
-        # 3. Анализируем активность
-        user_activity = self.analyze_posts_for_stats(recent_posts)
+        # 3. Раздаём ленту потребителям: статистике и социальным отношениям
+        user_activity, social_count = self.consume_post_feed()
         
         # 4. Рассчитываем изменения
         print("\n3. 🧮 Рассчитываем изменения показателей...")
@@ -293,6 +485,9 @@ class WotVCore:
         print("\n4. 💾 Сохраняем обновлённые данные...")
         updated_count = self.update_players_data(players_data, changes)
         
+        # Посты учтены - запоминаем, до какой записи ленты дочитал каждый потребитель
+        self.post_feed.save()
+        
         # 6. Генерируем отчёт
         print("\n5. 📊 Генерируем отчёт...")
         self.generate_daily_report(players_data, user_activity, changes)
@@ -306,8 +501,10 @@ class WotVCore:
         print(f"📊 Итоги:")
         print(f"   👥 Игроков обработано: {len(players_data)}")
         print(f"   ✍️  Активных игроков: {len(user_activity)}")
+        print(f"   🤝 Социальных взаимодействий: {social_count}")
         print(f"   🔄 Обновлено записей: {updated_count}")
         print(f"   ⏱️  Время выполнения: {elapsed_time:.2f} секунд")
+        print(f"   🌐 Форум: {self.client.summary()}")
         
         # Показываем текущие данные Void для проверки
         print(f"\n📊 Текущие данные Void (ID:2):")
@@ -330,6 +527,7 @@ class WotVCore:
             'total_players': len(players_data),
             'active_players': len(user_activity),
             'top_contributors': [],
+            'forum_client': self.client.metrics(),
             'summary': {
                 'total_credits_added': sum(c.get('credits', 0) for c in changes.values()),
                 'total_infection_change': sum(c.get('infection', 0) for c in changes.values()),
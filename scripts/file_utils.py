@@ -0,0 +1,66 @@
+"""
+Вспомогательные функции для работы с файлами данных
+Атомарная запись: файл либо старый, либо новый целиком, но никогда не недописанный
+"""
+
+import json
+import os
+import tempfile
+
+# Корень репозитория (скрипты запускаются и из корня, и из scripts/)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def atomic_write_bytes(path, data):
+    """Записывает байты во временный файл рядом и переименовывает его поверх path"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_text(path, text):
+    atomic_write_bytes(path, text.encode('utf-8'))
+
+
+def atomic_write_json(path, data, indent=2):
+    """Сохраняет JSON так же, как json.dump(..., ensure_ascii=False, indent=2), но атомарно"""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def write_json_if_changed(path, data, indent=2):
+    """
+    Атомарно сохраняет JSON, только если содержимое файла действительно изменится.
+    Возвращает True, если файл был перезаписан.
+    """
+    text = json.dumps(data, ensure_ascii=False, indent=indent)
+    encoded = text.encode('utf-8')
+
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == encoded:
+                return False
+    except FileNotFoundError:
+        pass
+
+    atomic_write_bytes(path, encoded)
+    return True
+
+
+def load_json(path, default=None):
+    """Читает JSON; если файла нет или он повреждён - возвращает default"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
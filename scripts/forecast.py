@@ -0,0 +1,270 @@
+"""
+Прогноз развития игроков на N дней вперёд
+Берёт текущий all_players.json (или синтетическую популяцию) и модель активности,
+каждый день применяет calculate_progression_batch и ограничения из WotVCore.update_players_data.
+На выходе - распределения уровня, кредитов, заражения и шёпота по дням.
+
+Запуск:
+    python scripts/forecast.py --days 90
+    python scripts/forecast.py --days 365 --synthetic 100000 --output forecast.json
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from game_calculator import GameCalculator, NUMPY_AVAILABLE
+from file_utils import REPO_ROOT, atomic_write_json, load_json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PLAYERS_FILE = os.path.join(REPO_ROOT, 'data', 'players', 'all_players.json')
+
+# Ограничения значений, как в WotVCore.update_players_data
+INFECTION_LIMITS = (0, 100)
+WHISPER_LIMITS = (-100, 300)
+
+# Перцентили, которые попадают в отчёт по каждому дню
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+
+class Population:
+    """
+    Популяция игроков в виде столбцов NumPy.
+    has_* - есть ли показатель в данных игрока: как и в ядре, отсутствующие
+    показатели не появляются сами по себе.
+    """
+
+    def __init__(self, credits, infection, whisper, post_rate, has_credits=None, has_infection=None, has_whisper=None):
+        self.credits = np.asarray(credits, dtype=np.int64)
+        self.infection = np.asarray(infection, dtype=np.float64)
+        self.whisper = np.asarray(whisper, dtype=np.float64)
+        self.post_rate = np.asarray(post_rate, dtype=np.float64)  # Среднее число постов в день
+
+        size = len(self.credits)
+        self.has_credits = np.ones(size, dtype=bool) if has_credits is None else np.asarray(has_credits, dtype=bool)
+        self.has_infection = np.ones(size, dtype=bool) if has_infection is None else np.asarray(has_infection, dtype=bool)
+        self.has_whisper = np.ones(size, dtype=bool) if has_whisper is None else np.asarray(has_whisper, dtype=bool)
+
+    def __len__(self):
+        return len(self.credits)
+
+    @classmethod
+    def from_players(cls, players, today=None):
+        """Собирает популяцию из словаря {user_id: данные_игрока} (формат all_players.json)"""
+        today = today or datetime.now()
+        values = [player.get('data', {}) for player in players.values()]
+
+        post_rate = []
+        for player in players.values():
+            stats = player.get('forum_stats', {})
+            try:
+                days = max(1, (today - datetime.strptime(stats.get('registered', ''), '%Y-%m-%d')).days)
+            except ValueError:
+                days = 30
+            post_rate.append(stats.get('posts', 0) / days)
+
+        return cls(
+            credits=[data.get('credits', 0) for data in values],
+            infection=[data.get('infection', 0) for data in values],
+            whisper=[data.get('whisper', 0) for data in values],
+            post_rate=post_rate,
+            has_credits=['credits' in data for data in values],
+            has_infection=['infection' in data for data in values],
+            has_whisper=['whisper' in data for data in values]
+        )
+
+    @classmethod
+    def synthetic(cls, size, seed=None):
+        """Синтетическая популяция: немного активных игроков и много молчаливых"""
+        rng = np.random.default_rng(seed)
+        return cls(
+            credits=rng.integers(0, 1000, size),
+            infection=rng.uniform(0, 30, size).round(1),
+            whisper=rng.integers(-20, 60, size).astype(np.float64),
+            post_rate=rng.lognormal(mean=-1.5, sigma=1.2, size=size)
+        )
+
+
+class ActivityModel:
+    """
+    Модель активности на форуме.
+    Посты за день - пуассоновские с индивидуальной интенсивностью игрока (Population.post_rate),
+    умноженной на activity_scale. Каждый пост, кроме первого, с вероятностью topic_share
+    приходится на новую тему.
+    """
+
+    def __init__(self, activity_scale=1.0, topic_share=0.4, max_posts_per_day=50):
+        self.activity_scale = activity_scale
+        self.topic_share = topic_share
+        self.max_posts_per_day = max_posts_per_day
+
+    def sample(self, rng, population):
+        """Возвращает (post_count, unique_topics) на один день"""
+        post_count = np.minimum(rng.poisson(population.post_rate * self.activity_scale), self.max_posts_per_day)
+        unique_topics = np.minimum(post_count, 1)
+
+        # Биномиальное распределение дорогое, поэтому разыгрываем его только для тех, у кого больше одного поста
+        several = np.flatnonzero(post_count > 1)
+        unique_topics[several] += rng.binomial(post_count[several] - 1, self.topic_share)
+        return post_count, unique_topics
+
+
+class ForecastEngine:
+    """
+    Прогоняет популяцию вперёд день за днём.
+    Один день = calculate_progression_batch по всем игрокам + ограничения ядра.
+    """
+
+    def __init__(self, calculator=None, activity=None, days_since_reg=30, percentiles=DEFAULT_PERCENTILES, seed=None):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Для прогноза нужен NumPy: pip install numpy")
+
+        self.calculator = calculator or GameCalculator()
+        self.activity = activity or ActivityModel()
+        self.days_since_reg = days_since_reg  # Как в ядре: пока фиксированное значение
+        self.percentiles = tuple(percentiles)
+        self.rng = np.random.default_rng(seed)
+
+    def step(self, population):
+        """Один день: начисляет изменения и ограничивает значения (популяция меняется на месте)"""
+        post_count, unique_topics = self.activity.sample(self.rng, population)
+
+        progression = self.calculator.calculate_progression_batch(
+            population.credits, population.infection, population.whisper,
+            post_count=post_count, unique_topics=unique_topics,
+            days_since_reg=self.days_since_reg, as_arrays=True
+        )
+
+        population.credits = np.where(population.has_credits, progression['credits'], population.credits)
+        population.infection = np.where(
+            population.has_infection,
+            np.clip(progression['infection'], *INFECTION_LIMITS),
+            population.infection
+        )
+        population.whisper = np.where(
+            population.has_whisper,
+            np.clip(progression['whisper'], *WHISPER_LIMITS),
+            population.whisper
+        )
+
+    def levels(self, population):
+        """Уровни, которые покажет userlist_parser на следующий день (без бонуса за посты)"""
+        xp = self.calculator.calculate_xp_batch(
+            population.credits, population.infection, population.whisper,
+            days_since_reg=self.days_since_reg, post_count=0, as_arrays=True
+        )
+        return self.calculator.calculate_level_from_xp_batch(xp, as_arrays=True)
+
+    def summarize(self, day, population):
+        """Сводка распределений за день"""
+        levels = self.levels(population)
+        counts = np.bincount(levels, minlength=self.calculator.MAX_LEVEL + 1)
+
+        summary = {
+            'day': day,
+            'level': {
+                'mean': float(levels.mean()) if len(levels) else 0.0,
+                'counts': {int(level): int(count) for level, count in enumerate(counts) if count}
+            }
+        }
+        for key in ('credits', 'infection', 'whisper'):
+            column = getattr(population, key)[getattr(population, f'has_{key}')]
+            summary[key] = self._distribution(column)
+
+        return summary
+
+    def run(self, population, days, report_every=1):
+        """
+        Прогоняет популяцию на days дней.
+        Возвращает список сводок: день 0 (исходное состояние) и каждый report_every-й день.
+        """
+        reports = [self.summarize(0, population)]
+        for day in range(1, days + 1):
+            self.step(population)
+            if day % report_every == 0 or day == days:
+                reports.append(self.summarize(day, population))
+        return reports
+
+    def _distribution(self, column):
+        if not len(column):
+            return {'mean': None, **{f'p{p}': None for p in self.percentiles}}
+
+        values = np.percentile(column, self.percentiles)
+        return {
+            'mean': round(float(column.mean()), 3),
+            **{f'p{p}': round(float(v), 3) for p, v in zip(self.percentiles, values)}
+        }
+
+
+def print_report(reports):
+    """Краткая таблица прогноза"""
+    print(f"{'День':>5} | {'Ур.ср':>6} | {'💰 p50':>8} | {'🦠 p50':>7} | {'👁️ p50':>7} | {'🦠 p90':>7} | {'👁️ p90':>7}")
+    print("-" * 66)
+    for report in reports:
+        print(f"{report['day']:>5} | {report['level']['mean']:>6.2f} | "
+              f"{_fmt(report['credits'].get('p50')):>8} | {_fmt(report['infection'].get('p50')):>7} | "
+              f"{_fmt(report['whisper'].get('p50')):>7} | {_fmt(report['infection'].get('p90')):>7} | "
+              f"{_fmt(report['whisper'].get('p90')):>7}")
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Прогноз развития игроков Whisper of the Void')
+    parser.add_argument('--days', type=int, default=30, help='на сколько дней прогнозировать')
+    parser.add_argument('--players', default=DEFAULT_PLAYERS_FILE, help='файл all_players.json')
+    parser.add_argument('--synthetic', type=int, default=0, help='вместо реальных игроков взять N синтетических')
+    parser.add_argument('--activity-scale', type=float, default=1.0, help='множитель активности на форуме')
+    parser.add_argument('--topic-share', type=float, default=0.4, help='доля постов в новых темах')
+    parser.add_argument('--report-every', type=int, default=1, help='шаг сводок в днях')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help='сохранить сводки в JSON')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔮 ПРОГНОЗ WHISPER OF THE VOID")
+    print("=" * 60)
+
+    if args.synthetic:
+        population = Population.synthetic(args.synthetic, seed=args.seed)
+        print(f"👥 Синтетическая популяция: {len(population):,} игроков")
+    else:
+        players = load_json(args.players, {})
+        if not players:
+            print(f"❌ Нет данных игроков в {args.players}")
+            return
+        population = Population.from_players(players)
+        print(f"👥 Игроков из {args.players}: {len(population):,}")
+
+    engine = ForecastEngine(
+        activity=ActivityModel(activity_scale=args.activity_scale, topic_share=args.topic_share),
+        seed=args.seed
+    )
+
+    start = time.perf_counter()
+    reports = engine.run(population, args.days, report_every=args.report_every)
+    elapsed = time.perf_counter() - start
+
+    print_report(reports)
+    print(f"\n⏱️  {args.days} дней за {elapsed:.2f} с")
+
+    if args.output:
+        atomic_write_json(args.output, {
+            'generated_at': datetime.now().isoformat(),
+            'days': args.days,
+            'players': len(population),
+            'balance': engine.calculator.balance_fingerprint(),
+            'reports': reports
+        })
+        print(f"💾 Сводки сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Общий HTTP-клиент форума
+Одна сессия с пулом keep-alive соединений на весь процесс: TCP/TLS устанавливаются
+один раз за запуск. Временные ошибки форума (429, 5xx, обрывы соединения, таймауты)
+повторяются с экспоненциальной задержкой со случайным разбросом, Retry-After соблюдается.
+Все запросы проходят через общий token bucket и учитываются в статистике.
+Число одновременных запросов подбирает AIMDController: растёт, пока форум отвечает
+быстро и без ошибок, и резко снижается на 429, таймаутах и скачках задержки.
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RATE_LIMIT = float(os.environ.get('WOTV_RATE_LIMIT', '5'))          # запросов в секунду на весь форум
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get('WOTV_MAX_CONNECTIONS', '8'))  # одновременных соединений с форумом
+DEFAULT_TIMEOUT = 15
+DEFAULT_RETRIES = 3
+
+# Адаптивное число одновременных запросов (AIMD); off - всегда max_connections
+ADAPTIVE_CONCURRENCY = os.environ.get('WOTV_ADAPTIVE_CONCURRENCY', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Ответы, которые имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 120  # Больше ждать не будем, даже если форум просит
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket.
+    rate - сколько токенов (запросов) добавляется в секунду, burst - ёмкость ведра.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Забирает токен, при необходимости дожидаясь его. Возвращает время ожидания в секундах.
+        Токен резервируется сразу (баланс может уйти в минус), поэтому потоки
+        получают свои очереди без повторных попыток.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class AIMDController:
+    """
+    Окно одновременных запросов с аддитивным ростом и мультипликативным сбросом.
+    Пока ответы успешные и быстрые, окно растёт примерно на 1 за "круг" запросов
+    (+1/окно за каждый успех). На 429, 5xx, таймауты и скачки задержки
+    (в spike_factor раз выше скользящего среднего) окно умножается на decrease.
+    Сброс срабатывает не чаще раза на поколение запросов: ошибки запросов,
+    начатых до прошлого сброса, окно повторно не уменьшают.
+    """
+
+    def __init__(self, max_window, min_window=1, initial_window=2, decrease=0.5,
+                 spike_factor=3.0, latency_alpha=0.2, warmup=5):
+        self.max_window = max(min_window, max_window)
+        self.min_window = min_window
+        self.window = float(min(max(initial_window, min_window), self.max_window))
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.latency_alpha = latency_alpha
+        self.warmup = warmup
+
+        self.in_flight = 0
+        self.latency_avg = None
+        self._samples = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+        self.stats = {'window_min': self.window, 'window_max': self.window, 'decreases': 0}
+
+    def acquire(self):
+        """Ждёт места в окне. Возвращает поколение (передаётся в release)"""
+        with self._condition:
+            while self.in_flight >= int(self.window):
+                self._condition.wait()
+            self.in_flight += 1
+            return self._generation
+
+    def release(self, generation, ok, latency=None):
+        """Учитывает результат запроса и подстраивает окно"""
+        with self._condition:
+            self.in_flight -= 1
+
+            spike = (ok and latency is not None and self._samples >= self.warmup
+                     and latency > self.latency_avg * self.spike_factor)
+
+            if ok and latency is not None:
+                self._samples += 1
+                self.latency_avg = latency if self.latency_avg is None else (
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * self.latency_avg)
+
+            if (not ok or spike) and generation == self._generation:
+                self.window = max(self.min_window, self.window * self.decrease)
+                self._generation += 1
+                self.stats['decreases'] += 1
+            elif ok and not spike:
+                self.window = min(self.max_window, self.window + 1 / self.window)
+
+            self.stats['window_min'] = min(self.stats['window_min'], self.window)
+            self.stats['window_max'] = max(self.stats['window_max'], self.window)
+            self._condition.notify_all()
+
+
+def make_session(max_connections, headers=None):
+    """
+    Сессия requests с общим пулом соединений.
+    pool_block=True: если все max_connections заняты, запрос ждёт свободное соединение.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def parse_retry_after(value):
+    """Retry-After в секундах: число или HTTP-дата. None, если заголовка нет или он непонятен"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ForumClient:
+    """
+    Клиент с тем же интерфейсом get(), что и requests/Session, поэтому его можно
+    передать в HTTPCache.fetch(session=...).
+    Возвращает последний ответ (в том числе 4xx/5xx - raise_for_status остаётся
+    вызывающему коду); исключения сети пробрасываются, когда попытки закончились.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, rate_limit=DEFAULT_RATE_LIMIT, burst=None,
+                 retries=DEFAULT_RETRIES, backoff_base=1.0, backoff_max=30.0, timeout=DEFAULT_TIMEOUT,
+                 headers=None, session=None, adaptive=ADAPTIVE_CONCURRENCY, sleep=time.sleep):
+        self.max_connections = max_connections
+        self.session = session or make_session(max_connections, headers)
+        self.rate_limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.controller = AIMDController(max_connections) if adaptive else None
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'bytes': 0,
+                      'latency_total': 0.0, 'latency_max': 0.0}
+
+    def set_rate_limit(self, rate, burst=None):
+        """Меняет общий лимит запросов (None или 0 - без лимита)"""
+        self.rate_limiter = TokenBucket(rate, burst) if rate else None
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """GET с повторами временных ошибок"""
+        timeout = timeout or self.timeout
+
+        for attempt in range(self.retries + 1):
+            generation = self.controller.acquire() if self.controller else None
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(generation, time.monotonic() - start, 0, failed=True)
+                if attempt == self.retries:
+                    raise
+                self._retry(attempt, None, e)
+                continue
+            except BaseException:
+                if self.controller:
+                    self.controller.release(generation, ok=True)
+                raise
+
+            self._record(generation, time.monotonic() - start, len(response.content or b''),
+                         failed=response.status_code in RETRY_STATUSES)
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            self._retry(attempt, parse_retry_after(response.headers.get('Retry-After')),
+                        f"HTTP {response.status_code}")
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Задержка перед повтором: Retry-After, если форум его прислал, иначе экспонента с разбросом"""
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_AFTER)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def metrics(self):
+        """Снимок статистики, включая текущее окно одновременных запросов"""
+        with self._lock:
+            metrics = dict(self.stats)
+        if self.controller:
+            metrics['window'] = round(self.controller.window, 2)
+            metrics.update({key: round(value, 2) for key, value in self.controller.stats.items()})
+        else:
+            metrics['window'] = self.max_connections
+        return metrics
+
+    def summary(self):
+        """Строка статистики для логов"""
+        stats = self.metrics()
+        average = stats['latency_total'] / stats['requests'] * 1000 if stats['requests'] else 0
+        return (f"запросов: {stats['requests']}, повторов: {stats['retries']}, ошибок: {stats['failures']}, "
+                f"{stats['bytes'] / 1024:.0f} КБ, задержка ср. {average:.0f} мс / макс. {stats['latency_max'] * 1000:.0f} мс, "
+                f"окно: {stats['window']:g}")
+
+    # === Внутренние методы ===
+
+    def _record(self, generation, latency, size, failed=False):
+        if self.controller:
+            self.controller.release(generation, ok=not failed, latency=latency)
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats['latency_total'] += latency
+            self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+            if failed:
+                self.stats['failures'] += 1
+
+    def _retry(self, attempt, retry_after, reason):
+        delay = self.backoff_delay(attempt, retry_after)
+        with self._lock:
+            self.stats['retries'] += 1
+        print(f"   🔁 {reason}, повтор через {delay:.1f} с ({attempt + 1}/{self.retries})")
+        self._sleep(delay)
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    """Общий клиент процесса: и список игроков, и API постов ходят через одну сессию"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = ForumClient()
+        return _shared_client
@@ -3,7 +3,18 @@
 Содержит формулы для прогрессии, заражения, шёпота и т.д.
 """
 
+import bisect
+import hashlib
+import json
 import math
+from types import MappingProxyType
+
+# NumPy ускоряет пакетные расчёты, но не обязателен
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 class GameCalculator:
     """Калькулятор игровых формул с системой уровней и ограничениями отображения"""
@@ -21,7 +32,26 @@ class GameCalculator:
         self.LEVEL_EXPONENT = 1.8
         self.MAX_DISPLAY_INFECTION = 100  # Максимальное отображаемое значение заражения
         self.MAX_DISPLAY_WHISPER = 100    # Максимальное отображаемое значение шёпота
+        self.MAX_LEVEL = 100
+        
+        # Таблица порогов XP строится лениво и пересобирается при смене констант уровней
+        self._level_table_key = None
+        self._xp_thresholds = []
+        self._level_records = []
+        
+    def balance_fingerprint(self):
+        """
+        Отпечаток текущего баланса: все константы (КАПСОМ) и исходный код формул.
+        Меняется при любой правке констант или формул - по нему сбрасываются кэши расчётов.
+        """
+        constants = {name: value for name, value in vars(self).items() if name.isupper()}
         
+        with open(__file__, 'rb') as f:
+            source_hash = hashlib.sha1(f.read()).hexdigest()
+        
+        payload = json.dumps(constants, sort_keys=True) + source_hash
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
     def calculate_player_progression(self, player_data, activity, days_since_reg=30):
         """
         Основной метод расчета прогрессии игрока
@@ -64,7 +94,7 @@ class GameCalculator:
         # 7. Получаем информацию об уровне
         level_info = self.get_level_info(level)
         next_level_info = self.get_level_info(level + 1)
-        xp_to_next = next_level_info['xp_required'] - xp if level < 100 else 0
+        xp_to_next = next_level_info['xp_required'] - xp if level < self.MAX_LEVEL else 0
         
         return {
             'current': {
@@ -86,7 +116,7 @@ class GameCalculator:
             'progression': {
                 'xp_to_next_level': xp_to_next,
                 'current_level_info': level_info,
-                'next_level_info': next_level_info if level < 100 else None,
+                'next_level_info': next_level_info if level < self.MAX_LEVEL else None,
                 'has_exceeded_infection': new_infection > self.MAX_DISPLAY_INFECTION,
                 'has_exceeded_whisper': new_whisper > self.MAX_DISPLAY_WHISPER,
                 'real_infection': new_infection,
@@ -128,15 +158,11 @@ class GameCalculator:
     def calculate_level_from_xp(self, xp):
         """
         Рассчитывает уровень игрока на основе XP
+        (бинарный поиск по таблице порогов уровней 1..MAX_LEVEL)
         """
-        level = 1
-        for lvl in range(1, 101):  # До 100 уровней
-            level_info = self.get_level_info(lvl)
-            if xp >= level_info['xp_required']:
-                level = lvl
-            else:
-                break
-        return level
+        thresholds, _ = self._get_level_table()
+        # Количество порогов уровней 1..MAX_LEVEL, которые XP уже достиг
+        return max(1, bisect.bisect_right(thresholds, xp, 0, self.MAX_LEVEL))
     
     def get_level_info(self, level):
         """
@@ -144,7 +170,14 @@ class GameCalculator:
         """
         if level < 1:
             level = 1
-            
+        
+        _, records = self._get_level_table()
+        if level <= len(records):
+            return dict(records[level - 1])
+        
+        return self._build_level_info(level)
+    
+    def _build_level_info(self, level):
         # XP требуется для достижения этого уровня
         xp_required = int(self.BASE_XP_PER_LEVEL * math.pow(level, self.LEVEL_EXPONENT))
         
@@ -161,6 +194,21 @@ class GameCalculator:
             'whisper_bonus': whisper_bonus
         }
     
+    def _get_level_table(self):
+        """
+        Таблица уровней 1..MAX_LEVEL+1: пороги XP для bisect и неизменяемые записи уровней.
+        Следующий за максимальным уровень нужен для расчёта XP до следующего уровня.
+        """
+        key = (self.BASE_XP_PER_LEVEL, self.LEVEL_EXPONENT, self.MAX_LEVEL)
+        if self._level_table_key != key:
+            records = [MappingProxyType(self._build_level_info(level))
+                       for level in range(1, self.MAX_LEVEL + 2)]
+            self._level_records = records
+            self._xp_thresholds = [record['xp_required'] for record in records]
+            self._level_table_key = key
+        
+        return self._xp_thresholds, self._level_records
+    
     def get_display_values(self, infection, whisper):
         """
         Возвращает значения для отображения (с ограничением до 100%)
@@ -174,6 +222,160 @@ class GameCalculator:
             'real_whisper': whisper
         }
     
+    # === Пакетные расчёты ===
+    # Принимают столбцы (списки или массивы NumPy) по всем игрокам сразу, скаляры
+    # растягиваются на весь столбец. Результаты совпадают со скалярными методами.
+    # Без NumPy используется простой цикл по скалярным методам.
+    
+    def calculate_xp_batch(self, credits, infection, whisper, days_since_reg=30, post_count=0, as_arrays=False):
+        """
+        Пакетная версия calculate_xp.
+        Возвращает список XP (массив NumPy при as_arrays=True)
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.calculate_xp(*values) for values in
+                    _zip_columns(credits, infection, whisper, days_since_reg, post_count)]
+        
+        xp = self._xp_array(*_as_arrays(credits, infection, whisper, days_since_reg, post_count))
+        return xp if as_arrays else xp.tolist()
+    
+    def calculate_level_from_xp_batch(self, xp, as_arrays=False):
+        """
+        Пакетная версия calculate_level_from_xp
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.calculate_level_from_xp(value) for value in xp]
+        
+        levels = self._level_array(np.asarray(xp))
+        return levels if as_arrays else levels.tolist()
+    
+    def get_display_values_batch(self, infection, whisper, as_arrays=False):
+        """
+        Пакетная версия get_display_values.
+        Возвращает словарь столбцов с теми же ключами
+        """
+        if not NUMPY_AVAILABLE:
+            rows = [self.get_display_values(i, w) for i, w in _zip_columns(infection, whisper)]
+            keys = rows[0].keys() if rows else self.get_display_values(0, 0).keys()
+            return {key: [row[key] for row in rows] for key in keys}
+        
+        infection, whisper = _as_arrays(infection, whisper)
+        columns = {
+            'display_infection': np.minimum(infection, self.MAX_DISPLAY_INFECTION),
+            'display_whisper': np.minimum(whisper, self.MAX_DISPLAY_WHISPER),
+            'has_exceeded_infection': infection > self.MAX_DISPLAY_INFECTION,
+            'has_exceeded_whisper': whisper > self.MAX_DISPLAY_WHISPER,
+            'real_infection': infection,
+            'real_whisper': whisper
+        }
+        return columns if as_arrays else {key: column.tolist() for key, column in columns.items()}
+    
+    def calculate_progression_batch(self, credits, infection, whisper, post_count=0, unique_topics=0,
+                                    days_since_reg=30, as_arrays=False):
+        """
+        Пакетная версия calculate_player_progression.
+        
+        Args:
+            credits, infection, whisper: текущие значения игроков
+            post_count, unique_topics: активность за день
+            days_since_reg: дней с регистрации
+        
+        Returns:
+            dict: столбцы новых значений ('credits', 'infection', 'whisper', 'display_*', 'xp', 'level'),
+                  изменений ('credits_change', 'infection_change', 'whisper_change')
+                  и прогрессии ('xp_to_next_level', 'has_exceeded_*')
+        """
+        if not NUMPY_AVAILABLE:
+            return self._progression_batch_python(credits, infection, whisper, post_count,
+                                                  unique_topics, days_since_reg)
+        
+        credits, infection, whisper, post_count, unique_topics, days_since_reg = _as_arrays(
+            credits, infection, whisper, post_count, unique_topics, days_since_reg)
+        
+        # Изменения за день (как в calculate_player_progression)
+        credits_change = self.BASE_CREDITS + (post_count * self.CREDITS_PER_POST)
+        infection_change = np.where(
+            post_count > 0,
+            self.BASE_INFECTION - np.minimum(0.15, post_count * self.INFECTION_REDUCTION_PER_POST),
+            self.BASE_INFECTION
+        )
+        whisper_change = unique_topics * self.WHISPER_PER_TOPIC
+        
+        new_infection = infection + infection_change
+        new_whisper = whisper + whisper_change
+        
+        # XP и уровень считаются от текущих (до изменений) значений
+        xp = self._xp_array(credits, infection, whisper, days_since_reg, post_count)
+        level = self._level_array(xp)
+        thresholds = np.asarray(self._get_level_table()[0])
+        xp_to_next = np.where(level < self.MAX_LEVEL, thresholds[np.minimum(level, self.MAX_LEVEL)] - xp, 0)
+        
+        size = len(xp)
+        columns = {
+            'credits': np.broadcast_to(credits + credits_change, size),
+            'infection': np.broadcast_to(new_infection, size),
+            'whisper': np.broadcast_to(new_whisper, size),
+            'display_infection': np.broadcast_to(np.minimum(new_infection, self.MAX_DISPLAY_INFECTION), size),
+            'display_whisper': np.broadcast_to(np.minimum(new_whisper, self.MAX_DISPLAY_WHISPER), size),
+            'xp': xp,
+            'level': level,
+            'credits_change': np.broadcast_to(credits_change, size),
+            'infection_change': np.broadcast_to(infection_change, size),
+            'whisper_change': np.broadcast_to(whisper_change, size),
+            'xp_to_next_level': xp_to_next,
+            'has_exceeded_infection': np.broadcast_to(new_infection > self.MAX_DISPLAY_INFECTION, size),
+            'has_exceeded_whisper': np.broadcast_to(new_whisper > self.MAX_DISPLAY_WHISPER, size)
+        }
+        return columns if as_arrays else {key: column.tolist() for key, column in columns.items()}
+    
+    def _progression_batch_python(self, credits, infection, whisper, post_count, unique_topics, days_since_reg):
+        """Пакетная прогрессия без NumPy: цикл по calculate_player_progression"""
+        columns = {key: [] for key in (
+            'credits', 'infection', 'whisper', 'display_infection', 'display_whisper', 'xp', 'level',
+            'credits_change', 'infection_change', 'whisper_change',
+            'xp_to_next_level', 'has_exceeded_infection', 'has_exceeded_whisper')}
+        
+        for c, i, w, posts, topics, days in _zip_columns(credits, infection, whisper, post_count,
+                                                          unique_topics, days_since_reg):
+            result = self.calculate_player_progression(
+                {'data': {'credits': c, 'infection': i, 'whisper': w}},
+                {'post_count': posts, 'unique_topics': topics},
+                days_since_reg=days
+            )
+            for key in ('credits', 'infection', 'whisper', 'display_infection', 'display_whisper', 'xp', 'level'):
+                columns[key].append(result['current'][key])
+            for key in ('credits_change', 'infection_change', 'whisper_change'):
+                columns[key].append(result['changes'][key])
+            for key in ('xp_to_next_level', 'has_exceeded_infection', 'has_exceeded_whisper'):
+                columns[key].append(result['progression'][key])
+        
+        return columns
+    
+    def _xp_array(self, credits, infection, whisper, days_since_reg, post_count):
+        """calculate_xp над массивами: тот же порядок операций, поэтому результат совпадает бит в бит"""
+        display_infection = np.minimum(infection, self.MAX_DISPLAY_INFECTION)
+        display_whisper = np.minimum(whisper, self.MAX_DISPLAY_WHISPER)
+        
+        xp_from_credits = credits * 1.0
+        xp_from_infection = display_infection * 10 * (1.0 + display_infection / 100)
+        xp_from_whisper = display_whisper * 25 * (1.0 + np.abs(display_whisper) / 100)
+        activity_multiplier = 1.0 + (post_count * 0.1)
+        xp_from_activity = days_since_reg * 50 * activity_multiplier
+        
+        total_xp = (
+            xp_from_credits * 0.3 +
+            xp_from_infection * 0.2 +
+            xp_from_whisper * 0.4 +
+            xp_from_activity * 0.1
+        )
+        
+        # int() отбрасывает дробную часть к нулю - как np.trunc
+        return np.atleast_1d(np.trunc(total_xp).astype(np.int64))
+    
+    def _level_array(self, xp):
+        thresholds = self._get_level_table()[0][:self.MAX_LEVEL]
+        return np.maximum(1, np.searchsorted(thresholds, xp, side='right'))
+    
     def calculate_infection_risk(self, current_infection, whisper_level):
         """
         Рассчитывает риск событий на основе заражения и шёпота
@@ -287,6 +489,20 @@ class GameCalculator:
         return effects
 
 
+def _zip_columns(*columns):
+    """Перебирает строки столбцов; скаляры повторяются для каждой строки"""
+    size = max((len(c) for c in columns if _is_column(c)), default=1)
+    return zip(*(c if _is_column(c) else [c] * size for c in columns))
+
+
+def _is_column(value):
+    return hasattr(value, '__len__') and not isinstance(value, (str, bytes))
+
+
+def _as_arrays(*columns):
+    return [np.asarray(c) for c in columns]
+
+
 # Тестирование
 if __name__ == "__main__":
     calculator = GameCalculator()
@@ -0,0 +1,202 @@
+"""
+Дисковый кэш HTTP-ответов форума с условными запросами
+Хранит тела ответов вместе с ETag/Last-Modified и отправляет If-None-Match/If-Modified-Since.
+Если тело не изменилось (304 или тот же хэш), вызывающий код может взять готовый
+результат разбора из кэша и не парсить страницу заново.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from file_utils import REPO_ROOT, atomic_write_json, atomic_write_text, load_json
+from forum_client import get_client
+
+# Кэш не коммитится в репозиторий, в CI он сохраняется через actions/cache
+DEFAULT_CACHE_DIR = os.environ.get('WOTV_CACHE_DIR') or os.path.join(REPO_ROOT, '.cache', 'http')
+DEFAULT_MAX_BYTES = int(os.environ.get('WOTV_HTTP_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+CACHE_ENABLED = os.environ.get('WOTV_HTTP_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+
+class CachedResponse:
+    """Ответ, прошедший через кэш"""
+
+    def __init__(self, key, text, status_code, body_hash, from_cache=False, unchanged=False):
+        self.key = key
+        self.text = text
+        self.status_code = status_code
+        self.body_hash = body_hash
+        self.from_cache = from_cache  # Тело взято с диска (сервер ответил 304)
+        self.unchanged = unchanged    # Тело совпадает с прошлым запуском
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HTTPCache:
+    """
+    Кэш GET-запросов.
+    Индекс (index.json) хранит метаданные записей, тела и результаты разбора лежат отдельными файлами.
+    Индекс меняется в памяти и записывается на диск через flush() - один раз за запуск.
+    При сохранении, если кэш больше max_bytes, удаляются записи, к которым дольше всего не обращались.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, enabled=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.enabled = CACHE_ENABLED if enabled is None else enabled
+        self.index_file = os.path.join(self.cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._index = None
+        self._dirty = False
+
+        self.stats = {'requests': 0, 'not_modified': 0, 'unchanged': 0, 'parse_skipped': 0, 'evicted': 0}
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Ключ записи: URL вместе с отсортированными параметрами"""
+        query = '&'.join(f'{k}={params[k]}' for k in sorted(params)) if params else ''
+        return hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    def fetch(self, url, params=None, headers=None, timeout=15, session=None):
+        """
+        Выполняет GET с условными заголовками (по умолчанию через общий ForumClient).
+        Возвращает CachedResponse; ошибки HTTP пробрасываются как requests.HTTPError.
+        """
+        http = session or get_client()
+        key = self.make_key(url, params)
+        request_headers = dict(headers or {})
+
+        entry = self._get_entry(key) if self.enabled else None
+        cached_text = self._read_body(key) if entry else None
+        if cached_text is not None:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = http.get(url, params=params, headers=request_headers, timeout=timeout)
+        self.stats['requests'] += 1
+
+        if response.status_code == 304 and cached_text is not None:
+            self.stats['not_modified'] += 1
+            self._touch(key)
+            return CachedResponse(key, cached_text, 200, entry['body_hash'], from_cache=True, unchanged=True)
+
+        response.raise_for_status()
+
+        text = response.text
+        body_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        unchanged = entry is not None and entry.get('body_hash') == body_hash
+        if unchanged:
+            self.stats['unchanged'] += 1
+
+        if self.enabled:
+            self._store(key, url, text, body_hash, response.headers, unchanged)
+
+        return CachedResponse(key, text, response.status_code, body_hash, unchanged=unchanged)
+
+    def load_parsed(self, response):
+        """
+        Возвращает сохранённый результат разбора для неизменного тела ответа.
+        None, если тело новое или результата нет.
+        """
+        if not self.enabled or not response.unchanged:
+            return None
+
+        parsed = load_json(self._parsed_path(response.key))
+        if not parsed or parsed.get('body_hash') != response.body_hash:
+            return None
+
+        self.stats['parse_skipped'] += 1
+        return parsed['value']
+
+    def save_parsed(self, response, value):
+        """Сохраняет результат разбора тела ответа (должен сериализоваться в JSON)"""
+        if not self.enabled:
+            return
+
+        text = json.dumps({'body_hash': response.body_hash, 'value': value}, ensure_ascii=False)
+        atomic_write_text(self._parsed_path(response.key), text)
+
+        with self._lock:
+            entry = self._load_index().get(response.key)
+            if entry is not None:
+                entry['parsed_size'] = len(text.encode('utf-8'))
+                self._dirty = True
+
+    def flush(self):
+        """Удаляет лишние записи и сохраняет индекс, если он менялся"""
+        with self._lock:
+            if self._dirty:
+                self._evict_and_save()
+                self._dirty = False
+
+    # === Внутренние методы ===
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, 'bodies', f'{key}.body')
+
+    def _parsed_path(self, key):
+        return os.path.join(self.cache_dir, 'parsed', f'{key}.json')
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = load_json(self.index_file, {})
+        return self._index
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._load_index().get(key)
+            return dict(entry) if entry else None
+
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _touch(self, key):
+        with self._lock:
+            entry = self._load_index().get(key)
+            if entry is not None:
+                entry['last_access'] = time.time()
+                self._dirty = True
+
+    def _store(self, key, url, text, body_hash, headers, unchanged):
+        if not unchanged or not os.path.exists(self._body_path(key)):
+            atomic_write_text(self._body_path(key), text)
+
+        with self._lock:
+            index = self._load_index()
+            previous = index.get(key, {})
+            index[key] = {
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'body_hash': body_hash,
+                'size': len(text.encode('utf-8')),
+                'parsed_size': previous.get('parsed_size', 0) if unchanged else 0,
+                'last_access': time.time()
+            }
+            self._dirty = True
+
+    def _evict_and_save(self):
+        """Удаляет самые старые записи, пока кэш больше лимита, и сохраняет индекс"""
+        index = self._load_index()
+        total = sum(e['size'] + e.get('parsed_size', 0) for e in index.values())
+
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            entry = index.pop(key)
+            total -= entry['size'] + entry.get('parsed_size', 0)
+            for path in (self._body_path(key), self._parsed_path(key)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.stats['evicted'] += 1
+
+        atomic_write_json(self.index_file, index)
@@ -0,0 +1,63 @@
+"""
+Кэш расчётов игроков между запусками парсера
+Для каждого user_id хранит отпечаток (status_raw + статистика форума) и готовый блок data:
+значения отображения, уровень, XP, level_info и exceeded_effects.
+Если отпечаток не изменился, расчёты не повторяются.
+"""
+
+import copy
+import hashlib
+import os
+
+from file_utils import REPO_ROOT, atomic_write_json, load_json
+
+DEFAULT_CACHE_FILE = os.path.join(
+    os.environ.get('WOTV_CACHE_DIR') or os.path.join(REPO_ROOT, '.cache'),
+    'player_fingerprints.json'
+)
+
+
+def player_fingerprint(status_raw, posts):
+    """Отпечаток входных данных игрока, от которых зависят расчёты"""
+    return hashlib.sha1(f'{status_raw}\x1f{posts}'.encode('utf-8')).hexdigest()
+
+
+class PlayerFingerprintCache:
+    """
+    Хранилище {user_id: {fingerprint, data}}.
+    balance_key - отпечаток баланса GameCalculator; если он сменился, кэш сбрасывается целиком.
+    """
+
+    def __init__(self, balance_key, cache_file=None):
+        self.cache_file = cache_file or DEFAULT_CACHE_FILE
+        self.balance_key = balance_key
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+        stored = load_json(self.cache_file, {})
+        if stored.get('balance_key') == balance_key:
+            self.entries = stored.get('players', {})
+        else:
+            self.entries = {}
+            self._dirty = bool(stored)
+
+    def lookup(self, user_id, fingerprint):
+        """Возвращает копию сохранённого блока data или None"""
+        entry = self.entries.get(str(user_id))
+        if entry is None or entry['fingerprint'] != fingerprint:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return copy.deepcopy(entry['data'])
+
+    def store(self, user_id, fingerprint, data):
+        self.entries[str(user_id)] = {'fingerprint': fingerprint, 'data': copy.deepcopy(data)}
+        self._dirty = True
+
+    def save(self):
+        """Сохраняет кэш, если в нём что-то поменялось"""
+        if self._dirty:
+            atomic_write_json(self.cache_file, {'balance_key': self.balance_key, 'players': self.entries}, indent=None)
+            self._dirty = False
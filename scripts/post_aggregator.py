@@ -0,0 +1,204 @@
+"""
+Потоковая агрегация активности по постам
+Посты читаются из любого итератора по одному, на игрока хранятся только счётчики
+и компактное множество тем - память зависит от числа игроков, а не постов.
+Для дозагрузки большой истории есть режим с пулом процессов: посты раскладываются
+по шардам по user_id, шарды считаются в отдельных процессах, частичные итоги сливаются.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Сколько процессов считать статистику постов (1 - в текущем процессе, 0 - по числу ядер)
+POST_STATS_WORKERS = int(os.environ.get('POST_STATS_WORKERS', '1'))
+
+# Сколько постов одного шарда отправлять процессу за раз
+DEFAULT_CHUNK_SIZE = 20000
+
+
+class TopicSet:
+    """
+    Точное множество id тем в отсортированном array('q'): 8 байт на тему вместо
+    объекта int и ячейки хэш-таблицы в set. У игрока за день обычно несколько тем,
+    поэтому вставка со сдвигом массива дешевле хэширования.
+    """
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, topic_ids=()):
+        self._ids = array('q', sorted(set(topic_ids)))
+
+    def add(self, topic_id):
+        ids = self._ids
+        index = bisect_left(ids, topic_id)
+        if index == len(ids) or ids[index] != topic_id:
+            ids.insert(index, topic_id)
+
+    def update(self, other):
+        """Объединение с другим TopicSet"""
+        if not other._ids:
+            return
+        if not self._ids:
+            self._ids = array('q', other._ids)
+            return
+        self._ids = array('q', sorted(set(self._ids).union(other._ids)))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, topic_id):
+        index = bisect_left(self._ids, topic_id)
+        return index < len(self._ids) and self._ids[index] == topic_id
+
+
+class UserActivity:
+    """Счётчики одного игрока"""
+
+    __slots__ = ('post_count', 'last_post', 'topics')
+
+    def __init__(self):
+        self.post_count = 0
+        self.last_post = None
+        self.topics = TopicSet()
+
+    def merge(self, other):
+        self.post_count += other.post_count
+        if other.last_post is not None and (self.last_post is None or other.last_post > self.last_post):
+            self.last_post = other.last_post
+        self.topics.update(other.topics)
+
+
+def post_row(post):
+    """
+    (user_id, topic_id, posted) из поста API или None, если автор не определён.
+    topic_id = 0, если темы нет; posted - int или None.
+    """
+    try:
+        user_id = int(post.get('user_id') or 0)
+    except (TypeError, ValueError):
+        return None
+    if not user_id:
+        return None
+
+    try:
+        topic_id = int(post.get('topic_id') or 0)
+    except (TypeError, ValueError):
+        topic_id = 0
+
+    try:
+        posted = int(post['posted'])
+    except (KeyError, TypeError, ValueError):
+        posted = None
+
+    return user_id, topic_id, posted
+
+
+class PostAggregator:
+    """
+    {user_id: UserActivity}, заполняемый по одному посту.
+    Частичные агрегаты (например, из разных процессов) объединяются через merge().
+    """
+
+    def __init__(self):
+        self.users = {}
+
+    def add(self, user_id, topic_id=0, posted=None):
+        activity = self.users.get(user_id)
+        if activity is None:
+            activity = self.users[user_id] = UserActivity()
+
+        activity.post_count += 1
+        if posted is not None and (activity.last_post is None or posted > activity.last_post):
+            activity.last_post = posted
+        if topic_id:
+            activity.topics.add(topic_id)
+
+    def add_post(self, post):
+        row = post_row(post)
+        if row is not None:
+            self.add(*row)
+
+    def consume(self, posts):
+        """Добавляет посты из итератора. Возвращает self"""
+        for post in posts:
+            self.add_post(post)
+        return self
+
+    def merge(self, other):
+        """Добавляет частичный агрегат. Возвращает self"""
+        for user_id, activity in other.users.items():
+            mine = self.users.get(user_id)
+            if mine is None:
+                self.users[user_id] = activity
+            else:
+                mine.merge(activity)
+        return self
+
+    def result(self):
+        """Формат analyze_posts_for_stats: {user_id: {'post_count', 'last_post', 'unique_topics'}}"""
+        return {
+            user_id: {
+                'post_count': activity.post_count,
+                'last_post': activity.last_post,
+                'unique_topics': len(activity.topics)
+            }
+            for user_id, activity in self.users.items()
+        }
+
+    def __len__(self):
+        return len(self.users)
+
+
+def _aggregate_rows(rows):
+    """Агрегат одного куска шарда (выполняется в процессе пула)"""
+    aggregator = PostAggregator()
+    for row in rows:
+        aggregator.add(*row)
+    return aggregator
+
+
+def aggregate_posts(posts, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Считает активность по итератору постов.
+    workers > 1: посты раскладываются по шардам user_id % workers и считаются в пуле процессов.
+    В памяти держится не больше 2 * workers кусков по chunk_size постов.
+    """
+    workers = POST_STATS_WORKERS if workers is None else workers
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return PostAggregator().consume(posts)
+
+    total = PostAggregator()
+    shards = [[] for _ in range(workers)]
+    pending = set()
+
+    def collect(futures):
+        for future in futures:
+            total.merge(future.result())
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for post in posts:
+            row = post_row(post)
+            if row is None:
+                continue
+
+            shard = row[0] % workers
+            shards[shard].append(row)
+            if len(shards[shard]) < chunk_size:
+                continue
+
+            pending.add(pool.submit(_aggregate_rows, shards[shard]))
+            shards[shard] = []
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        for rows in shards:
+            if rows:
+                pending.add(pool.submit(_aggregate_rows, rows))
+        collect(pending)
+
+    return total
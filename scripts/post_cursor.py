@@ -0,0 +1,73 @@
+"""
+Курсоры чтения постов форума (high-water mark)
+Для каждого потока постов (темы форума) хранят id и время последнего обработанного поста,
+чтобы каждый запуск скачивал только новые посты. Состояние лежит в data/state/ и коммитится
+вместе с данными игроков, поэтому переживает перезапуски CI.
+"""
+
+import os
+from datetime import datetime
+
+from file_utils import REPO_ROOT, atomic_write_json, load_json
+
+DEFAULT_STATE_FILE = os.path.join(REPO_ROOT, 'data', 'state', 'post_cursor.json')
+
+
+class PostCursor:
+    """Курсор одного потока постов"""
+
+    def __init__(self, stream, last_post_id=0, last_posted=0):
+        self.stream = str(stream)
+        self.last_post_id = last_post_id
+        self.last_posted = last_posted
+
+    def is_new(self, post):
+        return int(post.get('id', 0)) > self.last_post_id
+
+    def advance(self, posts):
+        """Сдвигает курсор на самый свежий пост из списка"""
+        for post in posts:
+            post_id = int(post.get('id', 0))
+            if post_id > self.last_post_id:
+                self.last_post_id = post_id
+                self.last_posted = int(post.get('posted', 0))
+
+
+class CursorStore:
+    """
+    Все курсоры в одном файле состояния.
+    Курсоры сдвигаются только в памяти; на диск они попадают через save(),
+    когда посты действительно обработаны - иначе сбой посреди запуска потерял бы посты.
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file or DEFAULT_STATE_FILE
+        self._state = load_json(self.state_file, {})
+        self._cursors = {}
+
+    def cursor(self, stream):
+        stream = str(stream)
+        if stream not in self._cursors:
+            saved = self._state.get(stream, {})
+            self._cursors[stream] = PostCursor(stream, saved.get('last_post_id', 0), saved.get('last_posted', 0))
+        return self._cursors[stream]
+
+    def high_water_mark(self):
+        """Время самого свежего поста, обработанного в прошлых запусках (0, если запусков не было)"""
+        return max((saved.get('last_posted', 0) for saved in self._state.values()), default=0)
+
+    def save(self):
+        """Сохраняет курсоры, которые сдвинулись"""
+        changed = False
+        for stream, cursor in self._cursors.items():
+            if self._state.get(stream, {}).get('last_post_id') == cursor.last_post_id:
+                continue
+            self._state[stream] = {
+                'last_post_id': cursor.last_post_id,
+                'last_posted': cursor.last_posted,
+                'updated_at': datetime.now().isoformat()
+            }
+            changed = True
+
+        if changed:
+            atomic_write_json(self.state_file, self._state)
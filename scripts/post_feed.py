@@ -0,0 +1,128 @@
+"""
+Общая лента постов форума
+Посты скачиваются один раз (WotVCore.ingest_posts) и записываются в журнал data/state/post_feed.jsonl.
+Каждый потребитель (дневная статистика, социальные отношения) хранит номер последней
+обработанной записи, поэтому читает ленту по своему расписанию и догоняет её сам,
+не скачивая посты повторно. Записи, которые обработали все потребители, удаляются.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from file_utils import REPO_ROOT, atomic_write_text, load_json, write_json_if_changed
+
+DEFAULT_FEED_FILE = os.path.join(REPO_ROOT, 'data', 'state', 'post_feed.jsonl')
+DEFAULT_MARKERS_FILE = os.path.join(REPO_ROOT, 'data', 'state', 'post_consumers.json')
+
+# Потребители ленты: запись удаляется, только когда её обработали все
+CONSUMERS = ('stats', 'social')
+
+
+class PostFeed:
+    """
+    Журнал постов с порядковыми номерами seq и отметки потребителей {имя: seq}.
+    Номер присваивается при записи, поэтому порядок не зависит от id постов разных тем.
+    Отметки сдвигаются в памяти через mark() и попадают на диск в save().
+    """
+
+    def __init__(self, feed_file=None, markers_file=None, consumers=CONSUMERS):
+        self.feed_file = feed_file or DEFAULT_FEED_FILE
+        self.markers_file = markers_file or DEFAULT_MARKERS_FILE
+        self.consumers = tuple(consumers)
+
+        state = load_json(self.markers_file, {})
+        self.last_seq = state.get('last_seq', 0)
+        self.markers = {name: state.get('consumers', {}).get(name, 0) for name in self.consumers}
+
+        self.entries = []   # [(seq, post)] по возрастанию seq
+        self._post_ids = set()
+        self._load()
+
+    def append(self, posts):
+        """Дописывает в журнал посты, которых в нём ещё нет. Возвращает число новых"""
+        lines = []
+        # Посты приходят от новых к старым - в журнал они ложатся по времени
+        for post in sorted(posts, key=lambda post: int(post.get('id', 0))):
+            post_id = int(post.get('id', 0))
+            if post_id in self._post_ids:
+                continue
+            self.last_seq += 1
+            self.entries.append((self.last_seq, post))
+            self._post_ids.add(post_id)
+            lines.append(json.dumps({'seq': self.last_seq, 'post': post}, ensure_ascii=False))
+
+        if lines:
+            os.makedirs(os.path.dirname(self.feed_file) or '.', exist_ok=True)
+            with open(self.feed_file, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._save_markers()
+        return len(lines)
+
+    def pending(self, consumer):
+        """(посты, последний seq) - ещё не обработанные потребителем записи"""
+        marker = self.markers[consumer]
+        posts = [post for seq, post in self.entries if seq > marker]
+        return posts, self.last_seq
+
+    def mark(self, consumer, seq):
+        """Отмечает, что потребитель обработал записи до seq включительно"""
+        self.markers[consumer] = max(self.markers[consumer], seq)
+
+    def dispatch(self, handlers):
+        """
+        Раздаёт каждому потребителю его необработанные посты; потребители работают параллельно.
+        handlers - {имя: функция(посты)}. Отметка сдвигается только у потребителя, отработавшего без ошибок.
+        Возвращает (results, failed): {имя: результат} и {имя: ошибка}.
+        """
+        batches = {name: self.pending(name) for name in handlers}
+        results = {}
+        failed = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, len(handlers))) as pool:
+            futures = {name: pool.submit(handler, batches[name][0]) for name, handler in handlers.items()}
+
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failed[name] = e
+                continue
+            self.mark(name, batches[name][1])
+
+        return results, failed
+
+    def save(self):
+        """Сохраняет отметки и убирает из журнала записи, обработанные всеми потребителями"""
+        self._save_markers()
+
+        done = min(self.markers.values(), default=0)
+        if self.entries and self.entries[0][0] <= done:
+            self.entries = [(seq, post) for seq, post in self.entries if seq > done]
+            self._post_ids = {int(post.get('id', 0)) for _, post in self.entries}
+            atomic_write_text(self.feed_file, ''.join(
+                json.dumps({'seq': seq, 'post': post}, ensure_ascii=False) + '\n' for seq, post in self.entries
+            ))
+
+    # === Внутренние методы ===
+
+    def _load(self):
+        try:
+            with open(self.feed_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Недописанная строка после сбоя
+                    self.entries.append((entry['seq'], entry['post']))
+                    self._post_ids.add(int(entry['post'].get('id', 0)))
+        except FileNotFoundError:
+            return
+
+        if self.entries:
+            self.last_seq = max(self.last_seq, self.entries[-1][0])
+
+    def _save_markers(self):
+        write_json_if_changed(self.markers_file, {'last_seq': self.last_seq, 'consumers': self.markers})
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Скомпилированный поиск хэштегов взаимодействий
+Одно регулярное выражение, собранное из словаря действий: хэштеги без известного
+действия (#лето, #Игрок_привет) отбрасываются прямо при сканировании поста,
+а не после разбора каждого совпадения.
+"""
+
+import re
+from typing import Dict, Iterator, List, Tuple
+
+
+class HashtagMatcher:
+    """
+    #Игрок_действие[_модификатор...] -> (цель, действие, [модификаторы]).
+    Разбор совпадает с RelationTracker.parse_hashtag: имя - до первого "_",
+    действие сравнивается без учёта регистра, неизвестные модификаторы пропускаются.
+    """
+
+    # Сколько разных пар (действие, модификаторы) помнить
+    CACHE_LIMIT = 10000
+
+    def __init__(self, actions: Dict, modifiers: Dict):
+        self.modifiers = {modifier.lower() for modifier in modifiers}
+        self._parsed = {}
+
+        # Длинные действия раньше коротких: при общем начале выигрывает полное слово
+        alternation = "|".join(re.escape(action) for action in sorted(actions, key=len, reverse=True))
+        self.pattern = re.compile(
+            r"#([^\W_]+)_(" + alternation + r")((?:_\w*)?)(?!\w)",
+            re.IGNORECASE
+        )
+
+    def scan(self, text: str) -> Iterator[Tuple[str, str, List[str], str]]:
+        """(цель, действие, модификаторы, исходный тег) для каждого хэштега взаимодействия"""
+        parsed = self._parsed
+        for target, action, tail in self.pattern.findall(text):
+            # Действие и хвост модификаторов повторяются из поста в пост - разбираем их один раз
+            key = (action, tail)
+            cached = parsed.get(key)
+            if cached is None:
+                cached = parsed[key] = self._parse(action, tail)
+            yield target, cached[0], list(cached[1]), f"#{target}_{action}{tail}"
+
+    def _parse(self, action: str, tail: str) -> Tuple[str, Tuple[str, ...]]:
+        if len(self._parsed) >= self.CACHE_LIMIT:
+            self._parsed.clear()
+        modifiers = tuple(part.lower() for part in tail[1:].split("_") if part.lower() in self.modifiers) if tail else ()
+        return action.lower(), modifiers
+
+    def match(self, text: str) -> List[Tuple[str, str, List[str]]]:
+        """Список (цель, действие, модификаторы)"""
+        return [(target, action, modifiers) for target, action, modifiers, _ in self.scan(text)]
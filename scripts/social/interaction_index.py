@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Обратный индекс журнала взаимодействий
+Для каждого игрока (отправителя и получателя) хранит, где лежат его записи:
+номер сегмента и смещение строки в байтах. Профиль игрока читает только свои
+строки, сколько бы взаимодействий ни накопилось в журнале.
+"""
+
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from ..file_utils import atomic_write_text
+
+
+class PlayerLocationIndex:
+    """
+    players: {player_id: [(номер сегмента, смещение)]} в порядке журнала - номера сегментов
+    растут вместе с журналом (склейка получает номер первого сегмента), так что это и порядок пар;
+    indexed: {номер сегмента: сколько байт сегмента уже проиндексировано} -
+    по нему журнал при открытии дочитывает записи, не попавшие в индекс (сбой до save()).
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.players: Dict[int, List[Tuple[int, int]]] = {}
+        self.indexed: Dict[int, int] = {}
+        self._dirty = False
+        self._load()
+
+    def add(self, player_ids: Iterable[int], segment: int, offset: int):
+        location = (segment, offset)
+        for player_id in set(player_ids):
+            self.players.setdefault(player_id, []).append(location)
+        self._dirty = True
+
+    def add_segment(self, segment: int, entries: Iterable[Tuple[Iterable[int], int]]):
+        """
+        Записи сегмента [(игроки, смещение)], прочитанные заново (склейка, сбой до save()).
+        Сегмент может быть не последним - списки затронутых игроков восстанавливают порядок журнала.
+        """
+        added: Dict[int, List[Tuple[int, int]]] = {}
+        for player_ids, offset in entries:
+            for player_id in set(player_ids):
+                added.setdefault(player_id, []).append((segment, offset))
+
+        for player_id, locations in added.items():
+            current = self.players.setdefault(player_id, [])
+            ordered = not current or current[-1] < locations[0]
+            current.extend(locations)
+            if not ordered:
+                current.sort()
+        if added:
+            self._dirty = True
+
+    def mark_indexed(self, segment: int, size: int):
+        if self.indexed.get(segment) != size:
+            self.indexed[segment] = size
+            self._dirty = True
+
+    def drop_segments(self, segments: Iterable[int]):
+        """Забывает записи сегментов (сегмент удалён или переписан склейкой)"""
+        segments = set(segments) & set(self.indexed)
+        if not segments:
+            return
+        for player_id in list(self.players):
+            locations = [location for location in self.players[player_id] if location[0] not in segments]
+            if locations:
+                self.players[player_id] = locations
+            else:
+                del self.players[player_id]
+        for segment in segments:
+            del self.indexed[segment]
+        self._dirty = True
+
+    def locations(self, player_id: int) -> List[Tuple[int, int]]:
+        return self.players.get(player_id, [])
+
+    def save(self):
+        """Сохраняет индекс, если он менялся"""
+        if not self._dirty:
+            return
+
+        data = {
+            "indexed": {str(segment): size for segment, size in sorted(self.indexed.items())},
+            "players": {str(player_id): [offset for location in locations for offset in location]
+                        for player_id, locations in sorted(self.players.items())}
+        }
+
+        atomic_write_text(self.index_file, json.dumps(data, separators=(",", ":")))
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self.indexed = {int(segment): size for segment, size in data.get("indexed", {}).items()}
+        # Пары (сегмент, смещение) хранятся плоским списком
+        self.players = {
+            int(player_id): list(zip(flat[::2], flat[1::2]))
+            for player_id, flat in data.get("players", {}).items()
+        }
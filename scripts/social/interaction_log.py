@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Журнал взаимодействий
+Все взаимодействия дописываются строками JSON в сегменты data/social_history/log/segment_<номер>.jsonl.
+Сегмент закрывается, когда вырастает больше SEGMENT_MAX_BYTES или начинается новый месяц;
+закрытый сегмент заканчивается строкой-футером со списком игроков и диапазоном дат,
+поэтому чтение истории игрока или периода открывает только нужные сегменты.
+Мелкие старые сегменты склеиваются compact(): склейка записывается поверх первого сегмента группы,
+её футер перечисляет поглощённые сегменты, и если после сбоя они остались на диске,
+журнал удаляет их при открытии - записи не задваиваются.
+С player_index=True журнал ведёт обратный индекс (PlayerLocationIndex) - где лежат записи
+каждого игрока; без него история игрока читается по сегментам, где он есть по футеру.
+"""
+
+import glob
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..file_utils import atomic_write_text
+from .interaction_index import PlayerLocationIndex
+
+SEGMENT_MAX_BYTES = 1024 * 1024
+COMPACT_TARGET_BYTES = 4 * SEGMENT_MAX_BYTES
+
+_FOOTER = "footer"
+
+
+def _record_month(record: Dict) -> str:
+    """Месяц записи в журнал (сегменты делятся по времени обработки, а не поста)"""
+    return (record.get("processed_date") or "")[:7]
+
+
+def _record_players(record: Dict) -> List[int]:
+    return [player_id for player_id in (record.get("from_player_id"), record.get("to_player_id"))
+            if player_id is not None]
+
+
+class Segment:
+    """Сегмент журнала и сведения из его футера (для активного сегмента - собранные по записям)"""
+
+    def __init__(self, path: str, sealed: bool = False, players=None, first_date=None, last_date=None, count=0,
+                 merged=None):
+        self.path = path
+        self.sealed = sealed
+        self.players = set(players or ())
+        self.first_date = first_date
+        self.last_date = last_date
+        self.count = count
+        self.merged = set(merged or ())  # Номера сегментов, поглощённых склейкой
+        self.month = None
+
+    def add(self, record: Dict):
+        if self.month is None:
+            self.month = _record_month(record)
+        self.players.update(_record_players(record))
+        date = record.get("post_date")
+        if date:
+            self.first_date = min(self.first_date or date, date)
+            self.last_date = max(self.last_date or date, date)
+        self.count += 1
+
+    def footer(self) -> Dict:
+        footer = {"players": sorted(self.players), "first_date": self.first_date,
+                  "last_date": self.last_date, "count": self.count}
+        if self.merged:
+            footer["merged"] = sorted(self.merged)
+        return {_FOOTER: footer}
+
+    def overlaps(self, player_id: Optional[int], since: Optional[str], until: Optional[str]) -> bool:
+        if player_id is not None and player_id not in self.players:
+            return False
+        if since and self.last_date and self.last_date < since:
+            return False
+        if until and self.first_date and self.first_date > until:
+            return False
+        return True
+
+    @property
+    def number(self) -> int:
+        return int(os.path.basename(self.path)[len("segment_"):-len(".jsonl")])
+
+
+class InteractionLog:
+    """
+    Сегментированный журнал только для дописывания.
+    append() - одна буферизованная запись в открытый активный сегмент; flush() сбрасывает буфер.
+    """
+
+    def __init__(self, log_dir: str, segment_max_bytes: int = SEGMENT_MAX_BYTES, player_index: bool = False):
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.segments: List[Segment] = []
+        self._file = None
+        self._load()
+
+        index_file = os.path.join(log_dir, "players_index.json")
+        if player_index:
+            self.index = PlayerLocationIndex(index_file)
+            self._sync_index()
+        else:
+            self.index = None
+            # Индекс, который не ведётся, устарел бы после склейки - его смещения нельзя дочитывать
+            if os.path.exists(index_file):
+                os.remove(index_file)
+
+    def append(self, record: Dict):
+        """Дописывает взаимодействие"""
+        active = self.segments[-1] if self.segments and not self.segments[-1].sealed else None
+        if active and active.count and _record_month(record) != active.month:
+            self._seal(active)
+            active = None
+        if active is None:
+            active = self._open_segment()
+
+        if self._file is None:
+            self._file = open(active.path, "ab")
+        offset = self._file.tell()
+        self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        active.add(record)
+        if self.index:
+            self.index.add(_record_players(record), active.number, offset)
+            self.index.mark_indexed(active.number, self._file.tell())
+
+        if self._file.tell() >= self.segment_max_bytes:
+            self._seal(active)
+
+    def flush(self):
+        """Сбрасывает буфер на диск"""
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def save(self):
+        """Сбрасывает буфер и сохраняет обратный индекс"""
+        self.flush()
+        if self.index:
+            self.index.save()
+
+    def close(self):
+        if self._file:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        """Число записей во всех сегментах"""
+        return sum(segment.count for segment in self.segments)
+
+    def read(self, player_id: Optional[int] = None, since: Optional[str] = None,
+             until: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Взаимодействия (в порядке записи), где игрок - отправитель или получатель,
+        с post_date в [since, until] (ISO-строки).
+        Читаются только сегменты с игроком и подходящим диапазоном дат, а с обратным
+        индексом - только строки игрока.
+        """
+        self.flush()
+        if player_id is not None and self.index:
+            records = self._read_player(player_id)
+        else:
+            records = (
+                record
+                for segment in self.segments if segment.overlaps(player_id, since, until)
+                for record in self._read_records(segment.path)
+                if player_id is None or player_id in _record_players(record)
+            )
+        for record in records:
+            date = record.get("post_date") or ""
+            if (since and date < since) or (until and date > until):
+                continue
+            yield record
+
+    def compact(self, target_bytes: int = COMPACT_TARGET_BYTES) -> int:
+        """
+        Склеивает подряд идущие закрытые сегменты, пока склейка не больше target_bytes.
+        Склеенный сегмент получает номер первого, порядок записей сохраняется.
+        Возвращает число удалённых сегментов.
+        """
+        sealed = [segment for segment in self.segments if segment.sealed]
+        groups, group, size = [], [], 0
+        for segment in sealed:
+            segment_size = os.path.getsize(segment.path)
+            if group and size + segment_size > target_bytes:
+                groups.append(group)
+                group, size = [], 0
+            group.append(segment)
+            size += segment_size
+        if group:
+            groups.append(group)
+
+        removed = 0
+        for group in groups:
+            if len(group) < 2:
+                continue
+
+            # Индекс сначала забывает сегменты группы: после сбоя на любом шаге ниже
+            # они переиндексируются с нуля, а не по смещениям старых файлов
+            if self.index:
+                self.index.drop_segments(segment.number for segment in group)
+                self.index.save()
+
+            merged = Segment(group[0].path, sealed=True)
+            for segment in group:
+                merged.merged.update(segment.merged)
+                if segment is not group[0]:
+                    merged.merged.add(segment.number)
+            lines = []
+            for segment in group:
+                for record in self._read_records(segment.path):
+                    merged.add(record)
+                    lines.append(json.dumps(record, ensure_ascii=False))
+            lines.append(json.dumps(merged.footer(), ensure_ascii=False))
+
+            atomic_write_text(merged.path, "\n".join(lines) + "\n")
+            for segment in group[1:]:
+                os.remove(segment.path)
+                removed += 1
+
+            # Смещения записей изменились - индекс склеенного сегмента строится заново
+            if self.index:
+                self._index_segment(merged, 0)
+
+            index = self.segments.index(group[0])
+            self.segments[index:index + len(group)] = [merged]
+
+        if self.index:
+            self.index.save()
+        return removed
+
+    def import_files(self, paths: List[str]) -> int:
+        """Переносит в журнал взаимодействия из отдельных файлов (прежний формат) и удаляет файлы"""
+        records = []
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    records.append((path, json.load(f)))
+            except (json.JSONDecodeError, FileNotFoundError):
+                continue
+
+        records.sort(key=lambda item: (item[1].get("post_date") or "", item[0]))
+        for _, record in records:
+            self.append(record)
+        self.save()
+
+        for path, _ in records:
+            os.remove(path)
+        return len(records)
+
+    # === Внутренние методы ===
+
+    def _load(self):
+        paths = sorted(glob.glob(os.path.join(self.log_dir, "segment_*.jsonl")))
+        for path in paths:
+            footer = self._read_footer(path)
+            if footer is not None:
+                self.segments.append(Segment(path, sealed=True, **footer))
+                continue
+
+            # Активный сегмент (без футера) - сведения собираются по записям;
+            # недописанная после сбоя строка закрывается, чтобы не склеиться со следующей записью
+            with open(path, "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+            segment = Segment(path)
+            for record in self._read_records(path):
+                segment.add(record)
+            self.segments.append(segment)
+
+        # Сегменты, уже поглощённые склейкой (сбой между записью склейки и удалением исходных)
+        absorbed = set().union(*(segment.merged for segment in self.segments))
+        for segment in self.segments:
+            if segment.number in absorbed:
+                os.remove(segment.path)
+        self.segments = [segment for segment in self.segments if segment.number not in absorbed]
+
+    def _open_segment(self) -> Segment:
+        # Номера поглощённых сегментов не переиспользуются: футер склейки ссылается на них
+        used = [number for segment in self.segments for number in (segment.number, *segment.merged)]
+        number = max(used) + 1 if used else 1
+        os.makedirs(self.log_dir, exist_ok=True)
+        segment = Segment(os.path.join(self.log_dir, f"segment_{number:06d}.jsonl"))
+        self.segments.append(segment)
+        return segment
+
+    def _sync_index(self):
+        """Дочитывает в индекс записи, которых в нём нет (сбой до save() или склейка без сохранения индекса)"""
+        present = {segment.number for segment in self.segments}
+        self.index.drop_segments(set(self.index.indexed) - present)
+
+        for segment in self.segments:
+            size = os.path.getsize(segment.path)
+            indexed = self.index.indexed.get(segment.number, 0)
+            if indexed > size:
+                # Сегмент переписан (склейка) - индексируем заново
+                self.index.drop_segments([segment.number])
+                indexed = 0
+            if indexed < size:
+                self._index_segment(segment, indexed)
+
+    def _index_segment(self, segment: Segment, start: int):
+        self.index.add_segment(segment.number, ((_record_players(record), offset)
+                                                for offset, record in self._scan(segment.path, start)))
+        self.index.mark_indexed(segment.number, os.path.getsize(segment.path))
+
+    def _read_player(self, player_id: int) -> Iterator[Dict]:
+        """Записи игрока по обратному индексу: каждый нужный сегмент открывается один раз"""
+        paths = {segment.number: segment.path for segment in self.segments}
+        handle, current = None, None
+        try:
+            for number, offset in self.index.locations(player_id):
+                if number != current:
+                    if handle:
+                        handle.close()
+                    handle, current = open(paths[number], "rb"), number
+                handle.seek(offset)
+                yield json.loads(handle.readline())
+        finally:
+            if handle:
+                handle.close()
+
+    def _seal(self, segment: Segment):
+        if self._file is None:
+            self._file = open(segment.path, "ab")
+        self._file.write(json.dumps(segment.footer(), ensure_ascii=False).encode("utf-8") + b"\n")
+        if self.index:
+            self.index.mark_indexed(segment.number, self._file.tell())
+        self.close()
+        segment.sealed = True
+
+    @staticmethod
+    def _read_records(path: str) -> Iterator[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Недописанная строка после сбоя
+                    if _FOOTER not in record:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _scan(path: str, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """(смещение, запись) для записей сегмента начиная с байта start"""
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    record = None  # Недописанная строка после сбоя
+                if isinstance(record, dict) and _FOOTER not in record:
+                    yield offset, record
+                offset += len(line)
+
+    @staticmethod
+    def _read_footer(path: str) -> Optional[Dict]:
+        """Футер - последняя строка файла; читается с конца, без чтения записей"""
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            chunk = b""
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step) + chunk
+                if chunk.count(b"\n") >= 2:
+                    break
+
+        lines = chunk.rstrip(b"\n").rsplit(b"\n", 1)
+        try:
+            data = json.loads(lines[-1].decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        return data.get(_FOOTER) if isinstance(data, dict) else None
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Индекс имён игроков для поиска цели хэштега
+Строится один раз из data/players/all_players.json и перечитывается по изменению файла
+(меняются только игроки с новыми или изменёнными именами).
+Имена сравниваются без учёта регистра, в форме NFC, с ё = е.
+Хэштег обрезает имя на первом "_" (#Red_Alice_помощь -> Red), поэтому кроме точного
+совпадения ищется единственный игрок, чьё имя начинается с этого слова.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Optional
+
+# Разделители слов в имени: пробелы, "_", "-", "."
+_SEPARATORS = re.compile(r"[\s_\-.]+")
+
+# Ключ узла префиксного дерева: игроки, у которых здесь заканчивается слово имени
+# (None не совпадёт ни с одним символом имени)
+_WORD = None
+
+
+def normalize_name(name: str) -> str:
+    """Ключ сравнения имён: NFC, casefold, ё -> е, разделители -> один пробел"""
+    name = unicodedata.normalize("NFC", name).casefold().replace("ё", "е")
+    return _SEPARATORS.sub(" ", name).strip()
+
+
+class PlayerNameIndex:
+    """
+    Точный поиск - словарь {нормализованное имя: {id}}, поиск по первому слову - префиксное
+    дерево. Оба за O(длины имени), сколько бы ни было игроков.
+    Неоднозначные имена (два игрока с одинаковым ключом) не разрешаются.
+    """
+
+    def __init__(self, players_file: str):
+        self.players_file = players_file
+        self.names: Dict[int, str] = {}   # user_id -> нормализованное имя
+        self._exact: Dict[str, set] = {}
+        self._trie: Dict = {}
+        self._stamp = None
+
+    def refresh(self) -> bool:
+        """Перечитывает список игроков, если файл изменился. Возвращает True, если индекс обновлён"""
+        try:
+            stat = os.stat(self.players_file)
+        except FileNotFoundError:
+            return False
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return False
+
+        try:
+            with open(self.players_file, "r", encoding="utf-8") as f:
+                players = json.load(f)
+        except json.JSONDecodeError:
+            return False  # Файл переписывается прямо сейчас - попробуем в следующий раз
+
+        self._stamp = stamp
+        self.update({int(user_id): player.get("username", "") for user_id, player in players.items()})
+        return True
+
+    def update(self, usernames: Dict[int, str]):
+        """Приводит индекс к списку {user_id: имя}, трогая только изменившихся игроков"""
+        for user_id in set(self.names) - set(usernames):
+            self._remove(user_id)
+
+        for user_id, username in usernames.items():
+            name = normalize_name(username)
+            if self.names.get(user_id) == name:
+                continue
+            if user_id in self.names:
+                self._remove(user_id)
+            if name:
+                self._add(user_id, name)
+
+    def resolve(self, name: str) -> Optional[int]:
+        """ID игрока по имени из хэштега или None, если игрок не найден или имя неоднозначно"""
+        key = normalize_name(name)
+        if not key:
+            return None
+
+        exact = self._exact.get(key)
+        if exact:
+            return next(iter(exact)) if len(exact) == 1 else None
+
+        node = self._trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+
+        candidates = node.get(_WORD)
+        if candidates and len(candidates) == 1:
+            return next(iter(candidates))
+        return None
+
+    def __len__(self):
+        return len(self.names)
+
+    # === Внутренние методы ===
+
+    def _add(self, user_id: int, name: str):
+        self.names[user_id] = name
+        self._exact.setdefault(name, set()).add(user_id)
+
+        node = self._trie
+        for char in name:
+            if char == " ":
+                node.setdefault(_WORD, set()).add(user_id)
+            node = node.setdefault(char, {})
+        node.setdefault(_WORD, set()).add(user_id)
+
+    def _remove(self, user_id: int):
+        name = self.names.pop(user_id)
+        ids = self._exact.get(name)
+        if ids:
+            ids.discard(user_id)
+            if not ids:
+                del self._exact[name]
+
+        # Пустые узлы остаются: они ничего не находят и пригодятся при следующем добавлении
+        node = self._trie
+        for char in name:
+            if char == " ":
+                node.get(_WORD, set()).discard(user_id)
+            node = node.get(char)
+            if node is None:
+                return
+        node.get(_WORD, set()).discard(user_id)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Индекс обработанных постов для RelationTracker
+Пост, который уже обработан, повторно не даёт взаимодействий, а у отредактированного
+поста применяется только разница эффектов.
+Свежие посты хранятся точно (хэш текста и применённые эффекты по целям),
+старые уходят в архив: отсортированные массивы id и хэшей.
+"""
+
+import base64
+import hashlib
+import json
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from ..file_utils import atomic_write_json
+
+# Сколько последних постов хранить с эффектами (правят обычно свежие посты)
+RECENT_LIMIT = 5000
+
+NEW, SEEN, EDITED = "new", "seen", "edited"
+
+
+def content_hash(post_content: str) -> int:
+    """64-битный хэш текста поста (со знаком - для array('q'))"""
+    digest = hashlib.blake2b(post_content.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class ProcessedPostIndex:
+    """
+    post_id -> хэш текста.
+    recent: {post_id: {"hash": h, "effects": {target_id: {"effect": x, "name": имя}}}} - O(1);
+    архив: отсортированные array('q') id и хэшей - 16 байт на пост, поиск бинарный.
+    """
+
+    def __init__(self, index_file: str, recent_limit: int = RECENT_LIMIT):
+        self.index_file = index_file
+        self.recent_limit = recent_limit
+        self.recent: Dict[int, Dict] = {}
+        self._archive_ids = array("q")
+        self._archive_hashes = array("q")
+        self._dirty = False
+        self._load()
+
+    def check(self, post_id: int, post_hash: int) -> Tuple[str, Optional[Dict]]:
+        """
+        (статус, прежние эффекты): NEW - пост не обрабатывался, SEEN - обработан и не менялся,
+        EDITED - текст изменился. Для отредактированного поста из архива эффекты неизвестны (None).
+        """
+        entry = self.recent.get(post_id)
+        if entry is not None:
+            if entry["hash"] == post_hash:
+                return SEEN, None
+            return EDITED, entry["effects"]
+
+        index = bisect_left(self._archive_ids, post_id)
+        if index < len(self._archive_ids) and self._archive_ids[index] == post_id:
+            if self._archive_hashes[index] == post_hash:
+                return SEEN, None
+            return EDITED, None
+
+        return NEW, None
+
+    def record(self, post_id: int, post_hash: int, effects: Dict):
+        """Запоминает пост и применённые эффекты {target_id: {"effect", "name"}}"""
+        self._remove_archived(post_id)
+        self.recent[post_id] = {"hash": post_hash, "effects": effects}
+        self._dirty = True
+
+        # Архив перестраивается пачками, а не на каждый пост сверх лимита
+        if len(self.recent) > self.recent_limit + self.recent_limit // 5:
+            self._archive_oldest()
+
+    def __len__(self):
+        return len(self.recent) + len(self._archive_ids)
+
+    def save(self):
+        """Сохраняет индекс, если он менялся"""
+        if not self._dirty:
+            return
+
+        data = {
+            "recent": {str(post_id): entry for post_id, entry in sorted(self.recent.items())},
+            "archive": {
+                "ids": base64.b64encode(self._archive_ids.tobytes()).decode("ascii"),
+                "hashes": base64.b64encode(self._archive_hashes.tobytes()).decode("ascii")
+            }
+        }
+
+        atomic_write_json(self.index_file, data, indent=None)
+        self._dirty = False
+
+    # === Внутренние методы ===
+
+    def _load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self.recent = {int(post_id): entry for post_id, entry in data.get("recent", {}).items()}
+        archive = data.get("archive", {})
+        self._archive_ids.frombytes(base64.b64decode(archive.get("ids", "")))
+        self._archive_hashes.frombytes(base64.b64decode(archive.get("hashes", "")))
+
+    def _archive_oldest(self):
+        """Переносит в архив самые старые (с меньшими id) посты сверх лимита"""
+        overflow = sorted(self.recent)[:len(self.recent) - self.recent_limit]
+        merged = dict(zip(self._archive_ids, self._archive_hashes))
+        for post_id in overflow:
+            merged[post_id] = self.recent.pop(post_id)["hash"]
+
+        ids = sorted(merged)
+        self._archive_ids = array("q", ids)
+        self._archive_hashes = array("q", (merged[post_id] for post_id in ids))
+
+    def _remove_archived(self, post_id: int):
+        index = bisect_left(self._archive_ids, post_id)
+        if index < len(self._archive_ids) and self._archive_ids[index] == post_id:
+            del self._archive_ids[index]
+            del self._archive_hashes[index]
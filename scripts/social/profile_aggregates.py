@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Накопительные итоги социальных профилей
+Для каждого игрока хранятся суммы, из которых SocialProfileCalculator строит профиль:
+общий балл, баллы и число взаимодействий по категориям. Каждое новое взаимодействие
+меняет итоги отправителя и получателя за O(1) и помечает их "грязными" - пересчитывать
+и перезаписывать нужно только их профили.
+"""
+
+import json
+from typing import Dict, Iterable, Optional
+
+from ..file_utils import atomic_write_json
+
+
+class ProfileAggregates:
+    """
+    players: {player_id: {"total_score", "interaction_count", "category_scores", "category_counts"}};
+    dirty: игроки, чьи итоги изменились после последнего пересчёта профиля;
+    records: сколько записей журнала учтено - по нему видно, что итоги отстали от журнала.
+    """
+
+    def __init__(self, state_file: Optional[str], actions_config: Dict):
+        self.state_file = state_file
+        self.categories = list(actions_config["categories"])
+        self.action_categories = {action: data["category"] for action, data in actions_config["actions"].items()}
+
+        self.players: Dict[int, Dict] = {}
+        self.dirty = set()
+        self.records = 0
+        self._changed = False
+        self._load()
+
+    def add(self, record: Dict):
+        """Учитывает взаимодействие в итогах обоих игроков"""
+        for player_id in {record.get("from_player_id"), record.get("to_player_id")} - {None}:
+            aggregate = self.players.get(player_id)
+            if aggregate is None:
+                aggregate = self.players[player_id] = self._empty()
+            self._apply(aggregate, record)
+            self.dirty.add(player_id)
+        self.records += 1
+        self._changed = True
+
+    def get(self, player_id: int) -> Optional[Dict]:
+        return self.players.get(player_id)
+
+    def mark_clean(self, player_id: int):
+        if player_id in self.dirty:
+            self.dirty.discard(player_id)
+            self._changed = True
+
+    def sync(self, interaction_log) -> bool:
+        """
+        Пересобирает итоги из журнала, если они отстали от него (сбой до save()
+        или файла итогов ещё нет). Все игроки после пересборки - грязные.
+        Возвращает True, если итоги пересобраны.
+        """
+        if self.records == len(interaction_log):
+            return False
+        self.rebuild(interaction_log.read())
+        return True
+
+    def rebuild(self, records: Iterable[Dict]):
+        self.players = {}
+        self.records = 0
+        for record in records:
+            self.add(record)
+        self.dirty = set(self.players)
+        self._changed = True
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], actions_config: Dict) -> "ProfileAggregates":
+        """Итоги по списку взаимодействий, без файла состояния"""
+        aggregates = cls(None, actions_config)
+        for record in records:
+            aggregates.add(record)
+        return aggregates
+
+    def save(self):
+        """Сохраняет итоги, если они менялись"""
+        if not self._changed or not self.state_file:
+            return
+
+        data = {
+            "records": self.records,
+            "dirty": sorted(self.dirty),
+            "players": {str(player_id): aggregate for player_id, aggregate in sorted(self.players.items())}
+        }
+
+        atomic_write_json(self.state_file, data, indent=None)
+        self._changed = False
+
+    # === Внутренние методы ===
+
+    def _empty(self) -> Dict:
+        return {
+            "total_score": 0,
+            "interaction_count": 0,
+            "category_scores": {category: 0 for category in self.categories},
+            "category_counts": {category: 0 for category in self.categories}
+        }
+
+    def _apply(self, aggregate: Dict, record: Dict):
+        effect = record.get("effect", 0)
+        aggregate["total_score"] += effect
+
+        if record.get("edited"):
+            # Поправка правки поста: не новое взаимодействие, а изменение прежнего эффекта цели.
+            # Баллы категории - модули эффектов, поэтому меняются на разницу модулей;
+            # взаимодействие появляется или исчезает, только если эффект цели стал или перестал быть ненулевым
+            previous = record.get("previous_effect")
+            if previous is None:
+                return  # Поправка без прежнего эффекта - баллы категории не угадываем
+            current = previous + effect
+            score_change = abs(current) - abs(previous)
+            count_change = (current != 0) - (previous != 0)
+        else:
+            score_change, count_change = abs(effect), 1  # Используем абсолютное значение
+
+        aggregate["interaction_count"] += count_change
+        category = self.action_categories.get(record.get("action", ""))
+        if category:
+            aggregate["category_scores"][category] += score_change
+            aggregate["category_counts"][category] += count_change
+
+    def _load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self.records = data.get("records", 0)
+        self.dirty = set(data.get("dirty", []))
+        self.players = {int(player_id): aggregate for player_id, aggregate in data.get("players", {}).items()}
@@ -8,12 +8,17 @@ import json
 import os
 from datetime import datetime
 from typing import Dict, List, Tuple
-import glob
+
+from .interaction_log import InteractionLog
+from .profile_aggregates import ProfileAggregates
 
 class SocialProfileCalculator:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", interaction_log=None, aggregates=None):
         self.data_dir = data_dir
         
+        # Журнал взаимодействий; RelationTracker передаёт свой, чтобы видеть ещё не сброшенные записи
+        self.interaction_log = interaction_log or InteractionLog(os.path.join(data_dir, "social_history", "log"))
+        
         # Настройки иконок
         self.icon_config = {
             "score_ranges": [
@@ -37,32 +42,26 @@ class SocialProfileCalculator:
         # Загружаем конфиг действий
         with open(os.path.join(data_dir, "actions_config.json"), "r", encoding="utf-8") as f:
             self.actions_config = json.load(f)
+        
+        # Накопительные итоги игроков; RelationTracker передаёт свои, обновляемые при каждом взаимодействии
+        if aggregates is None:
+            aggregates = ProfileAggregates(os.path.join(data_dir, "state", "social_aggregates.json"), self.actions_config)
+            aggregates.sync(self.interaction_log)
+        self.aggregates = aggregates
     
     def calculate_player_profile(self, player_id: int) -> Dict:
         """
         Рассчитывает полный социальный профиль игрока
+        (по накопительным итогам, без чтения взаимодействий)
         """
-        # Собираем все взаимодействия игрока
-        interactions = self._get_player_interactions(player_id)
+        aggregate = self.aggregates.get(player_id)
         
-        if not interactions:
+        if not aggregate or not aggregate["interaction_count"]:
             return self._get_default_profile(player_id)
         
-        # Рассчитываем статистику
-        total_score = 0
-        category_scores = {cat: 0 for cat in self.actions_config["categories"]}
-        category_counts = {cat: 0 for cat in self.actions_config["categories"]}
-        
-        for interaction in interactions:
-            effect = interaction.get("effect", 0)
-            total_score += effect
-            
-            # Определяем категорию действия
-            action = interaction.get("action", "")
-            if action in self.actions_config["actions"]:
-                category = self.actions_config["actions"][action]["category"]
-                category_scores[category] += abs(effect)  # Используем абсолютное значение
-                category_counts[category] += 1
+        total_score = aggregate["total_score"]
+        category_scores = dict(aggregate["category_scores"])
+        category_counts = dict(aggregate["category_counts"])
         
         # Определяем доминирующую категорию
         dominant_category = max(category_scores.items(), key=lambda x: x[1])[0]
@@ -88,7 +87,7 @@ class SocialProfileCalculator:
             "player_id": player_id,
             "calculated_at": datetime.now().isoformat(),
             "total_score": total_score,
-            "interaction_count": len(interactions),
+            "interaction_count": aggregate["interaction_count"],
             "icons": icons,
             "category_distribution": {
                 "scores": category_scores,
@@ -106,27 +105,15 @@ class SocialProfileCalculator:
         
         return profile
     
-    def _get_player_interactions(self, player_id: int) -> List[Dict]:
-        """Получает все взаимодействия игрока"""
-        interactions = []
-        
-        # Ищем файлы взаимодействий
-        pattern = os.path.join(self.data_dir, "social_history", f"*_{player_id}.json")
-        files = glob.glob(pattern)
-        
-        # Также ищем файлы, где player_id - отправитель
-        pattern2 = os.path.join(self.data_dir, "social_history", f"interaction_*_{player_id}.json")
-        files.extend(glob.glob(pattern2))
-        
-        for file_path in files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    interaction = json.load(f)
-                    interactions.append(interaction)
-            except (json.JSONDecodeError, FileNotFoundError):
-                continue
-        
-        return interactions
+    def update_dirty_profiles(self) -> List[int]:
+        """Пересчитывает и сохраняет профили игроков, чьи итоги изменились. Возвращает их ID"""
+        updated = []
+        for player_id in sorted(self.aggregates.dirty):
+            self.calculate_player_profile(player_id)
+            self.aggregates.mark_clean(player_id)
+            updated.append(player_id)
+        self.aggregates.save()
+        return updated
     
     def _determine_icons(self, total_score: int, dominant_category: str) -> Dict:
         """Определяет иконки для профиля"""
@@ -5,17 +5,66 @@
 Отвечает за парсинг тегов и обновление отношений
 """
 
+import glob
+import itertools
 import re
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import os
 
+from ..file_utils import atomic_write_json
+from .hashtag_matcher import HashtagMatcher
+from .interaction_log import InteractionLog
+from .player_names import PlayerNameIndex
+from .profile_aggregates import ProfileAggregates
+from .processed_posts import EDITED, SEEN, ProcessedPostIndex, content_hash
+from .relationship_matrix import RelationshipMatrix
+
 class RelationTracker:
+    # Переменные эффекты: действие -> (ключевые слова, эффект со словом, эффект без слова)
+    VARIABLE_EFFECTS = {
+        "долг": (frozenset({"жизнь", "спасение", "риск"}), 10, 5),     # Значительный / обычный долг
+        "тайна": (frozenset({"опасный", "секрет", "убийство"}), 10, 5)  # Опасная / обычная тайна
+    }
+    
+    # До скольких модификаторов в теге эффекты считаются заранее
+    EFFECT_TABLE_MODIFIERS = 3
+    
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
         self.load_configs()
         
+        # Какие посты уже обработаны: повторная обработка не дублирует взаимодействия
+        self.processed_posts = ProcessedPostIndex(os.path.join(data_dir, "state", "social_processed.json"))
+        
+        # Журнал взаимодействий; взаимодействия из отдельных файлов прежнего формата переносятся в него
+        self.interaction_log = InteractionLog(os.path.join(data_dir, "social_history", "log"))
+        legacy_files = glob.glob(os.path.join(data_dir, "social_history", "interaction_*.json"))
+        if legacy_files:
+            print(f"📦 Перенесено в журнал взаимодействий: {self.interaction_log.import_files(legacy_files)}")
+        
+        # Накопительные итоги профилей, обновляются вместе с журналом
+        self.profile_aggregates = ProfileAggregates(os.path.join(data_dir, "state", "social_aggregates.json"),
+                                                    self.actions_config)
+        if self.profile_aggregates.sync(self.interaction_log):
+            print(f"🧮 Итоги профилей пересобраны по журналу: {len(self.profile_aggregates.players)} игроков")
+        
+        # Имена игроков для целей хэштегов (перечитываются, когда меняется список игроков)
+        self.player_names = PlayerNameIndex(os.path.join(data_dir, "players", "all_players.json"))
+        
+        # Текущие счёты отношений - в матрице (рядом с индексом обработанных постов, сохраняются вместе);
+        # счёты из файлов пар прежнего формата переносятся в неё
+        self.relationship_matrix = RelationshipMatrix(os.path.join(data_dir, "state", "relationships"))
+        if not self.relationship_matrix.players:
+            imported = self._import_relationship_scores(os.path.join(data_dir, "players", "relationships"))
+            if imported:
+                print(f"📦 Перенесено в матрицу отношений: {imported}")
+        
+        # Отношения пар, изменённые в пакетном режиме и ещё не записанные: {(a, b): отношение}
+        self._relationships = {}
+        self._batch = False
+        
     def load_configs(self):
         """Загружает конфигурации действий и модификаторов"""
         with open(os.path.join(self.data_dir, "actions_config.json"), "r", encoding="utf-8") as f:
@@ -23,6 +72,12 @@ class RelationTracker:
         
         with open(os.path.join(self.data_dir, "modifiers_config.json"), "r", encoding="utf-8") as f:
             self.modifiers_config = json.load(f)
+        
+        # Поиск хэштегов собирается один раз из словарей действий и модификаторов
+        self.hashtag_matcher = HashtagMatcher(self.actions_config["actions"], self.modifiers_config["modifiers"])
+        
+        # Эффекты всех сочетаний действия и модификаторов
+        self._build_effect_table()
     
     def parse_hashtag(self, hashtag: str) -> Optional[Dict]:
         """
@@ -60,34 +115,42 @@ class RelationTracker:
     def extract_hashtags_from_post(self, post_content: str) -> List[Dict]:
         """
         Извлекает все валидные хэштеги взаимодействий из поста
+        (за один проход скомпилированного HashtagMatcher, результат как у parse_hashtag)
         """
-        hashtags = []
-        
-        # Ищем все хэштеги в посте
-        hashtag_pattern = r'#(\w+(?:_\w+)*)'
-        matches = re.findall(hashtag_pattern, post_content)
-        
-        for match in matches:
-            parsed = self.parse_hashtag(f"#{match}")
-            if parsed:
-                hashtags.append(parsed)
-        
-        return hashtags
+        return [
+            {
+                "target_player": player_name,
+                "action": action,
+                "modifiers": modifiers,
+                "raw_tag": raw_tag
+            }
+            for player_name, action, modifiers, raw_tag in self.hashtag_matcher.scan(post_content)
+        ]
     
     def calculate_effect(self, interaction: Dict, description: str = "") -> int:
         """
         Рассчитывает эффект взаимодействия с учётом модификаторов
+        (поиск в таблице, построенной при загрузке конфигов)
         """
-        action_data = self.actions_config["actions"][interaction["action"]]
-        base_effect = action_data["base_effect"]
+        action = interaction["action"]
+        base_effect = self._base_effects[action]
         
         # Для переменных эффектов анализируем контекст
-        if base_effect == "variable":
-            base_effect = self._calculate_variable_effect(interaction["action"], description)
+        if base_effect is None:
+            base_effect = self._calculate_variable_effect(action, description)
         
+        key = (base_effect, tuple(interaction["modifiers"]))
+        effect = self.effect_table.get(key)
+        if effect is None:
+            # Больше модификаторов, чем в таблице, - считаем и запоминаем
+            effect = self.effect_table[key] = self._compute_effect(*key)
+        return effect
+    
+    def _compute_effect(self, base_effect: int, modifiers: Tuple[str, ...]) -> int:
+        """Эффект по базовому значению и модификаторам"""
         # Применяем модификаторы
         total_modifier = 1.0
-        for modifier in interaction["modifiers"]:
+        for modifier in modifiers:
             if modifier in self.modifiers_config["modifiers"]:
                 total_modifier *= self.modifiers_config["modifiers"][modifier]
         
@@ -103,30 +166,76 @@ class RelationTracker:
         
         return final_effect
     
+    def _build_effect_table(self):
+        """
+        Таблица эффектов {(базовый эффект, модификаторы): эффект} для всех действий
+        и всех последовательностей до EFFECT_TABLE_MODIFIERS модификаторов.
+        Порядок модификаторов сохраняется: от него зависит округление произведения.
+        """
+        self._base_effects = {
+            action: None if data["base_effect"] == "variable" else data["base_effect"]
+            for action, data in self.actions_config["actions"].items()
+        }
+        
+        base_effects = {effect for effect in self._base_effects.values() if effect is not None}
+        base_effects.update(effect for _, heavy, light in self.VARIABLE_EFFECTS.values() for effect in (heavy, light))
+        base_effects.add(0)  # Переменное действие без правила
+        
+        modifiers = list(self.modifiers_config["modifiers"])
+        self.effect_table = {}
+        for count in range(self.EFFECT_TABLE_MODIFIERS + 1):
+            for combination in itertools.product(modifiers, repeat=count):
+                for base_effect in base_effects:
+                    self.effect_table[(base_effect, combination)] = self._compute_effect(base_effect, combination)
+        
+        # Все ключевые слова переменных эффектов - одним выражением, пост просматривается один раз
+        keywords = {word for words, _, _ in self.VARIABLE_EFFECTS.values() for word in words}
+        self._keyword_pattern = re.compile("|".join(re.escape(word) for word in sorted(keywords, key=len, reverse=True)))
+        self._keyword_cache = (None, frozenset())
+    
     def _calculate_variable_effect(self, action: str, description: str) -> int:
         """Рассчитывает переменный эффект на основе контекста"""
-        if action == "долг":
-            # Анализируем описание долга
-            if any(word in description.lower() for word in ["жизнь", "спасение", "риск"]):
-                return 10  # Значительный долг
-            else:
-                return 5   # Обычный долг
-        elif action == "тайна":
-            if any(word in description.lower() for word in ["опасный", "секрет", "убийство"]):
-                return 10  # Опасная тайна
-            else:
-                return 5   # Обычная тайна
+        rule = self.VARIABLE_EFFECTS.get(action)
+        if rule is None:
+            return 0
         
-        return 0
+        words, heavy, light = rule
+        return heavy if self._description_keywords(description) & words else light
+    
+    def _description_keywords(self, description: str) -> frozenset:
+        """Ключевые слова переменных эффектов в тексте (для последнего текста - из кэша)"""
+        cached_description, found = self._keyword_cache
+        if description is not cached_description:
+            found = frozenset(self._keyword_pattern.findall(description.lower()))
+            self._keyword_cache = (description, found)
+        return found
     
     def process_player_post(self, player_id: int, player_name: str, 
-                           post_content: str, post_date: datetime) -> List[Dict]:
+                           post_content: str, post_date: datetime,
+                           post_id: Optional[int] = None) -> List[Dict]:
         """
-        Обрабатывает пост игрока, извлекает взаимодействия и обновляет отношения
+        Обрабатывает пост игрока, извлекает взаимодействия и обновляет отношения.
+        С post_id обработка идемпотентна: уже обработанный пост пропускается,
+        у отредактированного применяется только разница эффектов по каждой цели.
+        Индекс обработанных постов сохраняется через save().
         """
+        post_hash = None
+        previous_effects = {}
+        if post_id is not None:
+            post_hash = content_hash(post_content)
+            status, previous = self.processed_posts.check(post_id, post_hash)
+            if status == SEEN:
+                return []
+            if status == EDITED:
+                if previous is None:
+                    # Пост давно ушёл в архив, прежние эффекты неизвестны - не рискуем применить их дважды
+                    self.processed_posts.record(post_id, post_hash, {})
+                    return []
+                previous_effects = previous
+        
         interactions = self.extract_hashtags_from_post(post_content)
         
-        processed = []
+        new_records = []
         for interaction in interactions:
             # Ищем ID целевого игрока
             target_id = self._find_player_id_by_name(interaction["target_player"])
@@ -137,7 +246,7 @@ class RelationTracker:
             effect = self.calculate_effect(interaction, post_content)
             
             # Создаём запись о взаимодействии
-            interaction_record = {
+            new_records.append({
                 "from_player_id": player_id,
                 "from_player_name": player_name,
                 "to_player_id": target_id,
@@ -146,25 +255,98 @@ class RelationTracker:
                 "modifiers": interaction["modifiers"],
                 "effect": effect,
                 "description": self._extract_description(post_content),
+                "post_id": post_id,
                 "post_date": post_date.isoformat(),
                 "processed_date": datetime.now().isoformat()
-            }
-            
+            })
+        
+        records = new_records
+        if previous_effects:
+            records = self._edit_deltas(new_records, previous_effects, player_id, player_name,
+                                        post_content, post_date, post_id)
+        
+        for interaction_record in records:
             # Сохраняем взаимодействие
             self._save_interaction(interaction_record)
             
             # Обновляем отношения между игроками
-            self._update_relationship(player_id, target_id, effect, interaction_record)
+            self._update_relationship(player_id, interaction_record["to_player_id"],
+                                      interaction_record["effect"], interaction_record)
+        
+        if post_id is not None:
+            # Запоминаются итоговые эффекты текущего текста поста (не поправки)
+            self.processed_posts.record(post_id, post_hash, self._effects_by_target(new_records))
+        
+        return records
+    
+    def begin_batch(self):
+        """
+        Пакетный режим для обработки многих постов: изменения отношений копятся
+        в памяти по парам и записываются в save() - каждый затронутый файл пары один раз.
+        """
+        self._batch = True
+    
+    def save(self):
+        """Записывает отношения пакета, сбрасывает журнал взаимодействий и сохраняет индексы"""
+        self._flush_relationships()
+        self.interaction_log.save()
+        self.profile_aggregates.save()
+        self.processed_posts.save()
+    
+    def _effects_by_target(self, records: List[Dict]) -> Dict:
+        """Суммарный эффект поста по каждой цели: {target_id: {"effect", "name", "action"}}"""
+        effects = {}
+        for record in records:
+            target = effects.setdefault(str(record["to_player_id"]), {"effect": 0})
+            target["effect"] += record["effect"]
+            target["name"] = record["to_player_name"]
+            target["action"] = record["action"]
+        return effects
+    
+    def _edit_deltas(self, records: List[Dict], previous_effects: Dict, player_id: int, player_name: str,
+                     post_content: str, post_date: datetime, post_id: int) -> List[Dict]:
+        """
+        Записи-поправки для отредактированного поста: по каждой цели разница
+        нового и прежнего эффекта. Цели без изменений не дают записей.
+        """
+        current = self._effects_by_target(records)
+        last_record = {str(record["to_player_id"]): record for record in records}
+        
+        deltas = []
+        for target_id in sorted(set(current) | set(previous_effects), key=int):
+            delta = current.get(target_id, {}).get("effect", 0) - previous_effects.get(target_id, {}).get("effect", 0)
+            if delta == 0:
+                continue
             
-            processed.append(interaction_record)
+            if target_id in last_record:
+                delta_record = dict(last_record[target_id])
+            else:
+                # Цель убрана из поста - откатываем её прежний эффект
+                previous = previous_effects[target_id]
+                delta_record = {
+                    "from_player_id": player_id,
+                    "from_player_name": player_name,
+                    "to_player_id": int(target_id),
+                    "to_player_name": previous["name"],
+                    "action": previous["action"],
+                    "modifiers": [],
+                    "effect": 0,
+                    "description": self._extract_description(post_content),
+                    "post_id": post_id,
+                    "post_date": post_date.isoformat(),
+                    "processed_date": datetime.now().isoformat()
+                }
+            delta_record["effect"] = delta
+            delta_record["previous_effect"] = previous_effects.get(target_id, {}).get("effect", 0)
+            delta_record["edited"] = True
+            deltas.append(delta_record)
         
-        return processed
+        return deltas
     
     def _find_player_id_by_name(self, player_name: str) -> Optional[int]:
-        """Ищет ID игрока по имени (заглушка - нужно интегрировать с реальной БД)"""
-        # TODO: Интегрировать с реальной базой игроков
-        player_map = {}  # Заглушка
-        return player_map.get(player_name.lower())
+        """Ищет ID игрока по имени из хэштега (см. PlayerNameIndex)"""
+        self.player_names.refresh()
+        return self.player_names.resolve(player_name)
     
     def _extract_description(self, post_content: str) -> str:
         """Извлекает описание взаимодействия из поста"""
@@ -178,47 +360,78 @@ class RelationTracker:
         return ' '.join(description_lines)[:200]  # Ограничиваем длину
     
     def _save_interaction(self, interaction: Dict):
-        """Сохраняет взаимодействие в файл"""
-        filename = f"data/social_history/interaction_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{interaction['from_player_id']}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(interaction, f, ensure_ascii=False, indent=2)
+        """Дописывает взаимодействие в журнал и итоги профилей (на диск - в save())"""
+        self.interaction_log.append(interaction)
+        self.profile_aggregates.add(interaction)
     
     def _update_relationship(self, player_a_id: int, player_b_id: int, 
                            effect: int, interaction: Dict):
-        """Обновляет отношения между двумя игроками"""
-        # Загружаем текущие отношения
-        rel_file = f"data/players/relationships/{player_a_id}_{player_b_id}.json"
+        """Обновляет отношения между двумя игроками (в пакетном режиме - только в памяти)"""
+        key = (player_a_id, player_b_id)
+        relationship = self._relationships.get(key)
+        if relationship is None:
+            relationship = self._relationships[key] = self._load_relationship(player_a_id, player_b_id)
         
-        if os.path.exists(rel_file):
-            with open(rel_file, 'r', encoding='utf-8') as f:
-                relationship = json.load(f)
-        else:
-            relationship = {
-                "player_a_id": player_a_id,
-                "player_b_id": player_b_id,
-                "total_score": 0,
-                "history": [],
-                "last_updated": datetime.now().isoformat()
-            }
+        # Обновляем счёт; ограничение от -100 до 100 - после каждого взаимодействия, по порядку
+        relationship["total_score"] = max(-100, min(100, relationship["total_score"] + effect))
         
-        # Обновляем счёт
-        relationship["total_score"] += effect
-        
-        # Ограничиваем от -100 до 100
-        relationship["total_score"] = max(-100, min(100, relationship["total_score"]))
-        
-        # Добавляем в историю
+        # Добавляем в историю, оставляя последние 50 записей
         relationship["history"].append({
             "interaction": interaction,
             "date": datetime.now().isoformat()
         })
+        del relationship["history"][:-50]
         
-        # Ограничиваем историю последними 50 записями
-        relationship["history"] = relationship["history"][-50:]
-        
-        # Сохраняем
-        relationship["last_updated"] = datetime.now().isoformat()
-        
-        os.makedirs(os.path.dirname(rel_file), exist_ok=True)
-        with open(rel_file, 'w', encoding='utf-8') as f:
-            json.dump(relationship, f, ensure_ascii=False, indent=2)
+        if not self._batch:
+            self._flush_relationships()
+    
+    def _relationship_file(self, player_a_id: int, player_b_id: int) -> str:
+        return os.path.join(self.data_dir, "players", "relationships", f"{player_a_id}_{player_b_id}.json")
+    
+    def _load_relationship(self, player_a_id: int, player_b_id: int) -> Dict:
+        """Счёт пары из матрицы и история из файла пары"""
+        relationship = {
+            "player_a_id": player_a_id,
+            "player_b_id": player_b_id,
+            "total_score": self.relationship_matrix.score(player_a_id, player_b_id),
+            "history": []
+        }
+        rel_file = self._relationship_file(player_a_id, player_b_id)
+        if os.path.exists(rel_file):
+            with open(rel_file, 'r', encoding='utf-8') as f:
+                relationship["history"] = json.load(f).get("history", [])
+        return relationship
+    
+    def _flush_relationships(self):
+        """Записывает изменённые отношения: счёт - на месте в матрицу, историю - по одному файлу на пару"""
+        for (player_a_id, player_b_id), relationship in sorted(self._relationships.items()):
+            self.relationship_matrix.set(player_a_id, player_b_id, relationship["total_score"])
+            
+            atomic_write_json(self._relationship_file(player_a_id, player_b_id), {
+                "player_a_id": player_a_id,
+                "player_b_id": player_b_id,
+                "history": relationship["history"]
+            })
+        self._relationships = {}
+        self.relationship_matrix.flush()
+    
+    def _import_relationship_scores(self, relationships_dir: str) -> int:
+        """Переносит счёты из файлов пар прежнего формата (с total_score) в матрицу"""
+        imported = 0
+        for rel_file in sorted(glob.glob(os.path.join(relationships_dir, "*_*.json"))):
+            try:
+                with open(rel_file, 'r', encoding='utf-8') as f:
+                    relationship = json.load(f)
+            except json.JSONDecodeError:
+                continue
+            if "total_score" not in relationship:
+                continue
+            
+            updated = None
+            if relationship.get("last_updated"):
+                updated = datetime.fromisoformat(relationship["last_updated"]).timestamp()
+            self.relationship_matrix.set(relationship["player_a_id"], relationship["player_b_id"],
+                                         relationship["total_score"], updated)
+            imported += 1
+        self.relationship_matrix.flush()
+        return imported
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Матрица отношений игроков
+Текущие счёты отношений (кто -> к кому) и время их изменения хранятся разреженно:
+только пары, между которыми что-то было. Игрок при первом появлении получает порядковый номер.
+
+matrix.bin - CSR, открытый через mmap: смещения строк (по номеру игрока) и записи строк,
+отсортированные по номеру второго игрока. Счёт пары находится бинарным поиском в строке,
+отношение игрока ко всем - одним срезом, отношение всех к игроку - проходом по записям
+без открытия файлов пар (в них остаётся только история).
+matrix.log - пары, которых ещё нет в CSR: дописываются в конец и собираются в CSR пачкой.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..file_utils import atomic_write_bytes, atomic_write_json
+
+_MAGIC = b"RELS"
+_HEADER = struct.Struct("<4sII4x")       # Сигнатура, число строк, число записей
+_OFFSET = struct.Struct("<I")             # Начало строки (номер записи)
+_ENTRY = struct.Struct("<IhxxI4x")        # Номер игрока, счёт, время изменения (Unix); 16 байт
+_LOG_ENTRY = struct.Struct("<IIhxxI")     # Номера пары, счёт, время изменения; 16 байт
+
+# Сколько новых пар копить в matrix.log, прежде чем пересобрать CSR
+LOG_REBUILD_MIN = 1024
+
+
+class RelationshipMatrix:
+    """
+    Счёт существующей пары меняется на месте: одна выровненная запись в 16 байт,
+    которая не пересекает границу страницы и не бывает записана наполовину.
+    Новые пары до пересборки живут в памяти и в matrix.log.
+    Порядковые номера игроков - в ordinals.json, записываются в flush().
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.matrix_file = os.path.join(directory, "matrix.bin")
+        self.log_file = os.path.join(directory, "matrix.log")
+        self.ordinals_file = os.path.join(directory, "ordinals.json")
+
+        self.players: List[int] = []      # Порядковый номер -> ID игрока
+        self.ordinals: Dict[int, int] = {}
+        self._ordinals_changed = False
+
+        self.rows = 0
+        self.entries = 0
+        self._file = None
+        self._map = None
+
+        # Пары вне CSR: {номер a: {номер b: (счёт, время)}}; ещё не дописанные в matrix.log
+        self._overlay: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        self._overlay_size = 0
+        self._unwritten: List[bytes] = []
+        self._load()
+
+    def __len__(self):
+        """Число пар с отношением"""
+        return self.entries + self._overlay_size
+
+    def get(self, player_a_id: int, player_b_id: int) -> Optional[Tuple[int, int]]:
+        """(счёт, время изменения) отношения a к b или None, если отношения нет"""
+        a, b = self.ordinals.get(player_a_id), self.ordinals.get(player_b_id)
+        if a is None or b is None:
+            return None
+        record = self._overlay.get(a, {}).get(b)
+        if record is not None:
+            return record
+        position = self._find(a, b)
+        if position is None:
+            return None
+        _, score, updated = _ENTRY.unpack_from(self._map, position)
+        return score, updated
+
+    def score(self, player_a_id: int, player_b_id: int) -> int:
+        record = self.get(player_a_id, player_b_id)
+        return record[0] if record else 0
+
+    def set(self, player_a_id: int, player_b_id: int, score: int, updated: Optional[int] = None):
+        """Записывает счёт пары: в CSR - на месте, новую пару - в журнал пар (на диск - в flush())"""
+        a, b = self._ordinal(player_a_id), self._ordinal(player_b_id)
+        updated = int(updated or time.time())
+
+        position = None if b in self._overlay.get(a, {}) else self._find(a, b)
+        if position is not None:
+            self._map[position:position + _ENTRY.size] = _ENTRY.pack(b, score, updated)
+            return
+
+        row = self._overlay.setdefault(a, {})
+        if b not in row:
+            self._overlay_size += 1
+        row[b] = (score, updated)
+        self._unwritten.append(_LOG_ENTRY.pack(a, b, score, updated))
+
+    def row(self, player_id: int) -> Dict[int, Tuple[int, int]]:
+        """Отношения игрока ко всем: {ID: (счёт, время изменения)}"""
+        a = self.ordinals.get(player_id)
+        if a is None:
+            return {}
+        row = {}
+        if a < self.rows:
+            start, end = self._row_bounds(a)
+            for b, score, updated in _ENTRY.iter_unpack(self._map[start:end]):
+                row[self.players[b]] = (score, updated)
+        for b, record in self._overlay.get(a, {}).items():
+            row[self.players[b]] = record
+        return row
+
+    def column(self, player_id: int) -> Dict[int, Tuple[int, int]]:
+        """Отношения всех к игроку: {ID: (счёт, время изменения)}"""
+        b = self.ordinals.get(player_id)
+        if b is None:
+            return {}
+        column = {}
+        for a in range(self.rows):
+            position = self._find(a, b)
+            if position is not None:
+                _, score, updated = _ENTRY.unpack_from(self._map, position)
+                column[self.players[a]] = (score, updated)
+        for a, row in self._overlay.items():
+            if b in row:
+                column[self.players[a]] = row[b]
+        return column
+
+    def flush(self):
+        """
+        Сохраняет новые номера игроков, дописывает новые пары в журнал пар
+        и сбрасывает изменённые страницы CSR. Накопившиеся пары собираются в CSR.
+        """
+        if self._ordinals_changed:
+            # Номера - раньше записей журнала пар, которые на них ссылаются
+            atomic_write_json(self.ordinals_file, self.players, indent=None)
+            self._ordinals_changed = False
+
+        if self._unwritten:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.log_file, "ab") as f:
+                f.write(b"".join(self._unwritten))
+                f.flush()
+                os.fsync(f.fileno())
+            self._unwritten = []
+
+        if self._map is not None:
+            self._map.flush()
+
+        if self._overlay_size > max(LOG_REBUILD_MIN, self.entries // 4):
+            self._rebuild()
+
+    def close(self):
+        self.flush()
+        self._close_map()
+
+    # === Внутренние методы ===
+
+    def _ordinal(self, player_id: int) -> int:
+        ordinal = self.ordinals.get(player_id)
+        if ordinal is None:
+            ordinal = self.ordinals[player_id] = len(self.players)
+            self.players.append(player_id)
+            self._ordinals_changed = True
+        return ordinal
+
+    def _entries_start(self) -> int:
+        # Записи выровнены по 16 байт, как и размер страницы
+        start = _HEADER.size + (self.rows + 1) * _OFFSET.size
+        return (start + _ENTRY.size - 1) // _ENTRY.size * _ENTRY.size
+
+    def _row_bounds(self, a: int) -> Tuple[int, int]:
+        """Байтовые границы записей строки a"""
+        first, = _OFFSET.unpack_from(self._map, _HEADER.size + a * _OFFSET.size)
+        last, = _OFFSET.unpack_from(self._map, _HEADER.size + (a + 1) * _OFFSET.size)
+        start = self._entries_start()
+        return start + first * _ENTRY.size, start + last * _ENTRY.size
+
+    def _find(self, a: int, b: int) -> Optional[int]:
+        """Байтовое смещение записи (a, b) в CSR или None"""
+        if a >= self.rows:
+            return None
+        start, end = self._row_bounds(a)
+        low, high = 0, (end - start) // _ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            column, = _OFFSET.unpack_from(self._map, start + middle * _ENTRY.size)
+            if column < b:
+                low = middle + 1
+            else:
+                high = middle
+        position = start + low * _ENTRY.size
+        if position < end and _OFFSET.unpack_from(self._map, position)[0] == b:
+            return position
+        return None
+
+    def _rebuild(self):
+        """Собирает CSR из текущего CSR и пар журнала и очищает журнал пар"""
+        rows = len(self.players)
+        offsets, entries = [0], []
+        for a in range(rows):
+            row = {}
+            if a < self.rows:
+                start, end = self._row_bounds(a)
+                row = {b: (score, updated) for b, score, updated in _ENTRY.iter_unpack(self._map[start:end])}
+            row.update(self._overlay.get(a, {}))
+            entries.extend(_ENTRY.pack(b, *row[b]) for b in sorted(row))
+            offsets.append(len(entries))
+
+        header = _HEADER.pack(_MAGIC, rows, len(entries)) + b"".join(_OFFSET.pack(offset) for offset in offsets)
+        header += b"\0" * (-len(header) % _ENTRY.size)
+
+        self._close_map()
+        atomic_write_bytes(self.matrix_file, header + b"".join(entries))
+        self._open_map()
+
+        # Если сбой случится до очистки, _load() узнает собранный журнал по парам, уже лежащим в CSR
+        with open(self.log_file, "wb"):
+            pass
+        self._overlay = {}
+        self._overlay_size = 0
+
+    def _open_map(self):
+        self._file = open(self.matrix_file, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.rows, self.entries = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self._close_map()
+            raise ValueError(f"Файл {self.matrix_file} не является матрицей отношений")
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.rows = self.entries = 0
+
+    def _load(self):
+        try:
+            with open(self.ordinals_file, "r", encoding="utf-8") as f:
+                self.players = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.players = []
+        self.ordinals = {player_id: ordinal for ordinal, player_id in enumerate(self.players)}
+
+        if os.path.exists(self.matrix_file):
+            self._open_map()
+
+        try:
+            with open(self.log_file, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Недописанная после сбоя запись в конце отбрасывается; номера, не успевшие сохраниться, - тоже
+        data = data[:len(data) - len(data) % _LOG_ENTRY.size]
+        records = [record for record in _LOG_ENTRY.iter_unpack(data) if max(record[:2]) < len(self.players)]
+
+        if any(self._find(a, b) is not None for a, b, _, _ in records):
+            # Журнал уже собран в CSR (сбой между пересборкой и очисткой), а пары CSR
+            # с тех пор могли измениться на месте - старые значения не применяются
+            with open(self.log_file, "wb"):
+                pass
+            return
+
+        for a, b, score, updated in records:
+            row = self._overlay.setdefault(a, {})
+            if b not in row:
+                self._overlay_size += 1
+            row[b] = (score, updated)
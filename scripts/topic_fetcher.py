@@ -0,0 +1,49 @@
+"""
+Параллельное чтение тем форума
+Темы читаются в пуле потоков. Лимит запросов в секунду и пул соединений
+обеспечивает общий ForumClient. Время сбора растёт с лимитом запросов,
+а не с количеством тем, умноженным на задержку сети.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from forum_client import DEFAULT_MAX_CONNECTIONS
+
+
+class TopicFetcher:
+    """
+    Запускает read_topic(topic_id) для множества тем параллельно.
+    Ошибка в одной теме не мешает остальным: тема попадает в failed.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_CONNECTIONS):
+        self.max_workers = max_workers
+
+    def fetch(self, topic_ids, read_topic):
+        """
+        Возвращает (posts_by_topic, failed): {topic_id: [посты]} и {topic_id: ошибка}
+        """
+        posts_by_topic = {}
+        failed = {}
+        if not topic_ids:
+            return posts_by_topic, failed
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(topic_ids))) as pool:
+            futures = {topic_id: pool.submit(read_topic, topic_id) for topic_id in topic_ids}
+
+        for topic_id, future in futures.items():
+            try:
+                posts_by_topic[topic_id] = future.result()
+            except Exception as e:
+                failed[topic_id] = e
+
+        return posts_by_topic, failed
+
+
+def merge_topic_posts(posts_by_topic):
+    """Сливает посты всех тем в один список от новых к старым (как отдаёт post.get)"""
+    merged = {}
+    for posts in posts_by_topic.values():
+        for post in posts:
+            merged[int(post.get('id', 0))] = post
+    return [merged[post_id] for post_id in sorted(merged, reverse=True)]
@@ -0,0 +1,75 @@
+"""
+Индекс тем форума
+Для каждой темы хранит маркер последнего поста (id, время) и число постов,
+как их показал список тем topic.get на прошлом запуске. Сравнение со свежим
+списком показывает, в каких темах что-то изменилось - только их и нужно читать.
+Состояние лежит в data/state/ рядом с курсорами постов.
+"""
+
+import os
+
+from file_utils import REPO_ROOT, load_json, write_json_if_changed
+
+DEFAULT_INDEX_FILE = os.path.join(REPO_ROOT, 'data', 'state', 'topic_index.json')
+
+
+def topic_marker(topic):
+    """Маркер темы из ответа topic.get"""
+    num_replies = topic.get('num_replies')
+    return {
+        'forum_id': int(topic.get('forum_id') or 0),
+        'last_post_id': int(topic.get('last_post_id') or 0),
+        'last_post_date': int(topic.get('last_post_date') or 0),
+        'post_count': int(num_replies) + 1 if num_replies not in (None, '') else None
+    }
+
+
+class TopicIndex:
+    """
+    {topic_id: маркер}.
+    changed() сравнивает список тем с индексом и запоминает новые маркеры отдельно;
+    в индекс они попадают через commit() только для тем, которые удалось прочитать,
+    иначе тема с ошибкой выпала бы из следующего запуска.
+    """
+
+    def __init__(self, index_file=None):
+        self.index_file = index_file or DEFAULT_INDEX_FILE
+        self.topics = {int(topic_id): marker
+                       for topic_id, marker in load_json(self.index_file, {}).get('topics', {}).items()}
+        self._pending = {}
+
+    def last_post_date(self):
+        """Время самого свежего поста среди тем индекса (0 для пустого индекса)"""
+        return max((marker['last_post_date'] for marker in self.topics.values()), default=0)
+
+    def changed(self, listing):
+        """
+        Темы из списка topic.get, маркер последнего поста которых сдвинулся.
+        Если список не отдаёт last_post_id, тема считается изменившейся.
+        """
+        changed = []
+        for topic in listing:
+            topic_id = int(topic['id'])
+            marker = topic_marker(topic)
+            known = self.topics.get(topic_id)
+
+            if marker['last_post_id'] and known and known['last_post_id'] >= marker['last_post_id']:
+                # Новых постов нет; число постов могло уменьшиться (удаление) - просто запоминаем
+                self.topics[topic_id] = marker
+                continue
+
+            self._pending[topic_id] = marker
+            changed.append(topic_id)
+        return changed
+
+    def commit(self, topic_ids):
+        """Переносит в индекс маркеры прочитанных тем"""
+        for topic_id in topic_ids:
+            if topic_id in self._pending:
+                self.topics[topic_id] = self._pending.pop(topic_id)
+
+    def save(self):
+        """Сохраняет индекс, если он изменился"""
+        write_json_if_changed(self.index_file, {
+            'topics': {str(topic_id): self.topics[topic_id] for topic_id in sorted(self.topics)}
+        })
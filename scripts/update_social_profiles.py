@@ -11,82 +11,98 @@ from datetime import datetime
 
 # Добавляем путь к нашим модулям
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from scripts.social.relation_tracker import RelationTracker
 from scripts.social.profile_calculator import SocialProfileCalculator
+from file_utils import REPO_ROOT
+
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
 
 def main():
     """Основная функция обновления"""
     print("🔄 Начинаю обновление социальных профилей...")
     
     # Инициализируем системы
-    tracker = RelationTracker()
-    calculator = SocialProfileCalculator()
+    tracker = RelationTracker(data_dir=DATA_DIR)
+    calculator = make_calculator(tracker)
+    
+    # 1. Дописываем новые посты форума в общую ленту (её же читает ежедневное обновление)
+    feed = get_post_feed()
+    
+    # 2. Обрабатываем посты ленты, которые социальная часть ещё не видела
+    results, failed = feed.dispatch({'social': lambda posts: process_posts(posts, tracker, calculator)})
+    if 'social' in failed:
+        print(f"❌ Ошибка при обработке ленты: {failed['social']}")
+    feed.save()
+    processed_count = results.get('social', 0)
     
-    # 1. Получаем новые посты с форума
-    new_posts = get_new_posts_from_forum()
+    # Мелкие закрытые сегменты журнала взаимодействий склеиваются
+    merged = tracker.interaction_log.compact()
+    if merged:
+        print(f"🗜️ Журнал взаимодействий: склеено сегментов {merged}")
+    
+    # 3. Профили, оставшиеся несохранёнными (сбой прошлого запуска, пересборка итогов)
+    updated = calculator.update_dirty_profiles()
+    
+    print(f"✅ Обновление завершено!")
+    print(f"📈 Обработано взаимодействий: {processed_count}")
+    print(f"👥 Профилей пересчитано в конце: {len(updated)}")
+
+def make_calculator(tracker):
+    """Калькулятор профилей на журнале и итогах трекера (видит ещё не сохранённые взаимодействия)"""
+    return SocialProfileCalculator(data_dir=DATA_DIR, interaction_log=tracker.interaction_log,
+                                   aggregates=tracker.profile_aggregates)
+
+def process_posts(posts, tracker=None, calculator=None):
+    """
+    Потребитель общей ленты: ищет теги взаимодействий в постах форума (формат post.get)
+    и обновляет отношения и профили. Возвращает число взаимодействий.
+    """
+    tracker = tracker or RelationTracker(data_dir=DATA_DIR)
+    calculator = calculator or make_calculator(tracker)
+    
+    # Отношения пар копятся в памяти и записываются один раз в tracker.save()
+    tracker.begin_batch()
     
-    # 2. Обрабатываем каждый пост
     processed_count = 0
-    for post in new_posts:
+    for post in posts:
+        player_name = post.get('username', '')
         try:
             interactions = tracker.process_player_post(
-                player_id=post['player_id'],
-                player_name=post['player_name'],
-                post_content=post['content'],
-                post_date=post['date']
+                player_id=int(post['user_id']),
+                player_name=player_name,
+                post_content=post.get('message', ''),
+                post_date=datetime.fromtimestamp(int(post.get('posted', 0))),
+                post_id=int(post['id'])
             )
             
             if interactions:
                 processed_count += len(interactions)
-                print(f"📝 Обработан пост {post['player_name']}: {len(interactions)} взаимодействий")
-                
-                # Обновляем профиль игрока
-                profile = calculator.calculate_player_profile(post['player_id'])
-                print(f"  👤 Обновлён профиль: {profile['icons']['display']} ({profile['total_score']} баллов)")
+                print(f"📝 Обработан пост {player_name}: {len(interactions)} взаимодействий")
         
         except Exception as e:
-            print(f"❌ Ошибка при обработке поста {post['player_name']}: {e}")
-    
-    # 3. Обновляем профили всех игроков (на всякий случай)
-    all_player_ids = get_all_player_ids()
+            print(f"❌ Ошибка при обработке поста {player_name}: {e}")
     
-    for player_id in all_player_ids:
-        try:
-            profile = calculator.calculate_player_profile(player_id)
-            print(f"📊 Профиль игрока {player_id}: {profile['icons']['display']}")
-        except Exception as e:
-            print(f"⚠️ Не удалось обновить профиль игрока {player_id}: {e}")
+    # Записываются отношения; обработанные посты запоминаются, чтобы повторный запуск их не учитывал
+    tracker.save()
     
-    print(f"✅ Обновление завершено!")
-    print(f"📈 Обработано взаимодействий: {processed_count}")
-    print(f"👥 Обновлено профилей: {len(all_player_ids)}")
+    # Пересчитываются только профили игроков, у которых появились взаимодействия
+    updated = calculator.update_dirty_profiles()
+    if updated:
+        print(f"👤 Обновлено профилей: {len(updated)}")
+    return processed_count
 
-def get_new_posts_from_forum():
+def get_post_feed(hours=24):
     """
-    Получает новые посты с форума
-    TODO: Интегрировать с реальным API форума
+    Скачивает новые посты форума в общую ленту и возвращает её.
+    Посты, уже скачанные ежедневным обновлением, повторно не запрашиваются.
     """
-    # Заглушка - возвращаем тестовые данные
-    return [
-        {
-            "player_id": 123,
-            "player_name": "RedAlice",
-            "content": "Помог Нигану починить генератор. #Negan_помощь_наедине",
-            "date": datetime.now()
-        },
-        {
-            "player_id": 456,
-            "player_name": "DarkVoid",
-            "content": "Украл припасы у Сары. #Sarah_кража_публично",
-            "date": datetime.now()
-        }
-    ]
-
-def get_all_player_ids():
-    """Получает ID всех игроков"""
-    # TODO: Интегрировать с реальной базой игроков
-    return [123, 456, 789]  # Заглушка
+    from core_parser import WotVCore
+    
+    core = WotVCore()
+    core.ingest_posts(hours=hours)
+    return core.post_feed
 
 if __name__ == "__main__":
     main()
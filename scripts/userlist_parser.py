@@ -1,15 +1,21 @@
 """
 Парсер списка игроков для Whisper of the Void
-Получает данные ВСЕХ игроков с одной страницы userlist.php
+Получает данные ВСЕХ игроков со всех страниц userlist.php
 Интегрирован с GameCalculator для расчёта уровней и XP
 """
 
-import requests
+import hashlib
 import re
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup  # Удобная библиотека для парсинга HTML
+from userlist_table import UserTableReader, BS4_AVAILABLE
+from http_cache import HTTPCache
+from forum_client import DEFAULT_MAX_CONNECTIONS, get_client
+from file_utils import atomic_write_json, load_json, write_json_if_changed
+from player_cache import PlayerFingerprintCache, player_fingerprint
 
 # Импортируем GameCalculator, если он доступен
 try:
@@ -21,126 +27,96 @@ except ImportError:
     CALCULATOR_AVAILABLE = False
     print("⚠️  GameCalculator не найден, уровни не будут рассчитаны")
 
-def fetch_all_players():
+USERLIST_URL = "https://warframe.f-rpg.me/userlist.php"
+
+# Заголовки, чтобы выглядеть как браузер
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+# Сколько страниц userlist.php можно загружать одновременно (верхняя граница:
+# реальное число одновременных запросов подбирает адаптивное окно ForumClient)
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('USERLIST_MAX_CONCURRENCY', str(DEFAULT_MAX_CONNECTIONS)))
+
+def _parser_fingerprint():
+    """Хэш исходника этого модуля: parse_status и расчёты отображения/уровня живут здесь"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+# Кэш расчётов: игроки с тем же статусом и статистикой не пересчитываются.
+# Ключ зависит и от баланса GameCalculator, и от кода парсера - любое изменение сбрасывает кэш
+fingerprint_cache = PlayerFingerprintCache(
+    f"{calculator.balance_fingerprint() if CALCULATOR_AVAILABLE else 'no-calculator'}:{_parser_fingerprint()}"
+)
+
+# Кэш страниц: при неизменной странице форум отвечает 304, а строки таблицы берутся с диска
+http_cache = HTTPCache()
+
+# Ссылки пагинации вида userlist.php?...&p=3 и блок "Страницы: 1 2 3"
+PAGE_LINK_PATTERN = re.compile(r'userlist\.php\?[^"\'<>\s]*?\bp=(\d+)')
+PAGELINK_BLOCK_PATTERN = re.compile(r'class="pagelink[^"]*"[^>]*>(.*?)</div>', re.S)
+PAGE_NUMBER_PATTERN = re.compile(r'>\s*(\d+)\s*<')
+
+def fetch_all_players(max_concurrent_requests=None):
     """
-    Основная функция: загружает и парсит страницу со списком игроков.
+    Основная функция: загружает все страницы списка игроков и парсит их.
+    Первая страница загружается сразу — по ней определяется число страниц,
+    остальные качаются параллельно (не больше max_concurrent_requests за раз).
     Возвращает словарь {user_id: данные_игрока}
     """
-    url = "https://warframe.f-rpg.me/userlist.php"
-    
-    # Заголовки, чтобы выглядеть как браузер
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-    }
+    if max_concurrent_requests is None:
+        max_concurrent_requests = MAX_CONCURRENT_REQUESTS
+    max_concurrent_requests = max(1, int(max_concurrent_requests))
     
     try:
         print(f"📥 Загружаем список игроков...")
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        first_page = fetch_userlist_page(1)
         
-        # Используем BeautifulSoup для удобного парсинга HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Находим таблицу с пользователями
-        user_table = soup.find('table', summary="Пользователи, отфильтрованные по критерию.")
+        # Собираем всех игроков
+        rows = load_page_rows(first_page)
         
-        if not user_table:
+        if rows is None:
             print("❌ Таблица пользователей не найдена!")
             # Сохраним HTML для отладки
             with open('debug_userlist.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
+                f.write(first_page.text)
             return {}
         
-        # Собираем всех игроков
-        players = {}
+        players = build_players(rows)
         
-        # Проходим по всем строкам таблицы (кроме заголовка)
-        for row in user_table.find_all('tr')[1:]:  # Пропускаем заголовок <thead>
-            cols = row.find_all('td')
-            if len(cols) < 6:  # Нужно минимум 6 столбцов
-                continue
-            
-            # 1. Извлекаем ID пользователя из ссылки на профиль
-            profile_link = cols[0].find('a', href=True)
-            if profile_link:
-                href = profile_link['href']
-                # Извлекаем ID из ссылки вида /profile.php?id=2
-                user_id_match = re.search(r'id=(\d+)', href)
-                user_id = int(user_id_match.group(1)) if user_id_match else None
-            else:
-                user_id = None
-            
-            # 2. Имя пользователя - ИСПРАВЛЕННАЯ ВЕРСИЯ
-            username_elem = cols[0].find('span', class_='usersname')
-            if username_elem:
-                # Внутри <span class="usersname"> есть ссылка <a>
-                username_link = username_elem.find('a')
-                username = username_link.text.strip() if username_link else username_elem.text.strip()
-            else:
-                # Резервный вариант: ищем любую ссылку в первом столбце
-                username_link = cols[0].find('a')
-                username = username_link.text.strip() if username_link else "Неизвестно"
-            
-            # 3. СТАТУС - самый важный столбец!
-            status_text = cols[1].text.strip()  # Второй столбец: "К:+200 З:+13% Ш:+312%"
+        total_pages = detect_page_count(first_page.text)
+        if total_pages > 1:
+            print(f"📚 Страниц в списке: {total_pages}, параллельных запросов: {max_concurrent_requests}")
             
-            # 4. Дополнительные данные
-            posts = cols[3].text.strip()  # Количество сообщений
-            registered = cols[4].text.strip()  # Дата регистрации
-            last_visit = cols[5].text.strip()  # Последний визит
-            
-            if user_id and status_text:
-                # Парсим статус: К:+200 З:+13% Ш:+312%
-                data = parse_status(status_text)
-                
-                # Формируем полную запись игрока
-                player_entry = {
-                    'user_id': user_id,
-                    'username': username,
-                    'status_raw': status_text,
-                    'data': data,
-                    'forum_stats': {
-                        'posts': int(posts) if posts.isdigit() else 0,
-                        'registered': registered,
-                        'last_visit': last_visit
-                    },
-                    'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
+            with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+                futures = [executor.submit(fetch_userlist_page, page)
+                           for page in range(2, total_pages + 1)]
                 
-                # Рассчитываем значения для отображения (ограничение до 100%)
-                calculate_display_values(player_entry)
-                
-                # Рассчитываем уровень и XP, если доступен калькулятор
-                if CALCULATOR_AVAILABLE:
+                # Разбираем страницы по порядку, чтобы порядок игроков не зависел от сети
+                for page, future in enumerate(futures, start=2):
                     try:
-                        calculate_player_level(player_entry)
+                        rows = load_page_rows(future.result())
                     except Exception as e:
-                        print(f"   ⚠️  Ошибка расчёта уровня для {username}: {e}")
-                
-                players[user_id] = player_entry
-                
-                # Выводим информацию с уровнем, если рассчитан
-                display_msg = ""
-                if 'level' in player_entry['data']:
-                    display_msg = f"Ур.{player_entry['data']['level']} - "
-                
-                # Добавляем информацию о превышении значений
-                infection_display = player_entry['data'].get('display_infection', player_entry['data'].get('infection', 0))
-                whisper_display = player_entry['data'].get('display_whisper', player_entry['data'].get('whisper', 0))
-                
-                if player_entry['data'].get('has_exceeded_infection', False):
-                    display_msg += f"🦠{infection_display}%+ "
-                else:
-                    display_msg += f"🦠{infection_display}% "
+                        print(f"   ⚠️  Не удалось загрузить страницу {page}: {e}")
+                        continue
                     
-                if player_entry['data'].get('has_exceeded_whisper', False):
-                    display_msg += f"👁️{whisper_display}%+ "
-                else:
-                    display_msg += f"👁️{whisper_display}% "
-                
-                print(f"   👤 {username} (ID:{user_id}): {display_msg}💰{player_entry['data'].get('credits', 0)}")
+                    if rows is None:
+                        print(f"   ⚠️  На странице {page} нет таблицы пользователей")
+                        continue
+                    
+                    players.update(build_players(rows))
+        
+        fingerprint_cache.save()
+        if fingerprint_cache.hits:
+            print(f"♻️  Без пересчёта (данные не изменились): {fingerprint_cache.hits} игроков")
+        
+        cache_stats = http_cache.stats
+        if cache_stats['not_modified'] or cache_stats['parse_skipped']:
+            print(f"🗄️  Кэш: без изменений {cache_stats['not_modified']} стр., "
+                  f"разбор пропущен для {cache_stats['parse_skipped']} стр.")
+        print(f"🌐 Форум: {get_client().summary()}")
         
         print(f"\n✅ Успешно! Найдено игроков: {len(players)}")
         return players
@@ -148,41 +124,293 @@ def fetch_all_players():
     except Exception as e:
         print(f"❌ Критическая ошибка: {e}")
         return {}
+    finally:
+        # Индекс кэша пишется на диск один раз за запуск
+        http_cache.flush()
+
+def fetch_userlist_page(page):
+    """
+    Загружает одну страницу userlist.php условным запросом через кэш.
+    Возвращает CachedResponse (HTML в .text)
+    """
+    params = {'p': page} if page > 1 else None
+    return http_cache.fetch(USERLIST_URL, params=params, headers=BROWSER_HEADERS, timeout=15)
+
+def load_page_rows(response):
+    """
+    Строки таблицы пользователей со страницы.
+    Если страница не изменилась с прошлого запуска, строки берутся из кэша без разбора HTML.
+    Возвращает список строк или None, если таблицы нет.
+    """
+    rows = http_cache.load_parsed(response)
+    if rows is None:
+        rows = read_userlist_rows(response.text)
+        if rows is not None:
+            http_cache.save_parsed(response, rows)
+    return rows
+
+def detect_page_count(html):
+    """
+    Определяет количество страниц по ссылкам пагинации.
+    Если ссылок нет — страница одна.
+    """
+    pages = [int(num) for num in PAGE_LINK_PATTERN.findall(html)]
+    
+    # Текущая страница выводится без ссылки (<strong>N</strong>)
+    for block in PAGELINK_BLOCK_PATTERN.findall(html):
+        pages.extend(int(num) for num in PAGE_NUMBER_PATTERN.findall(block))
+    
+    return max(pages, default=1)
+
+def read_userlist_rows(html):
+    """
+    Читает строки таблицы пользователей потоково (см. userlist_table), дерево страницы не строится.
+    Возвращает список строк или None, если таблицы нет.
+    """
+    reader = UserTableReader()
+    rows = list(reader.iter_rows(html))
+    
+    if not reader.found_table and reader.backend != 'bs4' and BS4_AVAILABLE:
+        # Потоковый парсер не нашёл таблицу - пробуем полный разбор BeautifulSoup
+        reader = UserTableReader('bs4')
+        rows = list(reader.iter_rows(html))
+    
+    if not reader.found_table:
+        return None
+    
+    return rows
+
+def parse_userlist_page(html):
+    """
+    Парсит одну страницу списка игроков.
+    Возвращает словарь {user_id: данные_игрока} или None, если таблицы нет.
+    """
+    rows = read_userlist_rows(html)
+    if rows is None:
+        return None
+    return build_players(rows)
+
+def build_players(rows):
+    """
+    Превращает строки таблицы пользователей в записи игроков.
+    Возвращает словарь {user_id: данные_игрока}
+    """
+    players = {}
+    pending = []  # Игроки, для которых нужен расчёт (нет в кэше)
+    
+    for row in rows:
+        user_id = row['user_id']
+        username = row['username']
+        
+        # СТАТУС - самый важный столбец! Например: "К:+200 З:+13% Ш:+312%"
+        status_text = row['status']
+        
+        # Дополнительные данные
+        posts = row['posts']  # Количество сообщений
+        registered = row['registered']  # Дата регистрации
+        last_visit = row['last_visit']  # Последний визит
+        
+        if user_id and status_text:
+            post_count = int(posts) if posts.isdigit() else 0
+            fingerprint = player_fingerprint(status_text, post_count)
+            
+            # Если статус и статистика те же, что в прошлый раз, берём готовые расчёты
+            data = fingerprint_cache.lookup(user_id, fingerprint)
+            cached = data is not None
+            if not cached:
+                # Парсим статус: К:+200 З:+13% Ш:+312%
+                data = parse_status(status_text)
+            
+            # Формируем полную запись игрока
+            player_entry = {
+                'user_id': user_id,
+                'username': username,
+                'status_raw': status_text,
+                'data': data,
+                'forum_stats': {
+                    'posts': post_count,
+                    'registered': registered,
+                    'last_visit': last_visit
+                },
+                'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            
+            if not cached:
+                pending.append((fingerprint, player_entry))
+            
+            players[user_id] = player_entry
+    
+    # Рассчитываем значения отображения, уровни и XP всех новых игроков одним пакетом
+    if pending:
+        calculate_players_batch([player_entry for _, player_entry in pending])
+        for fingerprint, player_entry in pending:
+            fingerprint_cache.store(player_entry['user_id'], fingerprint, player_entry['data'])
+    
+    for user_id, player_entry in players.items():
+        # Выводим информацию с уровнем, если рассчитан
+        display_msg = ""
+        if 'level' in player_entry['data']:
+            display_msg = f"Ур.{player_entry['data']['level']} - "
+        
+        # Добавляем информацию о превышении значений
+        infection_display = player_entry['data'].get('display_infection', player_entry['data'].get('infection', 0))
+        whisper_display = player_entry['data'].get('display_whisper', player_entry['data'].get('whisper', 0))
+        
+        if player_entry['data'].get('has_exceeded_infection', False):
+            display_msg += f"🦠{infection_display}%+ "
+        else:
+            display_msg += f"🦠{infection_display}% "
+            
+        if player_entry['data'].get('has_exceeded_whisper', False):
+            display_msg += f"👁️{whisper_display}%+ "
+        else:
+            display_msg += f"👁️{whisper_display}% "
+        
+        print(f"   👤 {player_entry['username']} (ID:{user_id}): {display_msg}💰{player_entry['data'].get('credits', 0)}")
+    
+    return players
+
+def calculate_players_batch(player_entries):
+    """
+    Рассчитывает значения отображения, XP и уровни для списка игроков одним пакетом
+    (GameCalculator.*_batch). Результат тот же, что у calculate_display_values
+    и calculate_player_level по каждому игроку.
+    """
+    if not CALCULATOR_AVAILABLE:
+        for player_entry in player_entries:
+            calculate_display_values(player_entry)
+        return
+    
+    try:
+        values = [player_entry['data'] for player_entry in player_entries]
+        credits = [data.get('credits', 0) for data in values]
+        infection = [data.get('infection', 0) for data in values]
+        whisper = [data.get('whisper', 0) for data in values]
+        
+        display_columns = calculator.get_display_values_batch(infection, whisper)
+        
+        # XP считается от реальных значений (ограничение до 100% внутри калькулятора)
+        xp_column = calculator.calculate_xp_batch(credits, infection, whisper, days_since_reg=30, post_count=0)
+        level_column = calculator.calculate_level_from_xp_batch(xp_column)
+    except Exception as e:
+        print(f"⚠️  Пакетный расчёт не удался ({e}), считаем по одному игроку")
+        for player_entry in player_entries:
+            calculate_display_values(player_entry)
+            try:
+                calculate_player_level(player_entry)
+            except Exception as e:
+                print(f"   ⚠️  Ошибка расчёта уровня для {player_entry['username']}: {e}")
+        return
+    
+    for i, data in enumerate(values):
+        data.update({key: column[i] for key, column in display_columns.items()})
+        _apply_level(data, xp_column[i], level_column[i], data['real_infection'], data['real_whisper'])
+
+def _apply_level(data, xp, level, real_infection, real_whisper):
+    """Записывает уровень, XP и последствия превышения в данные игрока"""
+    # Получаем информацию о текущем уровне
+    level_info = calculator.get_level_info(level)
+    next_level_info = calculator.get_level_info(level + 1)
+    
+    # XP до следующего уровня
+    xp_to_next = max(0, next_level_info['xp_required'] - xp) if level < 100 else 0
+    
+    # Сохраняем расчёты в данных игрока
+    data['xp'] = xp
+    data['level'] = level
+    data['xp_to_next_level'] = xp_to_next
+    
+    # Добавляем информацию о текущем уровне
+    data['level_info'] = {
+        'current_level': level,
+        'xp': xp,
+        'xp_required': level_info['xp_required'],
+        'bonus_credits': level_info['bonus_credits'],
+        'infection_resistance': level_info['infection_resistance'],
+        'whisper_bonus': level_info['whisper_bonus'],
+        'next_level_xp_required': next_level_info['xp_required'] if level < 100 else None
+    }
+    
+    # Рассчитываем и сохраняем последствия и эффекты
+    if real_infection > 100 or real_whisper > 100:
+        data['exceeded_effects'] = {
+            'infection_consequences': calculator.calculate_infection_consequences(real_infection),
+            'whisper_effects': calculator.calculate_whisper_effects(real_whisper)
+        }
+
+# Токены статуса: основные сокращения К/З/Ш и альтернативные названия.
+# Весь статус просматривается одним проходом; просмотр вперёд (?=...) находит
+# токены в любой позиции, как отдельные re.search по каждому шаблону.
+STATUS_TOKENS = {
+    # ключ: шаблоны в порядке приоритета (основной, затем альтернативные)
+    'credits': [r'К', r'credits?', r'кредит[ы\w]*'],
+    'infection': [r'З', r'заражен\w*', r'inf(?:ection)?'],
+    'whisper': [r'Ш', r'ш[её]пот\w*', r'whisper'],
+}
+STATUS_KEYS = tuple(STATUS_TOKENS)
+
+# Номер группы в шаблоне -> (номер ключа, приоритет)
+STATUS_GROUP_SLOTS = [None] + [
+    (key_index, priority)
+    for key_index, tokens in enumerate(STATUS_TOKENS.values())
+    for priority in range(len(tokens))
+]
+
+STATUS_TOKEN_PATTERN = re.compile(
+    # Быстрый отсев позиций по первой букве токена
+    '(?=[' + ''.join(sorted({t[0].lower() + t[0].upper() for ts in STATUS_TOKENS.values() for t in ts})) + '])'
+    '(?=' + '|'.join(
+        rf'{token}:\s*([+-]?\d+)'
+        for tokens in STATUS_TOKENS.values()
+        for token in tokens
+    ) + ')',
+    re.IGNORECASE
+)
 
 def parse_status(status_text):
     """
     Парсит строку статуса в формате "К:+200 З:+13% Ш:+312%"
     Возвращает словарь с числовыми значениями
     """
-    result = {}
+    # Для каждого ключа берём первое вхождение самого приоритетного шаблона
+    best = {}
+    for match in STATUS_TOKEN_PATTERN.finditer(status_text):
+        group = match.lastindex
+        key_index, priority = STATUS_GROUP_SLOTS[group]
+        current = best.get(key_index)
+        if current is None or priority < current[0]:
+            best[key_index] = (priority, match.group(group))
     
-    # Универсальные регулярки для поиска значений
-    patterns = {
-        'credits': r'К:\s*([+-]?\d+)',
-        'infection': r'З:\s*([+-]?\d+)%?',  # % может быть или не быть
-        'whisper': r'Ш:\s*([+-]?\d+)%?',
-    }
+    result = {}
+    for key_index, key in enumerate(STATUS_KEYS):
+        if key_index in best:
+            result[key] = int(best[key_index][1])
     
-    # Альтернативные названия (на всякий случай)
-    alt_patterns = {
-        'credits': [r'credits?:\s*([+-]?\d+)', r'кредит[ы\w]*:\s*([+-]?\d+)'],
-        'infection': [r'заражен\w*:\s*([+-]?\d+)%?', r'inf(ection)?:\s*([+-]?\d+)%?'],
-        'whisper': [r'ш[её]пот\w*:\s*([+-]?\d+)%?', r'whisper:\s*([+-]?\d+)%?'],
-    }
+    return result
+
+def parse_status_batch(status_texts):
+    """
+    Парсит список строк статуса.
+    Возвращает столбцы {'credits': [...], 'infection': [...], 'whisper': [...]},
+    где отсутствующее значение - None.
+    """
+    columns = [[] for _ in STATUS_KEYS]
+    finditer = STATUS_TOKEN_PATTERN.finditer
+    slots = STATUS_GROUP_SLOTS
     
-    for key, pattern in patterns.items():
-        match = re.search(pattern, status_text, re.IGNORECASE)
-        if match:
-            result[key] = int(match.group(1))
-        else:
-            # Пробуем альтернативные паттерны
-            for alt_pattern in alt_patterns.get(key, []):
-                match = re.search(alt_pattern, status_text, re.IGNORECASE)
-                if match:
-                    result[key] = int(match.group(1) if match.group(1) else match.group(2))
-                    break
+    for status_text in status_texts:
+        best = [None] * len(STATUS_KEYS)
+        for match in finditer(status_text):
+            group = match.lastindex
+            key_index, priority = slots[group]
+            current = best[key_index]
+            if current is None or priority < current[0]:
+                best[key_index] = (priority, match.group(group))
+        
+        for column, value in zip(columns, best):
+            column.append(int(value[1]) if value is not None else None)
     
-    return result
+    return dict(zip(STATUS_KEYS, columns))
 
 def calculate_display_values(player_data):
     """
@@ -247,60 +475,93 @@ def calculate_player_level(player_data):
         # Рассчитываем уровень
         level = calculator.calculate_level_from_xp(xp)
         
-        # Получаем информацию о текущем уровне
-        level_info = calculator.get_level_info(level)
-        next_level_info = calculator.get_level_info(level + 1)
-        
-        # XP до следующего уровня
-        xp_to_next = max(0, next_level_info['xp_required'] - xp) if level < 100 else 0
-        
-        # Сохраняем расчёты в данных игрока
-        data['xp'] = xp
-        data['level'] = level
-        data['xp_to_next_level'] = xp_to_next
-        
-        # Добавляем информацию о текущем уровне
-        data['level_info'] = {
-            'current_level': level,
-            'xp': xp,
-            'xp_required': level_info['xp_required'],
-            'bonus_credits': level_info['bonus_credits'],
-            'infection_resistance': level_info['infection_resistance'],
-            'whisper_bonus': level_info['whisper_bonus'],
-            'next_level_xp_required': next_level_info['xp_required'] if level < 100 else None
-        }
-        
-        # Рассчитываем и сохраняем последствия и эффекты
-        if real_infection > 100 or real_whisper > 100:
-            data['exceeded_effects'] = {
-                'infection_consequences': calculator.calculate_infection_consequences(real_infection),
-                'whisper_effects': calculator.calculate_whisper_effects(real_whisper)
-            }
+        _apply_level(data, xp, level, real_infection, real_whisper)
         
     except Exception as e:
         print(f"❌ Ошибка при расчёте уровня для {player_data['username']}: {e}")
 
+# Хэши содержимого записей игроков с прошлых запусков
+PLAYER_HASHES_FILE = ".content_hashes.json"
+
+# Сколько последних версий записи помнить. Запись за ночь сохраняют два скрипта
+# (userlist_parser и core_parser), поэтому нужно помнить больше одной версии.
+PLAYER_HASH_VERSIONS = 3
+
+def record_content_hash(record):
+    """
+    Хэш содержимого записи игрока без изменчивых меток времени
+    (last_updated и last_calculation.calculation_time)
+    """
+    stable = {key: value for key, value in record.items() if key != 'last_updated'}
+    calculation = stable.get('last_calculation')
+    if isinstance(calculation, dict):
+        stable['last_calculation'] = {key: value for key, value in calculation.items()
+                                      if key != 'calculation_time'}
+    
+    payload = json.dumps(stable, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _volatile_fields(record):
+    """Метки времени записи, которые не входят в хэш"""
+    volatile = {'last_updated': record.get('last_updated')}
+    if isinstance(record.get('last_calculation'), dict):
+        volatile['calculation_time'] = record['last_calculation'].get('calculation_time')
+    return volatile
+
+def _restore_volatile_fields(record, volatile):
+    """Возвращает записи прежние метки времени (содержимое то же, что и раньше)"""
+    record['last_updated'] = volatile.get('last_updated')
+    if 'calculation_time' in volatile and isinstance(record.get('last_calculation'), dict):
+        record['last_calculation']['calculation_time'] = volatile['calculation_time']
+
 def save_players_data(players_data, output_dir="data/players"):
     """
     Сохраняет данные игроков в JSON файлы.
     Каждый игрок -> отдельный файл user_id.json
     Также создаёт общий файл со всеми игроками.
-    """
-    import os
     
+    Перезаписываются только изменившиеся записи: хэш содержимого (без меток времени)
+    сравнивается с сохранённым в прошлый раз. Если содержимое уже встречалось,
+    записи возвращаются прежние метки времени, чтобы в git не было лишних изменений.
+    Все файлы пишутся атомарно (временный файл + переименование).
+    """
     # Создаём папку, если её нет
     os.makedirs(output_dir, exist_ok=True)
     
-    # 1. Сохраняем каждого игрока в отдельный файл
+    hashes_file = os.path.join(output_dir, PLAYER_HASHES_FILE)
+    previous_hashes = load_json(hashes_file, {})
+    content_hashes = {}
+    written_count = 0
+    
+    # 1. Сохраняем каждого изменившегося игрока в отдельный файл
     for user_id, data in players_data.items():
         filename = os.path.join(output_dir, f"{user_id}.json")
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        content_hash = record_content_hash(data)
+        
+        versions = previous_hashes.get(str(user_id))
+        if versions is None:
+            # Хэшей ещё нет (первый запуск) - сравниваем с файлом на диске
+            previous = load_json(filename)
+            versions = [{'hash': record_content_hash(previous), 'volatile': _volatile_fields(previous)}] if previous else []
+        
+        known = next((v for v in versions if v['hash'] == content_hash), None)
+        if known:
+            _restore_volatile_fields(data, known['volatile'])
+        else:
+            known = {'hash': content_hash, 'volatile': _volatile_fields(data)}
+        
+        if not versions or versions[0]['hash'] != content_hash or not os.path.exists(filename):
+            atomic_write_json(filename, data)
+            written_count += 1
+        
+        older = [v for v in versions if v['hash'] != content_hash]
+        content_hashes[str(user_id)] = [known] + older[:PLAYER_HASH_VERSIONS - 1]
+    
+    write_json_if_changed(hashes_file, content_hashes)
     
     # 2. Сохраняем общий файл со всеми игроками
     all_players_file = os.path.join(output_dir, "all_players.json")
-    with open(all_players_file, 'w', encoding='utf-8') as f:
-        json.dump(players_data, f, ensure_ascii=False, indent=2)
+    all_players_written = write_json_if_changed(all_players_file, players_data)
     
     # 3. Сохраняем упрощённую версию для веб-интерфейса
     simple_data = {}
@@ -332,13 +593,12 @@ def save_players_data(players_data, output_dir="data/players"):
         simple_data[user_id] = player_simple
     
     web_data_file = "players_data.json"  # Будет создан в корне
-    with open(web_data_file, 'w', encoding='utf-8') as f:
-        json.dump(simple_data, f, ensure_ascii=False, indent=2)
+    web_data_written = write_json_if_changed(web_data_file, simple_data)
     
     print(f"💾 Данные сохранены:")
-    print(f"   - {len(players_data)} файлов в {output_dir}/")
-    print(f"   - Общий файл: {output_dir}/all_players.json")
-    print(f"   - Веб-версия: players_data.json (с ограничением отображения до 100%)")
+    print(f"   - {written_count} из {len(players_data)} файлов в {output_dir}/ изменились")
+    print(f"   - Общий файл: {output_dir}/all_players.json ({'обновлён' if all_players_written else 'без изменений'})")
+    print(f"   - Веб-версия: players_data.json ({'обновлена' if web_data_written else 'без изменений'}, с ограничением отображения до 100%)")
     
     return len(players_data)
 
@@ -0,0 +1,364 @@
+"""
+Потоковый разбор таблицы пользователей userlist.php
+Выдаёт строки таблицы по одной, не строя дерево всей страницы.
+Бэкенды: lxml (если установлен), стандартный html.parser, BeautifulSoup (запасной)
+"""
+
+import os
+import re
+from collections import deque
+from html.parser import HTMLParser
+
+# lxml быстрее всего, но он не обязателен
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# BeautifulSoup остаётся запасным вариантом
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+USER_TABLE_SUMMARY = "Пользователи, отфильтрованные по критерию."
+
+BACKENDS = ('lxml', 'html.parser', 'bs4')
+
+# Бэкенд по умолчанию можно переопределить переменной окружения
+DEFAULT_BACKEND = os.environ.get('USERLIST_PARSER_BACKEND') or ('lxml' if LXML_AVAILABLE else 'html.parser')
+
+# Размер куска, которым строка HTML скармливается потоковому парсеру
+CHUNK_SIZE = 64 * 1024
+
+USER_ID_PATTERN = re.compile(r'id=(\d+)')
+
+
+def iter_user_rows(source, backend=None):
+    """
+    Генератор строк таблицы пользователей.
+    source - строка HTML или итератор кусков HTML (например, из потокового ответа)
+    """
+    return UserTableReader(backend).iter_rows(source)
+
+
+class UserTableReader:
+    """
+    Читает таблицу пользователей выбранным бэкендом.
+    После обхода found_table показывает, была ли таблица на странице.
+    """
+
+    def __init__(self, backend=None):
+        backend = backend or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд парсера: {backend}")
+        if backend == 'lxml' and not LXML_AVAILABLE:
+            backend = 'html.parser'
+        if backend == 'bs4' and not BS4_AVAILABLE:
+            backend = 'html.parser'
+
+        self.backend = backend
+        self.found_table = False
+
+    def iter_rows(self, source):
+        """Выдаёт словари строк по мере разбора source"""
+        chunks = _iter_chunks(source)
+
+        if self.backend == 'bs4':
+            yield from self._iter_rows_bs4(''.join(chunks))
+            return
+
+        parser = _LxmlRowParser() if self.backend == 'lxml' else _StdlibRowParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+            while parser.rows:
+                yield parser.rows.popleft()
+
+        parser.close()
+        while parser.rows:
+            yield parser.rows.popleft()
+
+        self.found_table = parser.found_table
+
+    def _iter_rows_bs4(self, html):
+        """Запасной путь: полное дерево BeautifulSoup"""
+        soup = BeautifulSoup(html, 'html.parser')
+        user_table = soup.find('table', summary=USER_TABLE_SUMMARY)
+
+        if not user_table:
+            return
+        self.found_table = True
+
+        # Проходим по всем строкам таблицы (кроме заголовка)
+        for row in user_table.find_all('tr')[1:]:
+            cols = row.find_all('td')
+            if len(cols) < 6:  # Нужно минимум 6 столбцов
+                continue
+
+            profile_link = cols[0].find('a', href=True)
+            username_elem = cols[0].find('span', class_='usersname')
+            username_link = username_elem.find('a') if username_elem else cols[0].find('a')
+
+            yield _make_row(
+                href=profile_link['href'] if profile_link else None,
+                has_span=username_elem is not None,
+                span_text=username_elem.text if username_elem else None,
+                link_text=username_link.text if username_link else None,
+                texts=[col.text for col in cols]
+            )
+
+
+def _iter_chunks(source):
+    """Превращает строку в поток кусков; итераторы отдаёт как есть"""
+    if isinstance(source, str):
+        for start in range(0, len(source), CHUNK_SIZE):
+            yield source[start:start + CHUNK_SIZE]
+    else:
+        yield from source
+
+
+def _make_row(href, has_span, span_text, link_text, texts):
+    """
+    Собирает строку таблицы в одинаковый для всех бэкендов формат.
+    Правила те же, что были в fetch_all_players:
+    имя берётся из <span class="usersname"> (из ссылки внутри него),
+    иначе из первой ссылки в первом столбце.
+    """
+    user_id = None
+    if href is not None:
+        # Извлекаем ID из ссылки вида /profile.php?id=2
+        user_id_match = USER_ID_PATTERN.search(href)
+        user_id = int(user_id_match.group(1)) if user_id_match else None
+
+    if has_span:
+        username = link_text.strip() if link_text is not None else span_text.strip()
+    else:
+        username = link_text.strip() if link_text is not None else "Неизвестно"
+
+    return {
+        'user_id': user_id,
+        'username': username,
+        'status': texts[1].strip(),
+        'posts': texts[3].strip(),
+        'registered': texts[4].strip(),
+        'last_visit': texts[5].strip()
+    }
+
+
+def _has_class(class_attr, name):
+    return class_attr is not None and name in class_attr.split()
+
+
+class _Capture:
+    """Собирает текст одного элемента (с учётом вложенных тегов того же имени)"""
+    __slots__ = ('tag', 'depth', 'parts')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.depth = 1
+        self.parts = []
+
+
+class _StdlibRowParser(HTMLParser):
+    """Событийный разбор на стандартном html.parser"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = deque()
+        self.found_table = False
+        self.table_depth = 0     # 0 - вне таблицы, 1 - в таблице, >1 - во вложенной
+        self.table_done = False
+        self.tr_index = 0
+        self.cells = None        # Тексты столбцов текущей строки
+        self.cell_parts = None   # Текст текущего столбца
+        self.captures = []       # Активные захваты текста (ссылки и span)
+        self._reset_first_cell()
+
+    def _reset_first_cell(self):
+        self.href = None
+        self.span = None
+        self.span_link = None
+        self.first_link = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.table_done:
+            return
+
+        if tag == 'table':
+            if self.table_depth:
+                self.table_depth += 1
+            elif dict(attrs).get('summary') == USER_TABLE_SUMMARY:
+                self.table_depth = 1
+                self.found_table = True
+            return
+
+        if not self.table_depth:
+            return
+
+        if self.table_depth == 1 and tag == 'tr':
+            self._end_row()
+            self.cells = [] if self.tr_index > 0 else None  # Первая строка - заголовок
+            self.tr_index += 1
+            return
+
+        if self.table_depth == 1 and tag == 'td':
+            self._end_cell()
+            if self.cells is not None:
+                self.cell_parts = []
+            return
+
+        if self.cell_parts is None:
+            return
+
+        for capture in self.captures:
+            if capture.tag == tag:
+                capture.depth += 1
+
+        # Особые элементы ищем только в первом столбце
+        if len(self.cells) != 0:
+            return
+
+        if tag == 'a':
+            attrs = dict(attrs)
+            if self.href is None and 'href' in attrs:
+                self.href = attrs['href'] or ''
+            if self.first_link is None:
+                self.first_link = _Capture('a')
+                self.captures.append(self.first_link)
+            if self.span is not None and self.span.depth > 0 and self.span_link is None:
+                self.span_link = _Capture('a')
+                self.captures.append(self.span_link)
+        elif tag == 'span' and self.span is None and _has_class(dict(attrs).get('class'), 'usersname'):
+            self.span = _Capture('span')
+            self.captures.append(self.span)
+
+    def handle_endtag(self, tag):
+        if self.table_done or not self.table_depth:
+            return
+
+        if tag == 'table':
+            self.table_depth -= 1
+            if not self.table_depth:
+                self._end_row()
+                self.table_done = True
+            return
+
+        if self.table_depth == 1 and tag == 'tr':
+            self._end_row()
+            return
+
+        if self.table_depth == 1 and tag == 'td':
+            self._end_cell()
+            return
+
+        if self.captures:
+            for capture in self.captures:
+                if capture.tag == tag:
+                    capture.depth -= 1
+            self.captures = [c for c in self.captures if c.depth > 0]
+
+    def handle_data(self, data):
+        if self.cell_parts is None:
+            return
+        self.cell_parts.append(data)
+        for capture in self.captures:
+            capture.parts.append(data)
+
+    def _end_cell(self):
+        if self.cell_parts is not None:
+            self.cells.append(''.join(self.cell_parts))
+            self.cell_parts = None
+            self.captures = []
+
+    def _end_row(self):
+        self._end_cell()
+        if self.cells is not None and len(self.cells) >= 6:
+            link = self.span_link if self.span is not None else self.first_link
+            self.rows.append(_make_row(
+                href=self.href,
+                has_span=self.span is not None,
+                span_text=''.join(self.span.parts) if self.span is not None else None,
+                link_text=''.join(link.parts) if link is not None else None,
+                texts=self.cells
+            ))
+        self.cells = None
+        self._reset_first_cell()
+
+
+class _LxmlRowParser:
+    """Событийный разбор на lxml: обработанные строки сразу удаляются из дерева"""
+
+    def __init__(self):
+        self.parser = etree.HTMLPullParser(events=('start', 'end'))
+        self.rows = deque()
+        self.found_table = False
+        self.table = None
+        self.table_depth = 0
+        self.table_done = False
+        self.tr_index = 0
+
+    def feed(self, chunk):
+        self.parser.feed(chunk)
+        self._drain()
+
+    def close(self):
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            pass  # Пустой или обрезанный документ - берём то, что успели разобрать
+        self._drain()
+
+    def _drain(self):
+        for event, elem in self.parser.read_events():
+            if self.table_done:
+                continue
+
+            tag = elem.tag
+            if tag == 'table':
+                if event == 'start':
+                    if self.table_depth:
+                        self.table_depth += 1
+                    elif elem.get('summary') == USER_TABLE_SUMMARY:
+                        self.table_depth = 1
+                        self.table = elem
+                        self.found_table = True
+                elif self.table_depth:
+                    self.table_depth -= 1
+                    if not self.table_depth:
+                        self.table_done = True
+                continue
+
+            if event == 'end' and tag == 'tr' and self.table_depth == 1:
+                if self.tr_index > 0:  # Первая строка - заголовок
+                    self._emit(elem)
+                self.tr_index += 1
+
+                # Освобождаем память: строка и всё до неё больше не нужны
+                elem.clear()
+                parent = elem.getparent()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+    def _emit(self, row):
+        cols = [td for td in row.iter('td')]
+        if len(cols) < 6:  # Нужно минимум 6 столбцов
+            return
+
+        first = cols[0]
+        profile_link = next((a for a in first.iter('a') if a.get('href') is not None), None)
+        username_elem = next((s for s in first.iter('span') if _has_class(s.get('class'), 'usersname')), None)
+
+        if username_elem is not None:
+            username_link = next(username_elem.iter('a'), None)
+        else:
+            username_link = next(first.iter('a'), None)
+
+        self.rows.append(_make_row(
+            href=profile_link.get('href') if profile_link is not None else None,
+            has_span=username_elem is not None,
+            span_text=''.join(username_elem.itertext()) if username_elem is not None else None,
+            link_text=''.join(username_link.itertext()) if username_link is not None else None,
+            texts=[''.join(col.itertext()) for col in cols]
+        ))
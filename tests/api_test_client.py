@@ -1,13 +1,20 @@
 # tests/api_test_client.py
+import os
+import sys
 import requests
 import time
 from typing import Optional, Dict, List
 
+# Клиент форума общий с рабочими скриптами
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from forum_client import ForumClient
+
 class ForumAPIClient:
     def __init__(self, base_url: str = "https://warframe.f-rpg.me/api.php"):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Пул соединений, повторы на 429/5xx и лимит запросов - как в рабочих скриптах
+        self.client = ForumClient(max_connections=2, headers={
             'User-Agent': 'TestBot/1.0 (Test Suite)'
         })
     
@@ -17,7 +24,7 @@ class ForumAPIClient:
         params['format'] = 'json'
         
         try:
-            response = self.session.get(self.base_url, params=params, timeout=10)
+            response = self.client.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
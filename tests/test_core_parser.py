@@ -0,0 +1,165 @@
+"""
+Тестирование ядра (без обращения к форуму)
+Запуск: python tests/test_core_parser.py
+"""
+
+import sys
+import os
+import time
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from core_parser import WotVCore
+from post_cursor import CursorStore
+from topic_index import TopicIndex
+
+def make_core(tmp_path, topics):
+    """
+    Ядро с тестовым форумом: topics = {topic_id: [посты]}.
+    topic.get и post.get отдаются постранично, как их отдаёт API.
+    """
+    core = WotVCore()
+    core.post_cursors = CursorStore(state_file=str(tmp_path / 'post_cursor.json'))
+    core.topic_index = TopicIndex(index_file=str(tmp_path / 'topic_index.json'))
+    core.topic_ids = []
+    core.requested_skips = []
+
+    def fetch_topics_page(skip=0):
+        listing = sorted(
+            ({'id': str(topic_id), 'num_replies': str(len(posts) - 1),
+              'last_post_id': str(max(int(p['id']) for p in posts)),
+              'last_post_date': str(max(int(p['posted']) for p in posts))}
+             for topic_id, posts in topics.items() if posts),
+            key=lambda t: int(t['last_post_date']), reverse=True
+        )
+        return listing[skip:skip + core.topics_page_size]
+
+    def fetch_posts_page(topic_id, skip=0):
+        core.requested_skips.append((topic_id, skip))
+        ordered = sorted(topics[topic_id], key=lambda p: int(p['id']), reverse=True)
+        return ordered[skip:skip + core.posts_page_size]
+
+    core.fetch_topics_page = fetch_topics_page
+    core.fetch_posts_page = fetch_posts_page
+    return core
+
+def save_state(core):
+    """Как run_full_update после обновления данных"""
+    core.post_cursors.save()
+    core.topic_index.save()
+
+def make_posts(ids, posted, topic_id=8):
+    return [{'id': str(i), 'user_id': str(i % 3 + 2), 'username': 'Void', 'message': 'текст',
+             'topic_id': str(topic_id), 'posted': str(posted)} for i in ids]
+
+def test_recent_posts_use_cursor(tmp_path):
+    """Тест: читаются только новые посты, сколько бы их ни было"""
+    print("🧪 Тестируем чтение постов по курсору...")
+
+    now = int(time.time())
+    topics = {8: make_posts(range(1, 131), now - 60)}
+
+    # Первый запуск: курсора нет, все 130 постов свежие - три страницы
+    core = make_core(tmp_path, topics)
+    recent = core.get_recent_posts(hours=24)
+    assert len(recent) == 130
+    assert core.requested_skips == [(8, 0), (8, 50), (8, 100)]
+    save_state(core)
+
+    # Второй запуск: пришло 7 новых постов - хватает одной страницы
+    topics[8] += make_posts(range(131, 138), now - 30)
+    core = make_core(tmp_path, topics)
+    recent = core.get_recent_posts(hours=24)
+    assert [p['id'] for p in recent] == [str(i) for i in range(137, 130, -1)]
+    assert core.requested_skips == [(8, 0)]
+
+    # Курсор не сохранён (запуск упал) - посты не теряются
+    core = make_core(tmp_path, topics)
+    assert len(core.get_recent_posts(hours=24)) == 7
+
+    save_state(core)
+
+    # Пропущенный запуск: новые посты старше суток всё равно дочитываются до курсора
+    topics[8] += make_posts(range(138, 141), now - 30 * 3600) + make_posts([141], now - 10)
+    core = make_core(tmp_path, topics)
+    recent = core.get_recent_posts(hours=24)
+    assert [p['id'] for p in recent] == ['141', '140', '139', '138']
+
+    print("✅ Курсор работает!\n")
+
+def test_recent_posts_window(tmp_path):
+    """Тест: посты старше окна не берутся даже без курсора"""
+    now = int(time.time())
+    topics = {8: make_posts(range(1, 81), now - 48 * 3600) + make_posts(range(81, 91), now - 60)}
+
+    core = make_core(tmp_path, topics)
+    recent = core.get_recent_posts(hours=24)
+    assert [p['id'] for p in recent] == [str(i) for i in range(90, 80, -1)]
+    assert core.requested_skips == [(8, 0)]
+
+def test_recent_posts_all_topics(tmp_path):
+    """Тест: посты собираются со всех активных тем, тихие и прочитанные темы не запрашиваются"""
+    print("🧪 Тестируем чтение всех тем форума...")
+
+    now = int(time.time())
+    topics = {
+        8: make_posts(range(1, 4), now - 60, 8),
+        9: make_posts(range(4, 6), now - 120, 9),
+        10: make_posts(range(6, 8), now - 48 * 3600, 10),  # Без постов за сутки
+    }
+
+    core = make_core(tmp_path, topics)
+    recent = core.get_recent_posts(hours=24)
+    assert [p['id'] for p in recent] == ['5', '4', '3', '2', '1']
+    assert sorted(topic_id for topic_id, _ in core.requested_skips) == [8, 9]
+    save_state(core)
+
+    # Новый пост только в теме 9 - тема 8 даже не запрашивается
+    topics[9] += make_posts([11], now - 10, 9)
+    core = make_core(tmp_path, topics)
+    assert [p['id'] for p in core.get_recent_posts(hours=24)] == ['11']
+    assert core.requested_skips == [(9, 0)]
+    save_state(core)
+    assert core.topic_index.topics[9] == {'forum_id': 0, 'last_post_id': 11,
+                                          'last_post_date': now - 10, 'post_count': 3}
+
+    # Ошибка в одной теме не мешает остальным и не сдвигает её курсор
+    topics[8] += make_posts([12], now - 5, 8)
+    topics[9] += make_posts([13], now - 5, 9)
+    core = make_core(tmp_path, topics)
+    fetch_posts_page = core.fetch_posts_page
+
+    def flaky_fetch(topic_id, skip=0):
+        if topic_id == 9:
+            raise ValueError("в ответе API нет 'response'")
+        return fetch_posts_page(topic_id, skip)
+
+    core.fetch_posts_page = flaky_fetch
+    assert [p['id'] for p in core.get_recent_posts(hours=24)] == ['12']
+    assert core.post_cursors.cursor('topic:9').last_post_id == 11
+    save_state(core)
+
+    # Тема 9 снова в списке изменившихся: её маркер не попал в индекс
+    core = make_core(tmp_path, topics)
+    assert [p['id'] for p in core.get_recent_posts(hours=24)] == ['13']
+    assert core.requested_skips == [(9, 0)]
+
+    print("✅ Все темы собраны!\n")
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    print("=" * 50)
+    print("🎮 ТЕСТИРОВАНИЕ ЯДРА")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_posts_use_cursor(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_posts_window(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_posts_all_topics(Path(tmp))
+
+    print("🎉 Все тесты успешно пройдены!")
@@ -0,0 +1,86 @@
+"""
+Тестирование прогноза развития игроков
+Запуск: python tests/test_forecast.py
+"""
+
+import sys
+import os
+
+import pytest
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+np = pytest.importorskip('numpy')
+
+from game_calculator import GameCalculator
+from forecast import ActivityModel, ForecastEngine, Population
+
+class FixedActivity(ActivityModel):
+    """Одна и та же активность каждый день"""
+
+    def __init__(self, post_count, unique_topics):
+        super().__init__()
+        self.post_count = np.asarray(post_count)
+        self.unique_topics = np.asarray(unique_topics)
+
+    def sample(self, rng, population):
+        return self.post_count, self.unique_topics
+
+def test_forecast_matches_daily_update():
+    """Тест: день прогноза = calculate_player_progression + ограничения ядра"""
+    print("🧪 Тестируем шаг прогноза...")
+
+    calc = GameCalculator()
+    players = {
+        '2': {'data': {'credits': 200, 'infection': 99.9, 'whisper': 298}},
+        '3': {'data': {'credits': 50, 'infection': 0, 'whisper': -100}},
+        '4': {'data': {'credits': 10}},  # Без заражения и шёпота
+    }
+    posts, topics = [0, 3, 10], [0, 2, 5]
+
+    population = Population.from_players(players)
+    engine = ForecastEngine(calculator=calc, activity=FixedActivity(posts, topics), seed=1)
+
+    for _ in range(5):
+        engine.step(population)
+        for i, player in enumerate(players.values()):
+            data = player['data']
+            changes = calc.calculate_player_progression(
+                player, {'post_count': posts[i], 'unique_topics': topics[i]})['changes']
+            data['credits'] += changes['credits_change']
+            if 'infection' in data:
+                data['infection'] = max(0, min(100, data['infection'] + changes['infection_change']))
+            if 'whisper' in data:
+                data['whisper'] = max(-100, min(300, data['whisper'] + changes['whisper_change']))
+
+    for i, player in enumerate(players.values()):
+        data = player['data']
+        assert population.credits[i] == data['credits']
+        assert population.infection[i] == data.get('infection', 0)
+        assert population.whisper[i] == data.get('whisper', 0)
+
+    report = engine.summarize(5, population)
+    assert sum(report['level']['counts'].values()) == 3
+    assert report['infection']['p90'] <= 100
+
+    print("✅ Прогноз совпадает с ежедневным обновлением!\n")
+
+def test_forecast_run():
+    """Тест: сводки по дням для синтетической популяции"""
+    engine = ForecastEngine(seed=3)
+    reports = engine.run(Population.synthetic(1000, seed=3), days=20, report_every=7)
+
+    assert [r['day'] for r in reports] == [0, 7, 14, 20]
+    assert reports[-1]['credits']['mean'] > reports[0]['credits']['mean']
+    assert all(-100 <= r['whisper']['p10'] and r['whisper']['p90'] <= 300 for r in reports)
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🔮 ТЕСТИРОВАНИЕ ПРОГНОЗА")
+    print("=" * 50)
+
+    test_forecast_matches_daily_update()
+    test_forecast_run()
+
+    print("🎉 Все тесты успешно пройдены!")
@@ -5,6 +5,8 @@
 
 import sys
 import os
+import math
+import random
 
 # Добавляем папку scripts в путь для импорта
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
@@ -72,6 +74,75 @@ def test_edge_cases():
     
     print("✅ Крайние случаи обработаны!\n")
 
+def test_level_lookup():
+    """Тест табличного расчёта уровня против прямого перебора уровней"""
+    print("🧪 Тестируем расчёт уровня по таблице порогов...")
+    
+    calc = GameCalculator()
+    
+    def reference_level(xp):
+        # Прежний алгоритм: перебор уровней 1..100 с формулой порога
+        level = 1
+        for lvl in range(1, 101):
+            if xp >= int(calc.BASE_XP_PER_LEVEL * math.pow(lvl, calc.LEVEL_EXPONENT)):
+                level = lvl
+            else:
+                break
+        return level
+    
+    rng = random.Random(7)
+    thresholds = [calc.get_level_info(lvl)['xp_required'] for lvl in range(1, 102)]
+    samples = [-5, 0, 999, 1000, 10 ** 9] + [t + d for t in thresholds for d in (-1, 0, 1)]
+    samples += [rng.randint(0, 5_000_000) for _ in range(2000)]
+    
+    for xp in samples:
+        assert calc.calculate_level_from_xp(xp) == reference_level(xp), xp
+    
+    # Записи уровней не должны портиться, если вызывающий код меняет результат
+    info = calc.get_level_info(5)
+    info['xp_required'] = 0
+    assert calc.get_level_info(5)['xp_required'] == thresholds[4]
+    
+    # Смена констант пересобирает таблицу
+    calc.LEVEL_EXPONENT = 1.5
+    for xp in samples[:200]:
+        assert calc.calculate_level_from_xp(xp) == reference_level(xp), xp
+    
+    print("✅ Уровни совпадают с прямым перебором!\n")
+
+def test_progression_batch():
+    """Тест пакетного расчёта против расчёта по одному игроку"""
+    print("🧪 Тестируем пакетный расчёт прогрессии...")
+    
+    calc = GameCalculator()
+    rng = random.Random(11)
+    players = [
+        {'data': {'credits': rng.randint(-50, 5000), 'infection': rng.randint(-10, 300), 'whisper': rng.randint(-100, 400)}}
+        for _ in range(500)
+    ]
+    posts = [rng.choice([0, 0, 1, 3, 40]) for _ in players]
+    topics = [rng.randint(0, 5) for _ in players]
+    
+    batch = calc.calculate_progression_batch(
+        [p['data']['credits'] for p in players],
+        [p['data']['infection'] for p in players],
+        [p['data']['whisper'] for p in players],
+        post_count=posts, unique_topics=topics
+    )
+    
+    for i, player in enumerate(players):
+        result = calc.calculate_player_progression(player, {'post_count': posts[i], 'unique_topics': topics[i]})
+        for key in ('credits', 'infection', 'whisper', 'display_infection', 'display_whisper', 'xp', 'level'):
+            assert batch[key][i] == result['current'][key], (key, i)
+        for key in ('credits_change', 'infection_change', 'whisper_change'):
+            assert batch[key][i] == result['changes'][key], (key, i)
+        for key in ('xp_to_next_level', 'has_exceeded_infection', 'has_exceeded_whisper'):
+            assert batch[key][i] == result['progression'][key], (key, i)
+    
+    assert calc.calculate_progression_batch([], [], [])['xp'] == []
+    
+    print("✅ Пакетный расчёт совпадает с поштучным!\n")
+
 def compare_with_old_logic():
     """Сравнение новой логики со старой (из core_parser)"""
     print("🧪 Сравниваем со старой логикой...")
@@ -120,6 +191,8 @@ if __name__ == "__main__":
     
     test_basic_calculations()
     test_edge_cases()
+    test_level_lookup()
+    test_progression_batch()
     compare_with_old_logic()
     
     print("🎉 Все тесты успешно пройдены!")
@@ -0,0 +1,128 @@
+"""
+Тестирование общего клиента форума (без обращения к форуму)
+Запуск: python tests/test_forum_client.py
+"""
+
+import sys
+import os
+
+import requests
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from forum_client import AIMDController, ForumClient, parse_retry_after
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+class FakeSession:
+    """Отдаёт заранее заданные ответы (или бросает исключения) по очереди"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def make_client(outcomes, retries=3):
+    sleeps = []
+    client = ForumClient(session=FakeSession(outcomes), rate_limit=None, retries=retries, sleep=sleeps.append)
+    return client, sleeps
+
+def test_retries_transient_errors():
+    """Тест: 429/5xx и обрывы соединения повторяются, Retry-After соблюдается"""
+    print("🧪 Тестируем повторы запросов...")
+
+    client, sleeps = make_client([
+        FakeResponse(429, headers={'Retry-After': '7'}),
+        requests.ConnectionError("connection reset"),
+        FakeResponse(503),
+        FakeResponse(200, b'ok'),
+    ])
+    response = client.get('https://forum/api.php')
+
+    assert response.status_code == 200
+    assert sleeps[0] == 7
+    assert 1.0 <= sleeps[1] <= 2.0 and 2.0 <= sleeps[2] <= 4.0  # Экспонента с разбросом
+    assert client.stats['requests'] == 4
+    assert client.stats['retries'] == 3
+    assert client.stats['failures'] == 3
+    assert client.stats['bytes'] == 2
+
+    print("✅ Временные ошибки переживаются!\n")
+
+def test_gives_up():
+    """Тест: 4xx не повторяется, после исчерпания попыток отдаётся последний ответ или ошибка"""
+    client, sleeps = make_client([FakeResponse(404)])
+    assert client.get('https://forum/api.php').status_code == 404
+    assert sleeps == []
+
+    client, _ = make_client([FakeResponse(502), FakeResponse(502)], retries=1)
+    assert client.get('https://forum/api.php').status_code == 502
+
+    client, _ = make_client([requests.Timeout(), requests.Timeout()], retries=1)
+    try:
+        client.get('https://forum/api.php')
+        assert False, "ожидалась ошибка"
+    except requests.Timeout:
+        pass
+
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('abc') is None
+
+def test_aimd_window():
+    """Окно растёт на успехах и уменьшается один раз на поколение"""
+    print("\n📈 Тест адаптивного окна...")
+
+    controller = AIMDController(max_window=8, initial_window=2, warmup=3)
+    for _ in range(20):
+        controller.release(controller.acquire(), ok=True, latency=0.1)
+    assert controller.window > 4
+
+    # Две ошибки запросов одного поколения - одно уменьшение
+    window = controller.window
+    first, second = controller.acquire(), controller.acquire()
+    controller.release(first, ok=False)
+    controller.release(second, ok=False)
+    assert controller.window == window / 2
+    assert controller.stats['decreases'] == 1
+
+    # Скачок задержки тоже уменьшает окно
+    window = controller.window
+    controller.release(controller.acquire(), ok=True, latency=1.0)
+    assert controller.window == window / 2
+
+    # Окно не выходит за границы
+    for _ in range(10):
+        controller.release(controller.acquire(), ok=False)
+    assert controller.window == 1
+    for _ in range(500):
+        controller.release(controller.acquire(), ok=True, latency=0.1)
+    assert controller.window == 8
+
+    # Статистика клиента показывает окно
+    client, _ = make_client([FakeResponse(429), FakeResponse(200)])
+    client.get('https://forum/api.php')
+    metrics = client.metrics()
+    assert metrics['decreases'] == 1 and metrics['window_min'] == 1
+    print("✅ Окно подстраивается")
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🎮 ТЕСТИРОВАНИЕ КЛИЕНТА ФОРУМА")
+    print("=" * 50)
+
+    test_retries_transient_errors()
+    test_gives_up()
+    test_aimd_window()
+
+    print("🎉 Все тесты успешно пройдены!")
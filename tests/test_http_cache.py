@@ -0,0 +1,80 @@
+"""
+Тестирование кэша HTTP-ответов (без обращения к форуму)
+Запуск: python -m pytest tests/test_http_cache.py
+"""
+
+import sys
+import os
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from http_cache import HTTPCache
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeForum:
+    """Отвечает 304, если клиент прислал актуальный ETag"""
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls.append(dict(headers or {}))
+        if headers and headers.get('If-None-Match') == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body, {'ETag': self.etag})
+
+def test_conditional_get(tmp_path):
+    """Тест: повторный запрос отправляет If-None-Match и получает тело с диска"""
+    print("🧪 Тестируем условные запросы...")
+
+    forum = FakeForum('<html>игроки</html>', '"v1"')
+    cache = HTTPCache(cache_dir=str(tmp_path), enabled=True)
+
+    first = cache.fetch('https://forum/userlist.php', session=forum)
+    assert not first.unchanged
+    assert cache.load_parsed(first) is None
+    cache.save_parsed(first, [{'user_id': 2}])
+    cache.flush()
+
+    # Новый экземпляр - как следующий запуск скрипта
+    cache = HTTPCache(cache_dir=str(tmp_path), enabled=True)
+    second = cache.fetch('https://forum/userlist.php', session=forum)
+
+    assert forum.calls[-1]['If-None-Match'] == '"v1"'
+    assert second.from_cache and second.unchanged
+    assert second.text == '<html>игроки</html>'
+    assert cache.load_parsed(second) == [{'user_id': 2}]
+
+    # Тело изменилось - разбор из кэша не используется
+    forum.body, forum.etag = '<html>новые игроки</html>', '"v2"'
+    third = cache.fetch('https://forum/userlist.php', session=forum)
+    assert not third.unchanged
+    assert cache.load_parsed(third) is None
+
+    print("✅ Условные запросы работают!\n")
+
+def test_eviction(tmp_path):
+    """Тест: при превышении лимита удаляются самые старые записи"""
+    cache = HTTPCache(cache_dir=str(tmp_path), max_bytes=250, enabled=True)
+
+    for page in range(5):
+        cache.fetch('https://forum/userlist.php', params={'p': page},
+                    session=FakeForum('x' * 100, f'"{page}"'))
+    cache.flush()
+
+    index = cache._load_index()
+    assert len(index) == 2
+    assert cache.stats['evicted'] == 3
+    assert len(os.listdir(tmp_path / 'bodies')) == 2
@@ -0,0 +1,101 @@
+"""
+Тестирование журнала взаимодействий
+Запуск: python -m pytest tests/test_interaction_log.py
+"""
+
+import sys
+import os
+import json
+
+# Добавляем корень репозитория в путь для импорта пакета scripts.social
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.social.interaction_log import InteractionLog
+
+def make_record(number, from_id, to_id, month='2026-01'):
+    return {'from_player_id': from_id, 'to_player_id': to_id, 'action': 'помощь', 'effect': 15,
+            'description': 'x' * 100, 'post_date': f'{month}-{number % 28 + 1:02d}T12:00:00',
+            'processed_date': f'{month}-28T00:00:{number % 60:02d}', 'number': number}
+
+def test_segments_rotate_and_filter(tmp_path):
+    """Тест: сегменты закрываются по размеру и месяцу, чтение открывает только нужные"""
+    print("\n📚 Тест журнала взаимодействий...")
+
+    log = InteractionLog(str(tmp_path), segment_max_bytes=2000, player_index=True)
+    for number in range(30):
+        log.append(make_record(number, 2, 3 if number < 20 else 4))
+    log.append(make_record(30, 5, 2, month='2026-02'))
+    log.close()
+
+    log = InteractionLog(str(tmp_path), segment_max_bytes=2000, player_index=True)
+    assert len(log.segments) > 3 and all(segment.sealed for segment in log.segments[:-1])
+    assert [record['number'] for record in log.read()] == list(range(31))
+
+    assert [record['number'] for record in log.read(player_id=4)] == list(range(20, 30))
+    assert {segment for segment, _ in log.index.locations(4)} < {segment.number for segment in log.segments}
+    assert [record['number'] for record in log.read(since='2026-02-01')] == [30]
+
+    # Склейка сохраняет порядок и футеры
+    removed = log.compact(target_bytes=100000)
+    assert removed > 0
+    log = InteractionLog(str(tmp_path), player_index=True)
+    assert [record['number'] for record in log.read()] == list(range(31))
+    assert [record['number'] for record in log.read(player_id=5)] == [30]
+    # После склейки записи игрока по-прежнему в порядке журнала
+    assert [record['number'] for record in log.read(player_id=2)] == list(range(31))
+    print("✅ Журнал делится на сегменты и читается выборочно")
+
+def test_import_legacy_files(tmp_path):
+    """Тест: взаимодействия из отдельных файлов переносятся в журнал"""
+    legacy_dir = tmp_path / 'social_history'
+    legacy_dir.mkdir()
+    for number in range(3):
+        path = legacy_dir / f'interaction_20260101_00000{number}_2.json'
+        path.write_text(json.dumps(make_record(number, 2, 3)), encoding='utf-8')
+
+    log = InteractionLog(str(legacy_dir / 'log'))
+    assert log.import_files(sorted(str(path) for path in legacy_dir.glob('interaction_*.json'))) == 3
+    assert not list(legacy_dir.glob('interaction_*.json'))
+    assert len(list(log.read(player_id=3))) == 3
+
+def test_player_index_survives_crash(tmp_path):
+    """Тест: записи, не попавшие в сохранённый индекс, дочитываются при открытии журнала"""
+    log = InteractionLog(str(tmp_path), player_index=True)
+    log.append(make_record(1, 2, 3))
+    log.save()
+    log.append(make_record(2, 2, 4))
+    log.flush()  # Журнал на диске, индекс - нет
+
+    log = InteractionLog(str(tmp_path), player_index=True)
+    assert [record['number'] for record in log.read(player_id=2)] == [1, 2]
+    assert [record['number'] for record in log.read(player_id=4)] == [2]
+
+def test_compact_crash_leaves_no_duplicates(tmp_path):
+    """Тест: сегменты, пережившие сбой посреди склейки, удаляются при открытии журнала"""
+    import shutil
+
+    log = InteractionLog(str(tmp_path / 'log'), segment_max_bytes=2000, player_index=True)
+    for number in range(30):
+        log.append(make_record(number, 2, 3))
+    log.close()
+
+    # Копии исходных сегментов - как будто склейка записалась, а удалить их не успели
+    sealed = [segment.path for segment in log.segments if segment.sealed]
+    backup = tmp_path / 'backup'
+    backup.mkdir()
+    for path in sealed:
+        shutil.copy(path, backup)
+    assert log.compact(target_bytes=100000) > 0
+    for path in sealed[1:]:
+        shutil.copy(backup / os.path.basename(path), path)
+
+    log = InteractionLog(str(tmp_path / 'log'), segment_max_bytes=2000, player_index=True)
+    assert len(log) == 30
+    assert [record['number'] for record in log.read()] == list(range(30))
+    assert [record['number'] for record in log.read(player_id=3)] == list(range(30))
+
+    # Новые сегменты не получают номера поглощённых
+    log.append(make_record(30, 2, 3, month='2026-02'))
+    log.close()
+    log = InteractionLog(str(tmp_path / 'log'), player_index=True)
+    assert [record['number'] for record in log.read()] == list(range(31))
@@ -0,0 +1,73 @@
+"""
+Тестирование потоковой агрегации активности по постам
+Запуск: python tests/test_post_aggregator.py
+"""
+
+import sys
+import os
+import random
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from post_aggregator import PostAggregator, TopicSet, aggregate_posts
+
+def legacy_activity(posts):
+    """Прежний подсчёт analyze_posts_for_stats (множества тем)"""
+    activity = {}
+    for post in posts:
+        user_id = int(post['user_id'])
+        data = activity.setdefault(user_id, {'post_count': 0, 'topics': set()})
+        data['post_count'] += 1
+        data['topics'].add(post['topic_id'])
+    return {user_id: (data['post_count'], len(data['topics'])) for user_id, data in activity.items()}
+
+def generate_posts(count, seed=7):
+    rng = random.Random(seed)
+    for post_id in range(count, 0, -1):
+        yield {'id': str(post_id), 'user_id': str(rng.randint(1, 50)),
+               'topic_id': str(rng.randint(1, 30)), 'posted': str(1700000000 + post_id)}
+
+def test_streaming_matches_legacy():
+    """Тест: итератор постов даёт те же счётчики, что и прежний подсчёт"""
+    print("\n📊 Тест потоковой агрегации...")
+
+    posts = list(generate_posts(2000))
+    activity = aggregate_posts(iter(posts + [{'user_id': None}, {'user_id': 'abc'}]), workers=1).result()
+
+    expected = legacy_activity(posts)
+    assert {user_id: (data['post_count'], data['unique_topics']) for user_id, data in activity.items()} == expected
+    newest = {}
+    for post in posts:
+        newest.setdefault(int(post['user_id']), int(post['posted']))
+    assert all(activity[user_id]['last_post'] == posted for user_id, posted in newest.items())
+
+    topics = TopicSet([5, 3, 5])
+    topics.add(4)
+    topics.add(3)
+    assert len(topics) == 3 and 4 in topics and 6 not in topics
+    print("✅ Счётчики совпадают")
+
+def test_sharded_process_pool():
+    """Тест: шарды в пуле процессов дают тот же итог, что и один процесс"""
+    print("\n🧩 Тест шардированной агрегации...")
+
+    single = aggregate_posts(generate_posts(5000), workers=1).result()
+    sharded = aggregate_posts(generate_posts(5000), workers=2, chunk_size=300).result()
+    assert sharded == single
+
+    left = PostAggregator().consume(generate_posts(100, seed=1))
+    right = PostAggregator().consume(generate_posts(100, seed=2))
+    merged = left.merge(right).result()
+    assert sum(data['post_count'] for data in merged.values()) == 200
+    print("✅ Шарды сливаются без потерь")
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🎮 ТЕСТИРОВАНИЕ АГРЕГАЦИИ ПОСТОВ")
+    print("=" * 50)
+
+    test_streaming_matches_legacy()
+    test_sharded_process_pool()
+
+    print("🎉 Все тесты успешно пройдены!")
@@ -0,0 +1,51 @@
+"""
+Тестирование общей ленты постов и отметок потребителей
+Запуск: python -m pytest tests/test_post_feed.py
+"""
+
+import sys
+import os
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from post_feed import PostFeed
+
+def make_feed(tmp_path):
+    return PostFeed(feed_file=str(tmp_path / 'post_feed.jsonl'), markers_file=str(tmp_path / 'post_consumers.json'))
+
+def make_posts(ids):
+    return [{'id': str(post_id), 'user_id': '2', 'message': f'пост {post_id}'} for post_id in ids]
+
+def test_consumers_catch_up_independently(tmp_path):
+    """Тест: каждый потребитель получает посты один раз, отставший догоняет по своей отметке"""
+    print("\n📥 Тест ленты постов...")
+
+    feed = make_feed(tmp_path)
+    assert feed.append(make_posts([3, 2, 1])) == 3
+    assert feed.append(make_posts([3, 4])) == 1  # Повторно скачанный пост не дублируется
+
+    def broken(posts):
+        raise RuntimeError("сбой")
+
+    results, failed = feed.dispatch({'stats': len, 'social': broken})
+    assert results == {'stats': 4} and list(failed) == ['social']
+    feed.save()
+
+    # Новый запуск: статистика видит только новые посты, социальная часть - всё, что пропустила
+    feed = make_feed(tmp_path)
+    feed.append(make_posts([5]))
+    assert [post['id'] for post in feed.pending('stats')[0]] == ['5']
+    assert [post['id'] for post in feed.pending('social')[0]] == ['1', '2', '3', '4', '5']
+
+    results, failed = feed.dispatch({'social': len})
+    assert results == {'social': 5} and not failed
+    feed.save()
+
+    # Обработанные всеми записи удалены из журнала
+    feed = make_feed(tmp_path)
+    assert [post['id'] for _, post in feed.entries] == ['5']
+    assert feed.pending('social')[0] == []
+    feed.append(make_posts([6]))
+    assert feed.entries[-1][0] == 6  # Номера записей не переиспользуются
+    print("✅ Потребители читают ленту независимо")
@@ -0,0 +1,231 @@
+"""
+Тестирование обработки тегов взаимодействий (RelationTracker)
+Запуск: python -m pytest tests/test_relation_tracker.py
+"""
+
+import sys
+import os
+import json
+import re
+import shutil
+import unicodedata
+from datetime import datetime
+
+# Добавляем корень репозитория в путь для импорта пакета scripts.social
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+from scripts.social.player_names import PlayerNameIndex
+from scripts.social.relation_tracker import RelationTracker
+
+PLAYERS = {'negan': 7, 'sarah': 8}
+
+def make_tracker(tmp_path):
+    """Трекер на копии конфигов; отношения копятся в памяти, а не в data/"""
+    for name in ('actions_config.json', 'modifiers_config.json'):
+        shutil.copy(os.path.join(ROOT, 'data', name), tmp_path / name)
+
+    tracker = RelationTracker(data_dir=str(tmp_path))
+    tracker.scores = {}
+    tracker._find_player_id_by_name = lambda name: PLAYERS.get(name.lower())
+    tracker._save_interaction = lambda record: None
+
+    def update_relationship(player_a_id, player_b_id, effect, interaction):
+        key = (player_a_id, player_b_id)
+        tracker.scores[key] = tracker.scores.get(key, 0) + effect
+
+    tracker._update_relationship = update_relationship
+    return tracker
+
+def process(tracker, content, post_id=101):
+    return tracker.process_player_post(2, 'Void', content, datetime(2026, 1, 1), post_id=post_id)
+
+def test_post_processed_once(tmp_path):
+    """Тест: повторная обработка поста не дублирует взаимодействия"""
+    print("\n🔁 Тест идемпотентной обработки...")
+
+    tracker = make_tracker(tmp_path)
+    assert len(process(tracker, "Помог. #Negan_помощь")) == 1
+    assert process(tracker, "Помог. #Negan_помощь") == []
+    tracker.save()
+
+    # Индекс переживает перезапуск
+    tracker = make_tracker(tmp_path)
+    assert process(tracker, "Помог. #Negan_помощь") == []
+    assert tracker.scores == {}
+    print("✅ Пост учитывается один раз")
+
+def test_edited_post_applies_delta(tmp_path):
+    """Тест: у отредактированного поста применяется только разница"""
+    print("\n✏️ Тест правки поста...")
+
+    tracker = make_tracker(tmp_path)
+    process(tracker, "#Negan_помощь")
+    assert tracker.scores == {(2, 7): 15}
+
+    # Модификатор усилил помощь, добавилась кража у Сары
+    records = process(tracker, "#Negan_помощь_публично #Sarah_кража")
+    assert [(r['to_player_id'], r['effect'], r['edited']) for r in records] == [(7, 5, True), (8, -25, True)]
+    assert tracker.scores == {(2, 7): 20, (2, 8): -25}
+
+    # Кражу убрали - её эффект откатывается
+    process(tracker, "#Negan_помощь_публично")
+    assert tracker.scores == {(2, 7): 20, (2, 8): 0}
+    print("✅ Правка даёт только разницу")
+
+def test_edits_do_not_inflate_profiles(tmp_path):
+    """Тест: поправки правок меняют итоги профилей на разницу, а не как новые взаимодействия"""
+    from scripts.social.profile_aggregates import ProfileAggregates
+
+    tracker = make_tracker(tmp_path)
+    del tracker._save_interaction  # Взаимодействия пишутся в журнал и итоги
+    process(tracker, "#Negan_помощь")
+    process(tracker, "#Negan_помощь_публично #Sarah_кража")
+    process(tracker, "#Negan_помощь_публично")
+
+    aggregates = tracker.profile_aggregates
+    negan, sarah = aggregates.get(7), aggregates.get(8)
+    assert (negan["total_score"], negan["interaction_count"]) == (20, 1)
+    assert sum(negan["category_scores"].values()) == 20 and sum(negan["category_counts"].values()) == 1
+    # Кражу добавили правкой и убрали следующей - следов в профиле не остаётся
+    assert (sarah["total_score"], sarah["interaction_count"]) == (0, 0)
+    assert not any(sarah["category_scores"].values()) and not any(sarah["category_counts"].values())
+
+    rebuilt = ProfileAggregates.from_records(tracker.interaction_log.read(), tracker.actions_config)
+    assert rebuilt.players == aggregates.players
+
+def test_player_name_index(tmp_path):
+    """Тест: имена из хэштегов находятся без учёта регистра, ё/е и обрезки на "_" """
+    print("\n🔎 Тест индекса имён...")
+
+    players_file = tmp_path / 'all_players.json'
+    players = {'2': {'username': 'Void'}, '4': {'username': 'Алёна Ветрова'},
+               '5': {'username': 'Red Alice'}, '6': {'username': 'Red Fox'}}
+    players_file.write_text(json.dumps(players, ensure_ascii=False), encoding='utf-8')
+
+    index = PlayerNameIndex(str(players_file))
+    assert index.refresh() and not index.refresh()
+    assert index.resolve('VOID') == 2
+    assert index.resolve('алена') == 4                 # ё/е и первое слово имени
+    assert index.resolve('Red_Alice') == 5
+    assert index.resolve('Red') is None                # Два игрока - неоднозначно
+    assert index.resolve('Ale') is None                # Не целое слово
+    decomposed = unicodedata.normalize('NFD', 'Алёна')  # ё из двух символов: е + диерезис
+    assert decomposed != 'Алёна' and index.resolve(decomposed) == 4
+
+    # Переименование подхватывается при изменении файла
+    players['6']['username'] = 'Fox'
+    players_file.write_text(json.dumps(players, ensure_ascii=False), encoding='utf-8')
+    os.utime(players_file, ns=(1, 1))
+    assert index.refresh()
+    assert index.resolve('Red') == 5 and index.resolve('fox') == 6
+    print("✅ Имена находятся")
+
+def test_hashtag_matcher_matches_parse_hashtag(tmp_path):
+    """Тест: скомпилированный поиск тегов совпадает с разбором parse_hashtag"""
+    print("\n#️⃣ Тест поиска хэштегов...")
+
+    tracker = make_tracker(tmp_path)
+    post = ("#Negan_Помощь_публично_громко и #лето, #Sarah_кража__случайно#Rick_дар "
+            "#_Negan_помощь #Negan__помощь #Negan_помощьх #Алёна_флирт_НАЕДИНЕ! #123_дар")
+
+    expected = [tracker.parse_hashtag(f"#{tag}") for tag in re.findall(r'#(\w+(?:_\w+)*)', post)]
+    assert tracker.extract_hashtags_from_post(post) == [tag for tag in expected if tag]
+    assert tracker.hashtag_matcher.match(post)[0] == ('Negan', 'помощь', ['публично'])
+    print("✅ Теги разбираются как раньше")
+
+def legacy_effect(tracker, interaction, description=""):
+    """Прежний расчёт calculate_effect (для сравнения с таблицей)"""
+    base_effect = tracker.actions_config["actions"][interaction["action"]]["base_effect"]
+    if base_effect == "variable":
+        words = {"долг": ["жизнь", "спасение", "риск"], "тайна": ["опасный", "секрет", "убийство"]}
+        base_effect = 10 if any(word in description.lower() for word in words.get(interaction["action"], [])) else 5
+    total_modifier = 1.0
+    for modifier in interaction["modifiers"]:
+        total_modifier *= tracker.modifiers_config["modifiers"].get(modifier, 1.0)
+    final_effect = int(base_effect * max(0.3, min(3.0, total_modifier)))
+    return round(final_effect / 5) * 5 if final_effect % 5 else final_effect
+
+def test_effect_table_matches_formula(tmp_path):
+    """Тест: эффекты из таблицы совпадают с прямым расчётом"""
+    print("\n🧮 Тест таблицы эффектов...")
+
+    tracker = make_tracker(tmp_path)
+    modifiers = list(tracker.modifiers_config["modifiers"])
+    combinations = [[], *([m] for m in modifiers), ["публично", "намеренно"], ["случайно"] * 3,
+                    ["публично"] * 5, ["наедине", "неизвестный"]]
+
+    for action in tracker.actions_config["actions"]:
+        for combination in combinations:
+            for description in ("Спас ему ЖИЗНЬ", "обычный день"):
+                interaction = {"action": action, "modifiers": combination}
+                assert tracker.calculate_effect(interaction, description) == legacy_effect(tracker, interaction, description)
+    print("✅ Таблица совпадает с формулой")
+
+def test_profile_aggregates_follow_log(tmp_path):
+    """Тест: итоги профилей обновляются по каждому взаимодействию и совпадают с пересчётом по журналу"""
+    print("\n🧮 Тест накопительных итогов профилей...")
+
+    from scripts.social.profile_aggregates import ProfileAggregates
+    from scripts.social.profile_calculator import SocialProfileCalculator
+
+    tracker = make_tracker(tmp_path)
+    del tracker._save_interaction  # Взаимодействия пишутся в настоящий журнал
+    process(tracker, "#Negan_помощь #Sarah_угроза", post_id=1)
+    process(tracker, "#Negan_спасение_героически", post_id=2)
+    tracker.save()
+
+    aggregates = tracker.profile_aggregates
+    rebuilt = ProfileAggregates.from_records(tracker.interaction_log.read(), tracker.actions_config)
+    assert aggregates.players == rebuilt.players
+    assert aggregates.dirty == {2, 7, 8}
+
+    calculator = SocialProfileCalculator(data_dir=str(tmp_path), interaction_log=tracker.interaction_log,
+                                         aggregates=aggregates)
+    assert calculator.update_dirty_profiles() == [2, 7, 8]
+    assert calculator.calculate_player_profile(7)['interaction_count'] == 2
+    # Без новых взаимодействий пересчитывать нечего
+    assert calculator.update_dirty_profiles() == []
+
+    # Итоги, отставшие от журнала (сбой до save()), пересобираются
+    os.remove(tmp_path / 'state' / 'social_aggregates.json')
+    calculator = SocialProfileCalculator(data_dir=str(tmp_path))
+    assert calculator.aggregates.players == rebuilt.players
+    assert calculator.aggregates.dirty == {2, 7, 8}
+    print("✅ Итоги совпадают с журналом")
+
+def test_batched_relationships(tmp_path, monkeypatch):
+    """Тест: в пакетном режиме файл пары пишется один раз, ограничение применяется по порядку"""
+    print("\n📦 Тест пакетного обновления отношений...")
+
+    tracker = make_tracker(tmp_path)
+    del tracker._update_relationship  # Настоящие файлы отношений во временном каталоге
+    rel_file = tmp_path / 'players' / 'relationships' / '2_7.json'
+
+    tracker.begin_batch()
+    process(tracker, "#Negan_угроза", post_id=1)
+    assert not rel_file.exists()
+
+    from scripts.social import relation_tracker
+
+    writes = []
+    real_write = relation_tracker.atomic_write_json
+    monkeypatch.setattr(relation_tracker, 'atomic_write_json',
+                        lambda path, obj, *args, **kwargs: (writes.append(obj), real_write(path, obj, *args, **kwargs)))
+    for post_id in range(2, 62):
+        process(tracker, "#Negan_спасение", post_id=post_id)
+    process(tracker, "#Negan_угроза #Sarah_помощь", post_id=62)
+    tracker.save()
+    monkeypatch.undo()
+
+    relationships = [obj for obj in writes if 'history' in obj]
+    assert sorted((obj['player_a_id'], obj['player_b_id']) for obj in relationships) == [(2, 7), (2, 8)]
+
+    # Угроза, спасения до потолка 100, снова угроза: ограничение после каждого взаимодействия,
+    # а не по сумме пакета (она упёрлась бы в 100)
+    relationship = json.loads(rel_file.read_text(encoding='utf-8'))
+    threat = relationship['history'][-1]['interaction']['effect']
+    assert threat < 0 and tracker.relationship_matrix.score(2, 7) == 100 + threat
+    assert len(relationship['history']) == 50
+    assert relationship['history'][-1]['interaction']['post_id'] == 62
+    print("✅ Одна запись на пару")
@@ -0,0 +1,107 @@
+"""
+Тестирование матрицы отношений
+Запуск: python -m pytest tests/test_relationship_matrix.py
+"""
+
+import sys
+import os
+import json
+
+# Добавляем корень репозитория в путь для импорта пакета scripts.social
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.social import relationship_matrix
+from scripts.social.relationship_matrix import RelationshipMatrix
+
+def test_matrix_lookups_and_rebuild(tmp_path, monkeypatch):
+    """Тест: точечные чтения, строки и столбцы до и после сборки новых пар в CSR"""
+    print("\n🧩 Тест матрицы отношений...")
+    monkeypatch.setattr(relationship_matrix, 'LOG_REBUILD_MIN', 8)
+
+    matrix = RelationshipMatrix(str(tmp_path))
+    assert matrix.get(1, 2) is None and matrix.score(1, 2) == 0
+
+    matrix.set(1, 2, 15, updated=1000)
+    matrix.set(2, 1, -40, updated=2000)
+    matrix.flush()
+    assert not os.path.exists(matrix.matrix_file)  # Пока только журнал пар
+    matrix = RelationshipMatrix(str(tmp_path))
+    assert matrix.get(1, 2) == (15, 1000) and len(matrix) == 2
+
+    # Пар больше порога - журнал собирается в CSR
+    for player_id in range(100, 120):
+        matrix.set(player_id, 2, player_id % 50, updated=3000)
+    matrix.close()
+    assert os.path.getsize(matrix.log_file) == 0
+
+    matrix = RelationshipMatrix(str(tmp_path))
+    assert matrix.entries == 22 and matrix.get(1, 2) == (15, 1000)
+    assert matrix.get(2, 1) == (-40, 2000)
+    assert matrix.get(1, 100) is None
+    # Счёт пары из CSR меняется на месте, новая пара - в журнал; чтения видят и то, и другое
+    matrix.set(1, 2, -100, updated=4000)
+    matrix.set(2, 100, 7, updated=5000)
+    assert matrix.row(2) == {1: (-40, 2000), 100: (7, 5000)}
+    column = matrix.column(2)
+    assert len(column) == 21 and column[1] == (-100, 4000) and column[120 - 1] == (19, 3000)
+    matrix.flush()
+
+    matrix = RelationshipMatrix(str(tmp_path))
+    assert matrix.get(1, 2) == (-100, 4000) and matrix.get(2, 100) == (7, 5000)
+    print("✅ Матрица читается по парам, строкам и столбцам")
+
+def test_matrix_writes_ordinals_once(tmp_path, monkeypatch):
+    """Тест: номера новых игроков записываются одним файлом в flush(), а не на каждого игрока"""
+    writes = []
+    real_write = relationship_matrix.atomic_write_json
+    monkeypatch.setattr(relationship_matrix, 'atomic_write_json',
+                        lambda path, *args, **kwargs: (writes.append(path), real_write(path, *args, **kwargs)))
+
+    matrix = RelationshipMatrix(str(tmp_path))
+    for player_id in range(200):
+        matrix.set(player_id, player_id + 1, 1)
+    assert writes == []
+    matrix.flush()
+    assert writes == [matrix.ordinals_file]
+    assert RelationshipMatrix(str(tmp_path)).score(199, 200) == 1
+
+def test_stale_pair_log_is_not_replayed(tmp_path, monkeypatch):
+    """Тест: журнал пар, уже собранный в CSR до сбоя, не откатывает более поздние изменения"""
+    monkeypatch.setattr(relationship_matrix, 'LOG_REBUILD_MIN', 0)
+
+    matrix = RelationshipMatrix(str(tmp_path))
+    matrix.set(1, 2, 10, updated=1000)
+    matrix.flush()
+    with open(matrix.log_file, 'rb') as f:
+        stale = f.read() or relationship_matrix._LOG_ENTRY.pack(0, 1, 10, 1000)
+    matrix.set(1, 2, 50, updated=2000)  # На месте в CSR
+    matrix.close()
+
+    # Сбой между пересборкой и очисткой: журнал пар остался
+    with open(matrix.log_file, 'wb') as f:
+        f.write(stale)
+    assert RelationshipMatrix(str(tmp_path)).get(1, 2) == (50, 2000)
+
+def test_tracker_imports_legacy_scores(tmp_path):
+    """Тест: счёты из файлов пар прежнего формата переносятся в матрицу, в файлах остаётся история"""
+    import shutil
+    from scripts.social.relation_tracker import RelationTracker
+
+    root = os.path.join(os.path.dirname(__file__), '..')
+    for name in ('actions_config.json', 'modifiers_config.json'):
+        shutil.copy(os.path.join(root, 'data', name), tmp_path / name)
+    relationships_dir = tmp_path / 'players' / 'relationships'
+    relationships_dir.mkdir(parents=True)
+    (relationships_dir / '2_7.json').write_text(json.dumps({
+        'player_a_id': 2, 'player_b_id': 7, 'total_score': 42,
+        'history': [{'interaction': {'effect': 42}, 'date': '2026-01-01T00:00:00'}],
+        'last_updated': '2026-01-01T00:00:00'
+    }), encoding='utf-8')
+
+    tracker = RelationTracker(data_dir=str(tmp_path))
+    assert tracker.relationship_matrix.score(2, 7) == 42
+
+    tracker._update_relationship(2, 7, 10, {'effect': 10})
+    assert tracker.relationship_matrix.score(2, 7) == 52
+    relationship = json.loads((relationships_dir / '2_7.json').read_text(encoding='utf-8'))
+    assert 'total_score' not in relationship and len(relationship['history']) == 2
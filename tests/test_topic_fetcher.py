@@ -0,0 +1,84 @@
+"""
+Тестирование параллельного чтения тем и ограничения частоты запросов
+Запуск: python tests/test_topic_fetcher.py
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from forum_client import TokenBucket
+from topic_fetcher import TopicFetcher, merge_topic_posts
+
+class FakeClock:
+    """Часы, которые идут только во время sleep"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_token_bucket():
+    """Тест: после запаса burst запросы идут не чаще rate в секунду"""
+    print("🧪 Тестируем token bucket...")
+
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5, burst=3, clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        assert bucket.acquire() == 0  # Запас ведра
+    for _ in range(10):
+        bucket.acquire()
+    assert abs(clock.now - 2.0) < 1e-9  # 10 запросов при 5 запр/с
+
+    print("✅ Лимит соблюдается!\n")
+
+def test_topics_fetched_concurrently():
+    """Тест: время сбора не растёт как число тем x задержка"""
+    print("🧪 Тестируем параллельное чтение тем...")
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def read_topic(topic_id):
+        with lock:
+            active.append(topic_id)
+            peak.append(len(active))
+        time.sleep(0.05)  # Задержка сети
+        with lock:
+            active.remove(topic_id)
+        if topic_id == 13:
+            raise ValueError("тема недоступна")
+        return [{'id': str(topic_id * 10 + i)} for i in range(2)]
+
+    start = time.perf_counter()
+    posts_by_topic, failed = TopicFetcher(max_workers=8).fetch(list(range(1, 33)), read_topic)
+    elapsed = time.perf_counter() - start
+
+    assert max(peak) <= 8
+    assert elapsed < 32 * 0.05 / 2
+    assert list(failed) == [13]
+    merged = merge_topic_posts(posts_by_topic)
+    assert len(merged) == 62
+    assert merged[0]['id'] == '321'
+
+    print(f"✅ 32 темы за {elapsed:.2f} с\n")
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🎮 ТЕСТИРОВАНИЕ ЧТЕНИЯ ТЕМ")
+    print("=" * 50)
+
+    test_token_bucket()
+    test_topics_fetched_concurrently()
+
+    print("🎉 Все тесты успешно пройдены!")
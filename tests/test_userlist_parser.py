@@ -0,0 +1,235 @@
+"""
+Тестирование парсера списка игроков (без обращения к форуму)
+Запуск: python tests/test_userlist_parser.py
+"""
+
+import sys
+import os
+import copy
+
+# Добавляем папку scripts в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import userlist_parser
+import userlist_table
+from http_cache import CachedResponse, HTTPCache
+from player_cache import PlayerFingerprintCache
+
+def make_userlist_page(players, page=1, total_pages=1):
+    """Собирает HTML страницы userlist.php в формате форума"""
+    rows = []
+    for user_id, name, status, posts in players:
+        rows.append(
+            '<tr>'
+            f'<td class="tcl"><span class="usersname"><a href="/profile.php?id={user_id}">{name}</a></span></td>'
+            f'<td class="tc2">{status}</td>'
+            '<td class="tc2">Игрок</td>'
+            f'<td class="tc3">{posts}</td>'
+            '<td class="tcr">2025-10-21</td>'
+            '<td class="tcr">Сегодня</td>'
+            '</tr>'
+        )
+
+    pagelinks = ' '.join(
+        f'<a href="userlist.php?username=&amp;show_group=-1&amp;p={p}">{p}</a>' if p != page else f'<strong>{p}</strong>'
+        for p in range(1, total_pages + 1)
+    )
+
+    return (
+        '<html><body>'
+        f'<div class="pagelink">Страницы: {pagelinks}</div>'
+        '<table summary="Пользователи, отфильтрованные по критерию.">'
+        '<thead><tr><th>Имя</th><th>Статус</th><th>Группа</th><th>Сообщений</th><th>Дата</th><th>Визит</th></tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody>'
+        '</table></body></html>'
+    )
+
+def test_parse_status():
+    """Тест разбора строки статуса"""
+    print("🧪 Тестируем разбор статуса...")
+
+    parse_status = userlist_parser.parse_status
+
+    assert parse_status("К:+200 З:+13% Ш:+312%") == {'credits': 200, 'infection': 13, 'whisper': 312}
+    assert parse_status("кредиты: 50 заражение: 3% шёпот: -5") == {'credits': 50, 'infection': 3, 'whisper': -5}
+    assert parse_status("credits:7 infection: 4 whisper:+9") == {'credits': 7, 'infection': 4, 'whisper': 9}
+    # Основной шаблон важнее альтернативного, даже если тот встречается раньше
+    assert parse_status("inf:3 з:2") == {'infection': 2}
+    assert parse_status("Новичок") == {}
+
+    columns = userlist_parser.parse_status_batch(["К:1 Ш:2", "", "шепот: 5"])
+    assert columns == {
+        'credits': [1, None, None],
+        'infection': [None, None, None],
+        'whisper': [2, None, 5],
+    }
+
+    print("✅ Статусы разобраны верно!\n")
+
+def test_detect_page_count():
+    """Тест определения количества страниц"""
+    print("🧪 Тестируем определение числа страниц...")
+
+    assert userlist_parser.detect_page_count(make_userlist_page([], 1, 1)) == 1
+    assert userlist_parser.detect_page_count(make_userlist_page([], 1, 7)) == 7
+    assert userlist_parser.detect_page_count(make_userlist_page([], 7, 7)) == 7
+
+    print("✅ Число страниц определяется верно!\n")
+
+def test_fetch_all_pages(monkeypatch, tmp_path):
+    """Тест сбора игроков со всех страниц"""
+    print("🧪 Тестируем постраничную загрузку...")
+
+    pages = {
+        1: make_userlist_page([(2, 'Void', 'К:200 З:13% Ш:82%', 100)], 1, 3),
+        2: make_userlist_page([(3, 'Negan', 'К:50 З:5% Ш:10%', 7)], 2, 3),
+        3: make_userlist_page([(4, 'Sarah', 'К:10 З:0% Ш:0%', 1)], 3, 3),
+    }
+    requested = []
+
+    def fake_fetch(page):
+        requested.append(page)
+        return CachedResponse(f'page{page}', pages[page], 200, f'hash{page}')
+
+    monkeypatch.setattr(userlist_parser, 'fetch_userlist_page', fake_fetch)
+    monkeypatch.setattr(userlist_parser, 'http_cache', HTTPCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr(userlist_parser, 'fingerprint_cache',
+                        PlayerFingerprintCache('test', cache_file=str(tmp_path / 'fingerprints.json')))
+
+    players = userlist_parser.fetch_all_players(max_concurrent_requests=2)
+
+    assert sorted(requested) == [1, 2, 3]
+    assert list(players) == [2, 3, 4]  # Порядок страниц сохраняется
+    assert players[3]['username'] == 'Negan'
+    assert players[3]['data']['credits'] == 50
+    assert players[4]['forum_stats']['posts'] == 1
+
+    print("✅ Все страницы собраны!\n")
+
+def test_table_backends_agree():
+    """Тест: все бэкенды разбора таблицы дают одинаковые строки"""
+    print("🧪 Сравниваем бэкенды разбора таблицы...")
+
+    html = make_userlist_page([
+        (2, 'Void', 'К:200 З:13% Ш:82%', 100),
+        (3, 'Negan &amp; Co', 'К: <b>50</b> З:5%', 7),
+        (4, 'Sarah', '', 1),
+    ])
+    # Строка без span: имя берётся из первой ссылки
+    html = html.replace('</tbody>',
+        '<tr><td><a href="/profile.php?id=9"><b>Alice</b></a></td><td>К:1</td><td></td>'
+        '<td>abc</td><td>2025-01-01</td><td>Вчера</td></tr>'
+        '<tr><td>неполная строка</td></tr></tbody>')
+
+    results = {}
+    for backend in userlist_table.BACKENDS:
+        reader = userlist_table.UserTableReader(backend)
+        results[backend] = list(reader.iter_rows(html))
+        assert reader.found_table
+
+    reference = results['bs4']
+    assert len(reference) == 4
+    assert reference[1]['username'] == 'Negan & Co'
+    assert reference[1]['status'] == 'К: 50 З:5%'
+    assert reference[3]['user_id'] == 9 and reference[3]['username'] == 'Alice'
+    for backend, rows in results.items():
+        print(f"   {backend}: {len(rows)} строк")
+        assert rows == reference
+
+    print("✅ Бэкенды совпадают!\n")
+
+def test_table_not_found():
+    """Тест: страница без таблицы пользователей"""
+    assert userlist_parser.parse_userlist_page('<html><body>Ошибка</body></html>') is None
+
+def test_save_only_changed_players(monkeypatch, tmp_path):
+    """Тест: неизменённые игроки не перезаписываются, метки времени не скачут"""
+    print("🧪 Тестируем сохранение только изменившихся игроков...")
+
+    monkeypatch.chdir(tmp_path)
+    output_dir = str(tmp_path / 'players')
+
+    def scrape(timestamp, credits=200):
+        return {
+            uid: {
+                'user_id': uid, 'username': f'P{uid}', 'status_raw': f'К:{credits}',
+                'data': {'credits': credits},
+                'forum_stats': {'posts': 1, 'registered': '2025-10-21', 'last_visit': 'Сегодня'},
+                'last_updated': timestamp
+            }
+            for uid in (2, 3)
+        }
+
+    def calculate(players, timestamp):
+        # Как core_parser: добавляет изменения за день
+        players = copy.deepcopy(players)
+        for player in players.values():
+            player['last_calculation'] = {'credits_change': 5, 'calculation_time': timestamp}
+        return players
+
+    def snapshot():
+        return {name: (tmp_path / 'players' / name).read_bytes()
+                for name in ('2.json', '3.json', 'all_players.json')}
+
+    # День 1: оба скрипта сохраняют данные
+    userlist_parser.save_players_data(scrape('day1'), output_dir)
+    userlist_parser.save_players_data(calculate(scrape('day1'), 'day1'), output_dir)
+    day1 = snapshot()
+
+    # День 2: содержимое то же, меняются только метки времени
+    userlist_parser.save_players_data(scrape('day2'), output_dir)
+    userlist_parser.save_players_data(calculate(scrape('day2'), 'day2'), output_dir)
+    assert snapshot() == day1
+
+    # День 3: изменился один игрок
+    players = calculate(scrape('day3'), 'day3')
+    players[3]['data']['credits'] = 250
+    userlist_parser.save_players_data(players, output_dir)
+    day3 = snapshot()
+    assert day3['2.json'] == day1['2.json']
+    assert day3['3.json'] != day1['3.json']
+    assert b'day3' in day3['3.json']
+
+    print("✅ Перезаписываются только изменения!\n")
+
+def test_fingerprint_cache_reuses_calculations(monkeypatch, tmp_path):
+    """Тест: неизменённые игроки берутся из кэша, смена баланса сбрасывает кэш"""
+    print("🧪 Тестируем кэш расчётов игроков...")
+
+    cache_file = str(tmp_path / 'fingerprints.json')
+    html = make_userlist_page([(2, 'Void', 'К:200 З:130% Ш:82%', 100), (3, 'Negan', 'К:50', 7)])
+
+    monkeypatch.setattr(userlist_parser, 'fingerprint_cache', PlayerFingerprintCache('v1', cache_file))
+    first = userlist_parser.parse_userlist_page(html)
+    userlist_parser.fingerprint_cache.save()
+
+    calls = []
+    monkeypatch.setattr(userlist_parser, 'calculate_players_batch', lambda entries: calls.extend(entries))
+
+    # Тот же баланс: расчёты не повторяются, результат тот же
+    monkeypatch.setattr(userlist_parser, 'fingerprint_cache', PlayerFingerprintCache('v1', cache_file))
+    second = userlist_parser.parse_userlist_page(html)
+    assert calls == []
+    assert userlist_parser.fingerprint_cache.hits == 2
+    for user_id in first:
+        assert second[user_id]['data'] == first[user_id]['data']
+    assert 'exceeded_effects' in second[2]['data']
+
+    # Баланс изменился: кэш сброшен, всё пересчитывается
+    monkeypatch.setattr(userlist_parser, 'fingerprint_cache', PlayerFingerprintCache('v2', cache_file))
+    userlist_parser.parse_userlist_page(html)
+    assert len(calls) == 2
+
+    print("✅ Кэш расчётов работает!\n")
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("🎮 ТЕСТИРОВАНИЕ ПАРСЕРА СПИСКА ИГРОКОВ")
+    print("=" * 50)
+
+    test_parse_status()
+    test_detect_page_count()
+    test_table_backends_agree()
+    test_table_not_found()
+
+    print("🎉 Все тесты успешно пройдены!")